@@ -1,36 +1,59 @@
+# config reads .env; it must be imported before anything that takes
+# settings from os.environ at import time.
+from config import load_config
 from flask import Flask
 from flask_cors import CORS
-import init
-from dotenv import load_dotenv
-
-init.init()
-load_dotenv()
-
+from compression import init_compression
+from lifecycle import init_upload_tracking, warm_caches
+from listing import register_commands
 from routes.test_routes import test_bp
 from routes.auth_routes import auth_bp
 from routes.locations_routes import locations_bp
-from routes.master_routes import master_bp  
-from routes.farms_routes import farms_bp 
+from routes.master_routes import master_bp
+from routes.farms_routes import farms_bp
 from routes.contracts_routes import contracts_bp
 from routes.commodities_routes import commodities_bp
 from routes.trader_routes import trader_bp
+from routes.search_routes import search_bp
+from routes.map_routes import map_bp
+from routes.admin_routes import admin_bp
+
+
+def create_app(config=None):
+    """
+    Build the Flask app. `config` is a config class or its name
+    ("development", "production"); defaults to APP_ENV.
+    """
+    app = Flask(__name__)
+    app.config.from_object(load_config(config))
+
+    CORS(app, origins=app.config["CORS_ORIGINS"], supports_credentials=True)
+    init_compression(app)
+    init_upload_tracking(app)
+    register_commands(app)
+
+    app.register_blueprint(test_bp)
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(locations_bp)
+    app.register_blueprint(master_bp)
+    app.register_blueprint(farms_bp)
+    app.register_blueprint(contracts_bp)
+    app.register_blueprint(commodities_bp)
+    app.register_blueprint(trader_bp)
+    app.register_blueprint(search_bp)
+    app.register_blueprint(map_bp)
+    app.register_blueprint(admin_bp)
 
-app = Flask(__name__)
+    @app.route("/")
+    def hello():
+        return "Contract Farming API Running"
 
-CORS(app, origins="*", supports_credentials=True)
+    if app.config["WARM_CACHES"]:
+        with app.app_context():
+            warm_caches()
 
-app.register_blueprint(test_bp)
-app.register_blueprint(auth_bp)
-app.register_blueprint(locations_bp)
-app.register_blueprint(master_bp)    
-app.register_blueprint(farms_bp)
-app.register_blueprint(contracts_bp)
-app.register_blueprint(commodities_bp)
-app.register_blueprint(trader_bp)
+    return app
 
-@app.route("/")
-def hello():
-    return "Contract Farming API Running"
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", debug=True, use_reloader=False, port=5005)
+    create_app("development").run(host="0.0.0.0", debug=True, use_reloader=False, port=5005)
@@ -0,0 +1,379 @@
+"""
+ASGI entry point: the hot read routes as async handlers on aiomysql,
+everything else served by the Flask app mounted underneath.
+
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5005
+
+Responses match the Flask versions byte for byte (same cache entries,
+same ETags), so clients can be pointed at either mode.
+"""
+import os
+import asyncio
+import datetime
+import contextlib
+import jwt
+import aiomysql
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import Response
+from starlette.routing import Route, Mount
+from starlette.staticfiles import StaticFiles
+from werkzeug.http import parse_accept_header, parse_etags, parse_date, http_date
+
+from wsgi import app as flask_app
+from cache import contract_cache
+from compression import COMPRESS_MIN_SIZE, brotli, compress
+from conditional import content_etag, make_etag
+from config import SECRET_KEY, DB_SETTINGS
+from reference_data import commodity_snapshot
+from revocation import revocation_list
+from routes.contracts_routes import (
+    CONTRACT_DETAILS_SQL, TRADERS_SQL,
+    parse_negotiations, assemble_contract_details, cache_contract_details
+)
+
+ASYNC_DB_POOL_SIZE = int(os.environ.get("ASYNC_DB_POOL_SIZE", 20))
+WSGI_THREADS = int(os.environ.get("WSGI_THREADS", 16))
+
+USER_BY_MOBILE_SQL = """
+    SELECT user_id, full_name, mobile_number, user_type
+    FROM m_user_login WHERE mobile_number=%s LIMIT 1
+"""
+
+FARMS_BY_MOBILE_SQL = """
+    SELECT f.farm_id, f.farm_name
+    FROM m_farm f
+    JOIN m_user_login l ON l.user_id = f.user_id
+    WHERE l.mobile_number = %s
+"""
+
+PROFILE_BY_MOBILE_SQL = """
+    SELECT u.email_id, u.address, u.status AS is_active
+    FROM m_user u
+    JOIN m_user_login l ON l.user_id = u.user_id
+    WHERE l.mobile_number = %s
+    LIMIT 1
+"""
+
+
+class AsyncDB:
+    """
+    aiomysql pool; each call checks out its own connection, so queries
+    passed to asyncio.gather() really run in parallel.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.pool = None
+
+    async def open(self):
+        self.pool = await aiomysql.create_pool(
+            **DB_SETTINGS,
+            cursorclass=aiomysql.DictCursor,
+            autocommit=True,
+            charset="utf8mb4",
+            minsize=1,
+            maxsize=self.size,
+        )
+
+    async def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            await self.pool.wait_closed()
+            self.pool = None
+
+    async def fetchall(self, sql, args=None):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return await cur.fetchall()
+
+    async def fetchone(self, sql, args=None):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(sql, args)
+                return await cur.fetchone()
+
+
+db = AsyncDB(ASYNC_DB_POOL_SIZE)
+
+
+# -----------------------------------------------------------------
+# Responses
+# -----------------------------------------------------------------
+def dumps(payload):
+    # Same encoder as compression.dumps_compact, without an app context.
+    return flask_app.json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def json_message(payload, status):
+    return Response(dumps(payload), status_code=status, media_type="application/json")
+
+
+def _last_modified(dt):
+    if not isinstance(dt, datetime.datetime):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.replace(microsecond=0)
+
+
+def _is_not_modified(request, etag, last_modified):
+    # If-None-Match wins over If-Modified-Since, as in conditional.py.
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return parse_etags(if_none_match).contains_weak(etag)
+
+    since = parse_date(request.headers.get("if-modified-since"))
+    if last_modified and since:
+        return last_modified <= since
+
+    return False
+
+
+def _negotiate_encoding(request):
+    accepted = parse_accept_header(request.headers.get("accept-encoding"))
+
+    br_q = accepted["br"] if brotli else 0
+    gzip_q = accepted["gzip"]
+
+    if br_q and br_q >= gzip_q:
+        return "br"
+    if gzip_q:
+        return "gzip"
+    return None
+
+
+def json_response(request, body, etag=None, last_modified=None, private=False):
+    """
+    conditional.conditional_json + compression.compress_response for
+    an already-serialized body.
+    """
+    etag = etag or content_etag(body)
+    last_modified = _last_modified(last_modified)
+
+    headers = {
+        "ETag": f'W/"{etag}"',
+        "Cache-Control": "private, no-cache" if private else "public, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if last_modified:
+        headers["Last-Modified"] = http_date(last_modified)
+
+    if _is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if len(body) >= COMPRESS_MIN_SIZE:
+        encoding = _negotiate_encoding(request)
+        if encoding:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+
+    return Response(body, headers=headers, media_type="application/json")
+
+
+# -----------------------------------------------------------------
+# Auth
+# -----------------------------------------------------------------
+class AuthError(Exception):
+    pass
+
+
+def token_payload(request):
+    token = request.headers.get("Authorization")
+    if not token:
+        raise AuthError("Token is missing")
+    if token.startswith("Bearer "):
+        token = token[7:]
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    except jwt.ExpiredSignatureError:
+        raise AuthError("Token expired")
+    except jwt.InvalidTokenError as e:
+        raise AuthError(f"Token error: {str(e)}")
+
+    if not payload.get("mobile_number"):
+        raise AuthError("Invalid token payload")
+    return payload
+
+
+async def is_revoked(payload):
+    # The periodic pull is a blocking query; keep it off the event loop.
+    if revocation_list.sync_due():
+        await run_in_threadpool(revocation_list.sync)
+    return revocation_list.is_revoked(payload)
+
+
+def _load_commodity_reference():
+    # A reload serializes the payload with the Flask JSON provider.
+    with flask_app.app_context():
+        return commodity_snapshot.get()
+
+
+async def commodity_reference():
+    state = commodity_snapshot.current()
+    if state is None:
+        state = await run_in_threadpool(_load_commodity_reference)
+    return state
+
+
+# -----------------------------------------------------------------
+# Routes
+# -----------------------------------------------------------------
+async def get_form_data(request):
+    """
+    GET /contracts/form-data. The user lookup, the farm list and the
+    reference snapshot check run concurrently; farms are keyed by the
+    token's mobile number so they need not wait for the user id.
+    """
+    try:
+        payload = token_payload(request)
+    except AuthError:
+        return json_message({"message": "Unauthorized"}, 401)
+
+    mobile = payload["mobile_number"]
+    try:
+        user, farms, revoked, reference = await asyncio.gather(
+            db.fetchone(USER_BY_MOBILE_SQL, (mobile,)),
+            db.fetchall(FARMS_BY_MOBILE_SQL, (mobile,)),
+            is_revoked(payload),
+            commodity_reference(),
+        )
+    except Exception as e:
+        return json_message({"message": f"Failed to load form data: {str(e)}"}, 500)
+
+    if not user or revoked:
+        return json_message({"message": "Unauthorized"}, 401)
+
+    farms = dumps(list(farms))
+    body = (
+        b'{"farms":' + farms
+        + b',"referenceVersion":"' + reference.version.encode("ascii") + b'",'
+        + reference.body.raw[1:]
+    )
+    etag = make_etag(reference.version, content_etag(farms))
+    return json_response(request, body, etag, private=True)
+
+
+async def load_contract_entry(contract_id):
+    """
+    Async twin of get_contract_entries() for one cache miss. The trader
+    lookup needs the ids inside the contract's negotiations, so the two
+    queries stay sequential; the entry lands in contract_cache.
+    """
+    rows = await db.fetchall(CONTRACT_DETAILS_SQL, ((contract_id,),))
+    if not rows:
+        return None
+
+    parsed, trader_ids = parse_negotiations(rows)
+    trader_rows = []
+    if trader_ids:
+        trader_rows = await db.fetchall(TRADERS_SQL, (tuple(trader_ids),))
+
+    # In a thread: with CACHE_URL set, storing the entry is a round trip.
+    entries = await run_in_threadpool(_cache_contract_details, parsed, trader_rows)
+    return entries.get(contract_id)
+
+
+def _cache_contract_details(parsed, trader_rows):
+    with flask_app.app_context():
+        return cache_contract_details(assemble_contract_details(parsed, trader_rows))
+
+
+async def get_contract(request):
+    contract_id = request.path_params["contract_id"]
+
+    entry = contract_cache.local.get(contract_id)
+    if entry is None and contract_cache.shared is not None:
+        entry = await run_in_threadpool(contract_cache.get_shared, contract_id)
+    if entry is None:
+        try:
+            entry = await load_contract_entry(contract_id)
+        except Exception as e:
+            return json_message({"message": f"Failed to load contract: {str(e)}"}, 500)
+
+    if entry is None:
+        return json_message({"message": "Contract not found"}, 404)
+
+    contract, updated_at, _ = entry
+    body = b'{"contract":' + contract + b'}'
+    return json_response(request, body, private=True, last_modified=updated_at)
+
+
+async def get_current_user(request):
+    """
+    GET /auth/me. Login row, profile row and the revocation check run
+    concurrently, all keyed by the token's mobile number.
+    """
+    try:
+        payload = token_payload(request)
+    except AuthError as e:
+        return json_message({"message": str(e)}, 401)
+
+    mobile = payload["mobile_number"]
+    try:
+        login, profile, revoked = await asyncio.gather(
+            db.fetchone(USER_BY_MOBILE_SQL, (mobile,)),
+            db.fetchone(PROFILE_BY_MOBILE_SQL, (mobile,)),
+            is_revoked(payload),
+        )
+    except Exception as e:
+        return json_message({"message": f"Fetch user failed: {str(e)}"}, 500)
+
+    if revoked:
+        return json_message({"message": "Token revoked"}, 401)
+    if not login:
+        return json_message({"message": "Invalid token user"}, 401)
+
+    full_user = {
+        "id": login["user_id"],
+        "full_name": login["full_name"],
+        "mobile_number": login["mobile_number"],
+        "user_type": login["user_type"],
+        "email_id": profile["email_id"] if profile else None,
+        "address": profile["address"] if profile else "",
+        "is_active": True if profile and profile["is_active"] == "Active" else False
+    }
+    return json_message({"user": full_user}, 200)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await db.open()
+    try:
+        yield
+    finally:
+        await db.close()
+
+
+image_dir = os.path.join(
+    flask_app.root_path, os.getenv("CONTRACT_IMAGE_PATH", "uploads/contracts")
+)
+
+routes = [
+    Route("/auth/me", get_current_user, methods=["GET"]),
+    Route("/contracts/form-data", get_form_data, methods=["GET"]),
+    # File reads happen on a worker thread; ETag/Range handled by StaticFiles.
+    Mount("/contracts/images", StaticFiles(directory=image_dir, check_dir=False)),
+    Route("/contracts/{contract_id}", get_contract, methods=["GET"]),
+    # Anything not matched above (including other methods on these paths).
+    Mount("/", WSGIMiddleware(flask_app, workers=WSGI_THREADS)),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[
+        Middleware(
+            CORSMiddleware,
+            allow_origins=["*"],
+            allow_credentials=True,
+            allow_methods=["*"],
+            allow_headers=["*"],
+        ),
+    ],
+)
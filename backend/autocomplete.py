@@ -0,0 +1,151 @@
+import bisect
+import threading
+import unicodedata
+from reference_data import location_snapshot, commodity_snapshot
+
+KINDS = ("division", "district", "tehsil", "block", "commodity", "variety")
+
+
+def fold(text):
+    """
+    Case- and diacritic-insensitive form used for both keys and queries.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of folded keys; a prefix lookup is one bisect plus a
+    short forward scan. Every word start of a name is indexed, so
+    "karnal" also finds "New Karnal".
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+        pairs = []
+        for pos, entry in enumerate(entries):
+            words = fold(entry["name"]).split(" ")
+            for i in range(len(words)):
+                pairs.append((" ".join(words[i:]), pos))
+        pairs.sort()
+
+        self.keys = [k for k, _ in pairs]
+        self.refs = [p for _, p in pairs]
+
+    def search(self, q, limit=10):
+        """
+        q must already be folded. Returns (matched_key, entry) pairs.
+        """
+        results = []
+        seen = set()
+        i = bisect.bisect_left(self.keys, q)
+
+        while i < len(self.keys) and self.keys[i].startswith(q):
+            pos = self.refs[i]
+            if pos not in seen:
+                seen.add(pos)
+                results.append((self.keys[i], self.entries[pos]))
+                if len(results) >= limit:
+                    break
+            i += 1
+
+        return results
+
+
+class Autocomplete:
+    """
+    One PrefixIndex per entry type plus one over everything, so a
+    type-filtered query never scans past matches of other types.
+    """
+
+    def __init__(self, entries):
+        self.all = PrefixIndex(entries)
+        self.by_kind = {
+            kind: PrefixIndex([e for e in entries if e["type"] == kind])
+            for kind in KINDS
+        }
+
+    def search(self, query, kinds=None, limit=10):
+        q = fold(query)
+        if not q:
+            return []
+
+        if not kinds:
+            return [e for _, e in self.all.search(q, limit)]
+
+        hits = []
+        for kind in kinds:
+            hits.extend(self.by_kind[kind].search(q, limit))
+        hits.sort(key=lambda h: h[0])
+        return [e for _, e in hits[:limit]]
+
+
+def build_entries(locations, commodities):
+    divisions = {d["division_id"]: d["division_name"] for d in locations["divisions"]}
+    districts = {d["district_id"]: d for d in locations["districts"]}
+    commodity_names = {c["commodity_id"]: c["commodity_name"] for c in commodities["commodities"]}
+
+    def division_crumb(division_id):
+        if division_id not in divisions:
+            return []
+        return [{"type": "division", "id": division_id, "name": divisions[division_id]}]
+
+    def district_crumbs(district_id):
+        d = districts.get(district_id)
+        if not d:
+            return []
+        return [{"type": "district", "id": district_id, "name": d["district_name"]}] \
+            + division_crumb(d["division_id"])
+
+    entries = []
+    for d in locations["divisions"]:
+        entries.append({"type": "division", "id": d["division_id"],
+                        "name": d["division_name"], "path": []})
+    for d in locations["districts"]:
+        entries.append({"type": "district", "id": d["district_id"],
+                        "name": d["district_name"], "path": division_crumb(d["division_id"])})
+    for t in locations["tehsils"]:
+        entries.append({"type": "tehsil", "id": t["tehsil_id"],
+                        "name": t["tehsil_name"], "path": district_crumbs(t["district_id"])})
+    for b in locations["blocks"]:
+        entries.append({"type": "block", "id": b["block_id"],
+                        "name": b["block_name"], "path": district_crumbs(b["district_id"])})
+
+    for c in commodities["commodities"]:
+        entries.append({"type": "commodity", "id": c["commodity_id"],
+                        "name": c["commodity_name"], "path": []})
+    for commodity_id, varieties in commodities["varieties_by_commodity"].items():
+        path = [{"type": "commodity", "id": commodity_id,
+                 "name": commodity_names.get(commodity_id)}] if commodity_id in commodity_names else []
+        for v in varieties:
+            entries.append({"type": "variety", "id": v["variety_id"],
+                            "name": v["variety_name"], "path": path})
+
+    return entries
+
+
+_index = None
+_index_versions = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Rebuilt only when the location or commodity snapshot version moves.
+    """
+    global _index, _index_versions
+
+    locations = location_snapshot.get()
+    commodities = commodity_snapshot.get()
+    versions = (locations.version, commodities.version)
+
+    if _index is None or versions != _index_versions:
+        with _lock:
+            if _index is None or versions != _index_versions:
+                _index = Autocomplete(build_entries(locations.data, commodities.data))
+                _index_versions = versions
+
+    return _index
@@ -0,0 +1,396 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+
+# Imported only when CACHE_URL is set (see _shared_tier).
+redis = None
+
+CONTRACT_CACHE_SIZE = int(os.environ.get("CONTRACT_CACHE_SIZE", 2048))
+CONTRACT_CACHE_TTL = int(os.environ.get("CONTRACT_CACHE_TTL", 60))
+
+# Redis-protocol server shared by every worker and node, e.g.
+# redis://127.0.0.1:6379/0 (scripts/cache_server.py is a local stand-in).
+# Unset: each process keeps its own in-memory caches only.
+CACHE_URL = os.environ.get("CACHE_URL", "")
+CACHE_CHANNEL = os.environ.get("CACHE_CHANNEL", "cf:invalidate")
+CACHE_RETRY_SECONDS = 5
+
+log = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """
+    Thread-safe LRU with per-entry TTL, optional tags for group
+    invalidation, and hit/miss counters.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+
+            while len(self._data) > self.maxsize:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._tags.get(tag, ())):
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._tags.clear()
+
+    def _drop(self, key):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class SharedTier:
+    """
+    Connection to the server named by CACHE_URL: shared cache entries plus
+    the invalidation channel every process listens on.
+
+    It never fails a request. While the server is unreachable reads miss,
+    writes are skipped and the local tiers carry on alone, retrying after
+    CACHE_RETRY_SECONDS. Invalidations may have been missed meanwhile, so
+    the listener clears the local tiers whenever it (re)subscribes.
+    """
+
+    def __init__(self, url, channel):
+        self.url = url
+        self.channel = channel
+        self.handlers = {}
+        self.reset()
+
+    def reset(self):
+        # A forked child must not share its parent's sockets or origin
+        # (messages from our own origin are skipped).
+        self.origin = uuid.uuid4().hex
+        self._client = None
+        self._listener = None
+        self._down_until = 0
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            # RESP2: spoken by every server version and by the stand-in.
+            self._client = redis.Redis.from_url(
+                self.url, protocol=2, socket_timeout=1, socket_connect_timeout=1
+            )
+        return self._client
+
+    def call(self, fn, default=None):
+        """
+        fn(client)'s result, or default if the server is down.
+        """
+        if time.monotonic() < self._down_until:
+            return default
+        self.start_listener()
+        try:
+            return fn(self.client())
+        except redis.RedisError as e:
+            log.warning("Shared cache unavailable: %s", e)
+            self._down_until = time.monotonic() + CACHE_RETRY_SECONDS
+            return default
+
+    def message(self, name, op, arg):
+        return json.dumps([self.origin, name, op, arg])
+
+    def publish(self, name, op, arg):
+        self.call(lambda r: r.publish(self.channel, self.message(name, op, arg)))
+
+    def subscribe(self, name, handler):
+        """
+        handler(op, arg) runs on the listener thread for every message
+        published under `name` by another process, and with ("clear", None)
+        after each (re)subscribe.
+        """
+        self.handlers[name] = handler
+
+    def start_listener(self):
+        if self._listener is not None:
+            return
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen, name="cache-invalidation", daemon=True
+                )
+                self._listener.start()
+
+    def _listen(self):
+        # Its own connection without a read timeout: it mostly waits.
+        client = redis.Redis.from_url(
+            self.url, protocol=2, socket_connect_timeout=1, socket_keepalive=True
+        )
+        while True:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self._dispatch_all("clear", None)
+                for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(message["data"])
+            except redis.RedisError as e:
+                log.warning("Cache invalidation listener disconnected: %s", e)
+            except Exception:
+                log.exception("Cache invalidation listener failed")
+            finally:
+                pubsub.close()
+            time.sleep(CACHE_RETRY_SECONDS)
+
+    def _dispatch(self, data):
+        try:
+            origin, name, op, arg = json.loads(data)
+        except ValueError:
+            return
+        handler = self.handlers.get(name)
+        if origin != self.origin and handler is not None:
+            handler(op, arg)
+
+    def _dispatch_all(self, op, arg):
+        for handler in list(self.handlers.values()):
+            handler(op, arg)
+
+
+def _shared_tier():
+    global redis
+    if not CACHE_URL:
+        return None
+    try:
+        import redis
+    except ImportError:
+        log.warning("CACHE_URL is set but the redis package is missing; caches stay per process")
+        return None
+    tier = SharedTier(CACHE_URL, CACHE_CHANNEL)
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=tier.reset)
+    return tier
+
+
+shared_tier = _shared_tier()
+
+
+def broadcast(name, op, arg):
+    """
+    Tell every other process (handlers registered with on_broadcast) about
+    a change; arg must be JSON-serializable. No-op without CACHE_URL.
+    """
+    if shared_tier is not None:
+        shared_tier.publish(name, op, arg)
+
+
+def on_broadcast(name, handler):
+    if shared_tier is not None:
+        shared_tier.subscribe(name, handler)
+
+
+def start_listener():
+    if shared_tier is not None:
+        shared_tier.start_listener()
+
+
+class TieredCache:
+    """
+    An in-process LRUCache in front of the shared tier (when CACHE_URL is
+    set), with the same get/set/delete/invalidate_tag interface.
+
+    Entries go to the shared tier as JSON together with their tags, so a
+    process that pulls one in can still drop it by tag; encode/decode map
+    values to and from JSON-serializable form (never pickle: anyone who
+    can write to the server must not be able to run code in a worker).
+    delete() and invalidate_tag() remove the shared copy and, through the
+    invalidation channel, every process's local copy.
+    Keys must be JSON-serializable (str or int).
+    """
+
+    def __init__(self, name, maxsize, ttl, shared=None, encode=None, decode=None):
+        self.name = name
+        self.ttl = ttl
+        self.encode = encode or (lambda value: value)
+        self.decode = decode or (lambda value: value)
+        self.local = LRUCache(maxsize, ttl)
+        self.shared = shared
+        self.shared_hits = 0
+        if shared is not None:
+            shared.subscribe(name, self._on_message)
+
+    def _key(self, key):
+        return f"{self.name}:{key}"
+
+    def _tag_key(self, tag):
+        return f"{self.name}:tag:{tag}"
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.get_shared(key)
+        return value
+
+    def get_shared(self, key):
+        """
+        Look key up in the shared tier only (a blocking round trip); a hit
+        is copied into the local tier.
+        """
+        blob = self.shared.call(lambda r: r.get(self._key(key)))
+        if blob is None:
+            return None
+        try:
+            raw, tags = json.loads(blob)
+            value = self.decode(raw)
+        except (ValueError, TypeError, KeyError):
+            log.warning("Ignoring malformed shared %s entry %s", self.name, key)
+            return None
+        self.local.set(key, value, tags)
+        self.shared_hits += 1
+        return value
+
+    def set(self, key, value, tags=()):
+        tags = tuple(tags)
+        self.local.set(key, value, tags)
+        if self.shared is None:
+            return
+
+        blob = json.dumps([self.encode(value), tags])
+
+        def write(r):
+            pipe = r.pipeline(transaction=False)
+            pipe.set(self._key(key), blob, ex=self.ttl)
+            for tag in tags:
+                pipe.sadd(self._tag_key(tag), self._key(key))
+                pipe.expire(self._tag_key(tag), self.ttl)
+            pipe.execute()
+
+        self.shared.call(write)
+
+    def delete(self, key):
+        # Shared copy first, so a concurrent get cannot pull it back in.
+        if self.shared is not None:
+            def drop(r):
+                pipe = r.pipeline(transaction=False)
+                pipe.delete(self._key(key))
+                pipe.publish(self.shared.channel, self.shared.message(self.name, "delete", key))
+                pipe.execute()
+
+            self.shared.call(drop)
+        self.local.delete(key)
+
+    def invalidate_tag(self, tag):
+        if self.shared is not None:
+            def drop(r):
+                keys = r.smembers(self._tag_key(tag))
+                pipe = r.pipeline(transaction=False)
+                pipe.delete(self._tag_key(tag), *keys)
+                pipe.publish(self.shared.channel, self.shared.message(self.name, "tag", tag))
+                pipe.execute()
+
+            self.shared.call(drop)
+        self.local.invalidate_tag(tag)
+
+    def _on_message(self, op, arg):
+        if op == "delete":
+            self.local.delete(arg)
+        elif op == "tag":
+            self.local.invalidate_tag(arg)
+        elif op == "clear":
+            self.local.clear()
+
+    def stats(self):
+        stats = self.local.stats()
+        stats["shared"] = self.shared is not None
+        stats["shared_hits"] = self.shared_hits
+        return stats
+
+
+def encode_contract_entry(entry):
+    # (serialized contract, updated_at, access); see get_contract_entries.
+    body, updated_at, access = entry
+    return [body.decode("utf-8"), updated_at.isoformat() if updated_at else None, access]
+
+
+def decode_contract_entry(raw):
+    body, updated_at, (owner_id, status, trader_user_id, trader_ids) = raw
+    return (
+        body.encode("utf-8"),
+        datetime.fromisoformat(updated_at) if updated_at else None,
+        (owner_id, status, trader_user_id, tuple(trader_ids)),
+    )
+
+
+# Serialized GET /contracts/<id> bodies, tagged by their farm and by the
+# traders whose names were merged into them.
+contract_cache = TieredCache(
+    "contract", CONTRACT_CACHE_SIZE, CONTRACT_CACHE_TTL, shared_tier,
+    encode=encode_contract_entry, decode=decode_contract_entry
+)
+
+
+# Each of these drops the entries in every worker (on every node sharing
+# CACHE_URL) in one call.
+def invalidate_contract(contract_id):
+    contract_cache.delete(contract_id)
+
+
+def invalidate_user(user_id):
+    contract_cache.invalidate_tag(f"user:{user_id}")
+
+
+def invalidate_farm(farm_id):
+    contract_cache.invalidate_tag(f"farm:{farm_id}")
@@ -0,0 +1,239 @@
+import os
+import gzip
+import zlib
+import time
+import threading
+from flask import request, current_app, Response
+from conditional import content_etag, is_not_modified, not_modified, set_validators
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", 1024))
+COMPRESS_LEVEL = int(os.environ.get("COMPRESS_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+REFERENCE_CACHE_TTL = int(os.environ.get("REFERENCE_CACHE_TTL", 300))
+STREAM_MIN_ITEMS = int(os.environ.get("STREAM_MIN_ITEMS", 200))
+STREAM_CHUNK_ITEMS = 64
+
+COMPRESSIBLE_TYPES = ("application/json", "application/javascript", "text/")
+
+
+def negotiate_encoding():
+    """
+    Pick the best encoding the client accepts: br if available, then gzip.
+    Returns None when the client wants identity.
+    """
+    accepted = request.accept_encodings
+
+    br_q = accepted["br"] if brotli else 0
+    gzip_q = accepted["gzip"]
+
+    if br_q and br_q >= gzip_q:
+        return "br"
+    if gzip_q:
+        return "gzip"
+    return None
+
+
+def compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def _compress_stream(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = compressor.process(chunk)
+            if out:
+                yield out
+        yield compressor.finish()
+        return
+
+    # wbits=31 -> zlib writes a gzip header/trailer
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def _is_compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 304):
+        return False
+    if "Content-Encoding" in response.headers:
+        return False
+    if response.direct_passthrough:
+        return False
+    return response.mimetype.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress_response(response):
+    if not _is_compressible(response):
+        return response
+
+    response.vary.add("Accept-Encoding")
+
+    encoding = negotiate_encoding()
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        response.set_data(compress(data, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app):
+    app.after_request(compress_response)
+
+
+def dumps_compact(payload):
+    return current_app.json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+class PrecompressedBody:
+    """
+    A JSON body encoded once, with gzip/br variants built up front so
+    cached responses are never recompressed per request.
+    """
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.etag = content_etag(raw)
+        self.variants = {}
+
+        if len(raw) >= COMPRESS_MIN_SIZE:
+            self.variants["gzip"] = compress(raw, "gzip")
+            if brotli:
+                self.variants["br"] = compress(raw, "br")
+
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(dumps_compact(payload))
+
+    @classmethod
+    def from_parts(cls, raw, etag, variants):
+        """
+        Wrap an already-encoded body (e.g. memoryviews into a shared file).
+        """
+        body = cls.__new__(cls)
+        body.raw = raw
+        body.etag = etag
+        body.variants = variants
+        return body
+
+    def to_response(self, status=200):
+        if status == 200 and is_not_modified(self.etag):
+            return not_modified(self.etag)
+
+        encoding = negotiate_encoding() if self.variants else None
+        body = self.variants.get(encoding)
+
+        # bytes() is a no-op for bytes and copies out shared memoryviews.
+        data = self.raw if body is None else body
+        response = Response(bytes(data), status=status, mimetype="application/json")
+        response.vary.add("Accept-Encoding")
+        if body is not None:
+            response.headers["Content-Encoding"] = encoding
+        if status == 200:
+            set_validators(response, self.etag)
+        return response
+
+
+class ResponseCache:
+    """
+    Small TTL cache of PrecompressedBody objects, keyed by endpoint + args.
+    """
+
+    def __init__(self, ttl=REFERENCE_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key, builder):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry and entry[0] > now:
+            return entry[1]
+
+        body = PrecompressedBody.from_payload(builder())
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, body)
+        return body
+
+    def invalidate(self, prefix=None):
+        with self._lock:
+            if prefix is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+
+response_cache = ResponseCache()
+
+
+def cached_json(key, builder, status=200):
+    """
+    Serve builder()'s payload from the precompressed response cache.
+    """
+    return response_cache.get_or_build(key, builder).to_response(status)
+
+
+def stream_json_list(key, items, formatter=None, extra=None):
+    """
+    Stream {"<key>": [...]} item by item so large lists are never held
+    as one big string; compress_response compresses the stream on the fly.
+    """
+    dumps = current_app.json.dumps
+    head = "{"
+    for name, value in (extra or {}).items():
+        head += dumps(name) + ":" + dumps(value, separators=(",", ":")) + ","
+
+    def generate():
+        yield head + '"%s":[' % key
+        chunk = []
+        first = True
+        for item in items:
+            if formatter:
+                item = formatter(item)
+            chunk.append(dumps(item, separators=(",", ":")))
+            if len(chunk) >= STREAM_CHUNK_ITEMS:
+                yield ("" if first else ",") + ",".join(chunk)
+                first = False
+                chunk = []
+        if chunk:
+            yield ("" if first else ",") + ",".join(chunk)
+        yield "]}"
+
+    return Response(generate(), mimetype="application/json")
+
+
+def json_list_response(key, rows, formatter=None, extra=None):
+    """
+    jsonify small lists, stream large ones.
+    """
+    if len(rows) < STREAM_MIN_ITEMS:
+        items = [formatter(r) for r in rows] if formatter else rows
+        payload = dict(extra or {}, **{key: items})
+        return Response(dumps_compact(payload), mimetype="application/json")
+    return stream_json_list(key, rows, formatter, extra)
@@ -0,0 +1,106 @@
+import hashlib
+import datetime
+from functools import wraps
+from flask import request, make_response, Response, current_app
+
+
+def make_etag(*parts):
+    """
+    Short, stable validator built from row versions (ids, updated_at, counts...).
+    """
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24]
+
+
+def content_etag(body):
+    return hashlib.sha1(body).hexdigest()[:24]
+
+
+def _as_http_date(dt):
+    # DB datetimes are naive; HTTP dates have second precision.
+    if not isinstance(dt, datetime.datetime):
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.replace(microsecond=0)
+
+
+def is_not_modified(etag=None, last_modified=None):
+    """
+    If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2).
+    """
+    if request.method not in ("GET", "HEAD"):
+        return False
+
+    if request.if_none_match:
+        return bool(etag) and request.if_none_match.contains_weak(etag)
+
+    last_modified = _as_http_date(last_modified)
+    since = request.if_modified_since
+    if last_modified and since:
+        return last_modified <= since
+
+    return False
+
+
+def set_validators(response, etag=None, last_modified=None, private=False):
+    if etag:
+        response.set_etag(etag, weak=True)
+
+    last_modified = _as_http_date(last_modified)
+    if last_modified:
+        response.last_modified = last_modified
+
+    response.headers["Cache-Control"] = "private, no-cache" if private else "public, no-cache"
+    return response
+
+
+def not_modified(etag=None, last_modified=None, private=False):
+    response = make_response("", 304)
+    return set_validators(response, etag, last_modified, private)
+
+
+def conditional(validator, private=False):
+    """
+    Answer conditional GETs before the view runs.
+
+    validator(*args, **kwargs) returns (etag, last_modified) computed from a
+    cheap version query, or None when the resource does not exist (the view
+    then runs and produces its usual 404). If the validator fails, the view
+    runs unconditionally and reports errors in its own format.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                validators = validator(*args, **kwargs)
+            except Exception:
+                current_app.logger.exception("Conditional validator failed")
+                validators = None
+            if validators is None:
+                return f(*args, **kwargs)
+
+            etag, last_modified = validators
+            if is_not_modified(etag, last_modified):
+                return not_modified(etag, last_modified, private)
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, etag, last_modified, private)
+            return response
+
+        return decorated
+    return decorator
+
+
+def conditional_json(body, etag=None, private=False, last_modified=None):
+    """
+    Serve an already-serialized JSON body, answering 304 when the
+    client's copy (by ETag, content hash by default) is current.
+    """
+    etag = etag or content_etag(body)
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified, private)
+
+    response = Response(body, mimetype="application/json")
+    return set_validators(response, etag, last_modified, private)
@@ -0,0 +1,53 @@
+import os
+from dotenv import load_dotenv
+
+# The one place .env is read. Modules that take settings from os.environ
+# at import time rely on this having run first (app.py imports it first).
+load_dotenv()
+
+SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this")
+
+DB_SETTINGS = {
+    "host": os.environ.get("DB_HOST", "localhost"),
+    "user": os.environ.get("DB_USER", "root"),
+    "password": os.environ.get("DB_PASSWORD", ""),
+    "db": os.environ.get("DB_NAME", "sisjk"),
+}
+
+
+class Config:
+    SECRET_KEY = SECRET_KEY
+    DEBUG = False
+    # Largest accepted request body in bytes; unlimited unless set.
+    MAX_CONTENT_LENGTH = int(os.environ["MAX_CONTENT_LENGTH"]) if os.environ.get("MAX_CONTENT_LENGTH") else None
+    CORS_ORIGINS = os.environ.get("CORS_ORIGINS", "*")
+    # Load reference data, search and map indexes before serving.
+    WARM_CACHES = False
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class ProductionConfig(Config):
+    WARM_CACHES = True
+
+
+CONFIGS = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+}
+
+
+def load_config(config=None):
+    """
+    A config class, or its name; defaults to APP_ENV (development).
+    """
+    if config is None:
+        config = os.environ.get("APP_ENV", "development")
+    if isinstance(config, str):
+        try:
+            return CONFIGS[config]
+        except KeyError:
+            raise ValueError(f"Unknown config '{config}' (expected one of {', '.join(CONFIGS)})")
+    return config
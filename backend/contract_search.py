@@ -0,0 +1,65 @@
+# Full-text search over contracts.
+#
+# contract_search holds one row per contract: a denormalized document
+# (commodity, variety, farm and location names, quality, farming techniques)
+# under a FULLTEXT index, plus the status/owner/created_at columns the
+# marketplace filters on. Rows are written from the contract write paths.
+
+DOCUMENT_SQL = """
+    REPLACE INTO contract_search
+        (contract_id, user_id, contract_status, created_at, document)
+    SELECT
+        c.contract_id, c.user_id, c.contract_status, c.created_at,
+        CONCAT_WS(' ',
+            com.commodity_name, v.variety_name, f.farm_name,
+            d.division_name, dist.district_name, t.tehsil_name, b.block_name,
+            c.commodity_quality, c.farming_techniques
+        )
+    FROM contracts c
+    JOIN m_farm f ON f.farm_id = c.farm_id
+    JOIN m_commodity com ON com.commodity_id = c.commodity_id
+    JOIN m_commodity_variety v ON v.variety_id = c.variety_id
+    LEFT JOIN m_division d ON d.division_id = f.farm_division
+    LEFT JOIN m_district dist ON dist.district_id = f.farm_district
+    LEFT JOIN m_tehsil t ON t.tehsil_id = f.farm_tehsil
+    LEFT JOIN m_block b ON b.block_id = f.farm_block
+    WHERE c.contract_id IN %s
+"""
+
+# Relevance decays by half for every RECENCY_HALF_LIFE_DAYS of contract age.
+RECENCY_HALF_LIFE_DAYS = 30
+
+SEARCH_SQL = """
+    SELECT contract_id,
+           MATCH(document) AGAINST (%s IN NATURAL LANGUAGE MODE) AS relevance
+    FROM contract_search
+    WHERE contract_status = 'open'
+      AND user_id != %s
+      AND MATCH(document) AGAINST (%s IN NATURAL LANGUAGE MODE)
+    ORDER BY relevance * POW(0.5, DATEDIFF(NOW(), created_at) / {half_life}) DESC,
+             created_at DESC
+    LIMIT %s OFFSET %s
+""".format(half_life=RECENCY_HALF_LIFE_DAYS)
+
+
+def index_contracts(cursor, contract_ids):
+    """
+    (Re)build the search documents of the given contracts.
+    """
+    if contract_ids:
+        cursor.execute(DOCUMENT_SQL, (tuple(contract_ids),))
+
+
+def set_search_status(cursor, contract_id, status):
+    cursor.execute(
+        "UPDATE contract_search SET contract_status=%s WHERE contract_id=%s",
+        (status, contract_id)
+    )
+
+
+def search_contracts(cursor, query, exclude_user_id, limit, offset):
+    """
+    Open contracts matching query, best first. Returns [(contract_id, relevance)].
+    """
+    cursor.execute(SEARCH_SQL, (query, exclude_user_id, query, limit, offset))
+    return [(r["contract_id"], r["relevance"]) for r in cursor.fetchall()]
@@ -13,13 +13,86 @@
 
 import pymysql
 import os
+import queue
+import threading
+from contextlib import contextmanager
+from pymysql.constants import CLIENT
+from config import DB_SETTINGS
 
-def get_db():
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+DB_MULTI_POOL_SIZE = int(os.environ.get("DB_MULTI_POOL_SIZE", 2))
+
+
+def get_db(**extra):
     return pymysql.connect(
-        host=os.environ.get("DB_HOST", "localhost"),
-        user=os.environ.get("DB_USER", "root"),
-        password=os.environ.get("DB_PASSWORD", ""),
-        db=os.environ.get("DB_NAME", "sisjk"),
         cursorclass=pymysql.cursors.DictCursor,
-        autocommit=True
+        autocommit=True,
+        **DB_SETTINGS,
+        **extra
     )
+
+
+class ConnectionPool:
+    """
+    Small thread-safe pool of open connections.
+
+    Checkout pings (reconnecting if the server dropped us); at most `size`
+    idle connections are kept, extra ones are closed on return.
+    """
+
+    def __init__(self, size, **connect_kwargs):
+        self.size = size
+        self.connect_kwargs = connect_kwargs
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def _checkout(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return get_db(**self.connect_kwargs)
+
+        conn.ping(reconnect=True)
+        return conn
+
+    def _checkin(self, conn):
+        if self._idle.qsize() < self.size:
+            self._idle.put(conn)
+        else:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        except Exception:
+            # Don't hand a half-read or mid-transaction connection to the next caller.
+            conn.close()
+            raise
+        else:
+            self._checkin(conn)
+
+    def reset(self):
+        """
+        Drop every idle connection (e.g. after fork: sockets must not be shared).
+        """
+        with self._lock:
+            while True:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+
+db_pool = ConnectionPool(DB_POOL_SIZE)
+
+# Multi-statement enabled so a read can batch several SELECTs into one
+# round trip and walk the results with cursor.nextset(). Kept apart from
+# db_pool so stacked queries are only possible where they are meant to be
+# (the contract bundle); use it for fixed, parameterized SQL only.
+multi_statement_pool = ConnectionPool(DB_MULTI_POOL_SIZE, client_flag=CLIENT.MULTI_STATEMENTS)
@@ -0,0 +1,297 @@
+import os
+import math
+import time
+import datetime
+import threading
+from itertools import islice
+from collections import deque
+from db import get_db
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+GEO_GRID_DEGREES = float(os.environ.get("GEO_GRID_DEGREES", 0.25))
+GEO_SYNC_SECONDS = int(os.environ.get("GEO_SYNC_SECONDS", 10))
+GEO_REBUILD_SECONDS = int(os.environ.get("GEO_REBUILD_SECONDS", 900))
+GEO_SYNC_LAG_SECONDS = int(os.environ.get("GEO_SYNC_LAG_SECONDS", 60))
+GEO_CHANGE_LOG_SIZE = int(os.environ.get("GEO_CHANGE_LOG_SIZE", 10000))
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid. A radius query only visits the cells overlapping
+    the query's bounding box, then refines candidates with haversine.
+    """
+
+    def __init__(self, cell_degrees=GEO_GRID_DEGREES):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.points = {}
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_degrees)),
+                int(math.floor(lon / self.cell_degrees)))
+
+    def insert(self, key, lat, lon, props=None):
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self.points[key] = (lat, lon, cell, props or {})
+        self.cells.setdefault(cell, set()).add(key)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point:
+            members = self.cells.get(point[2])
+            members.discard(key)
+            if not members:
+                del self.cells[point[2]]
+
+    def within(self, lat, lon, radius_km):
+        """
+        [(distance_km, key, props)] inside radius_km, nearest first.
+        """
+        dlat = radius_km / KM_PER_DEGREE
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        dlon = min(radius_km / (KM_PER_DEGREE * cos_lat), 180)
+
+        i0, j0 = self._cell(lat - dlat, lon - dlon)
+        i1, j1 = self._cell(lat + dlat, lon + dlon)
+
+        box_cells = (i1 - i0 + 1) * (j1 - j0 + 1)
+        if box_cells <= len(self.cells):
+            cells = ((i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1))
+        else:
+            cells = (c for c in self.cells if i0 <= c[0] <= i1 and j0 <= c[1] <= j1)
+
+        hits = []
+        for cell in cells:
+            for key in self.cells.get(cell, ()):
+                plat, plon, _, props = self.points[key]
+                if abs(plat - lat) > dlat:
+                    continue
+                distance = haversine_km(lat, lon, plat, plon)
+                if distance <= radius_km:
+                    hits.append((distance, key, props))
+
+        hits.sort(key=lambda h: h[0])
+        return hits
+
+
+class GeoLayer:
+    """
+    A GridIndex kept in sync with MySQL.
+
+    Write paths in this worker apply changes immediately (upsert/remove).
+    Every GEO_SYNC_SECONDS the layer pulls rows changed since its watermark,
+    which picks up writes made by other workers; a full rebuild every
+    GEO_REBUILD_SECONDS catches deletes.
+
+    A row's updated_at is set when its statement runs, not when the
+    transaction commits, so each sync re-reads GEO_SYNC_LAG_SECONDS before
+    the watermark. Re-applying an unchanged row doesn't bump the version.
+
+    Every version bump is one point change, kept in a change log of the
+    last GEO_CHANGE_LOG_SIZE changes so the map clusters can follow the
+    layer incrementally (see changes_since). A full rebuild logs its
+    differences from the previous index.
+    """
+
+    def __init__(self, name, load_sql, changed_sql, key_field, props_fields, is_live=None):
+        self.name = name
+        self.load_sql = load_sql
+        self.changed_sql = changed_sql
+        self.key_field = key_field
+        self.props_fields = props_fields
+        self.is_live = is_live or (lambda row: True)
+        self.index = None
+        self.version = 0
+        self.changes = deque(maxlen=GEO_CHANGE_LOG_SIZE)
+        self._watermark = None
+        self._synced_at = 0
+        self._built_at = 0
+        self._lock = threading.RLock()
+
+    def _apply(self, row):
+        key = row[self.key_field]
+        lat, lon = row["location_latitude"], row["location_longitude"]
+        old = self.index.points.get(key)
+        if lat is None or lon is None or not self.is_live(row):
+            self.index.remove(key)
+        else:
+            props = {f: row[f] for f in self.props_fields}
+            self.index.insert(key, float(lat), float(lon), props)
+        self._changed(key, old)
+
+    def _changed(self, key, old):
+        new = self.index.points.get(key)
+        if new != old:
+            self.version += 1
+            self.changes.append((self.version, key, old, new))
+
+    def changes_since(self, version):
+        """
+        (version, [(key, old point, new point)]) for the changes after
+        `version`, oldest first. The list is None when some of them have
+        already left the change log.
+        """
+        with self._lock:
+            if version == self.version:
+                return version, []
+            if not self.changes or self.changes[0][0] > version + 1:
+                return self.version, None
+            skip = version + 1 - self.changes[0][0]
+            return self.version, [c[1:] for c in islice(self.changes, skip, None)]
+
+    def _db_now(self, cur):
+        cur.execute("SELECT NOW() AS now")
+        return cur.fetchone()["now"]
+
+    def _rebuild(self, cur):
+        now = self._db_now(cur)
+        cur.execute(self.load_sql)
+        index = GridIndex()
+        for row in cur.fetchall():
+            if self.is_live(row):
+                props = {f: row[f] for f in self.props_fields}
+                index.insert(row[self.key_field], float(row["location_latitude"]),
+                             float(row["location_longitude"]), props)
+        old, self.index = self.index, index
+        if old is None:
+            self.version += 1
+        else:
+            for key in old.points.keys() | index.points.keys():
+                self._changed(key, old.points.get(key))
+        self._watermark = now
+        self._built_at = time.monotonic()
+
+    def _sync(self, cur):
+        now = self._db_now(cur)
+        since = self._watermark - datetime.timedelta(seconds=GEO_SYNC_LAG_SECONDS)
+        cur.execute(self.changed_sql, (since,))
+        for row in cur.fetchall():
+            self._apply(row)
+        self._watermark = now
+
+    def get(self):
+        now = time.monotonic()
+        if self.index is not None and now - self._synced_at < GEO_SYNC_SECONDS:
+            return self.index
+
+        with self._lock:
+            if self.index is not None and time.monotonic() - self._synced_at < GEO_SYNC_SECONDS:
+                return self.index
+
+            db = get_db()
+            try:
+                cur = db.cursor()
+                if self.index is None or now - self._built_at >= GEO_REBUILD_SECONDS:
+                    self._rebuild(cur)
+                else:
+                    self._sync(cur)
+            finally:
+                db.close()
+
+            self._synced_at = time.monotonic()
+            return self.index
+
+    def within(self, lat, lon, radius_km):
+        index = self.get()
+        with self._lock:
+            return index.within(lat, lon, radius_km)
+
+    def refresh_rows(self, cursor, sql, params):
+        """
+        Re-read specific rows (by id) after a local write.
+        """
+        if self.index is None:
+            return
+        cursor.execute(sql, params)
+        with self._lock:
+            for row in cursor.fetchall():
+                self._apply(row)
+
+    def remove(self, key):
+        if self.index is None:
+            return
+        with self._lock:
+            old = self.index.points.get(key)
+            self.index.remove(key)
+            self._changed(key, old)
+
+
+# -----------------------------------------------------------------
+# Layers
+# -----------------------------------------------------------------
+CONTRACT_POINTS_SQL = """
+    SELECT c.contract_id, c.contract_status, c.user_id, c.farm_id, c.commodity_id,
+           f.location_latitude, f.location_longitude
+    FROM contracts c
+    JOIN m_farm f ON f.farm_id = c.farm_id
+"""
+
+# updated_at moves on every contract write; >= keeps same-second writes.
+# Syncs overlap by GEO_SYNC_LAG_SECONDS, which is harmless: _apply only
+# bumps the version when a point actually changes.
+open_contracts = GeoLayer(
+    "open_contracts",
+    load_sql=CONTRACT_POINTS_SQL + """
+        WHERE c.contract_status = 'open'
+          AND f.location_latitude IS NOT NULL
+          AND f.location_longitude IS NOT NULL
+    """,
+    changed_sql=CONTRACT_POINTS_SQL + " WHERE c.updated_at >= %s",
+    key_field="contract_id",
+    props_fields=("user_id", "farm_id", "commodity_id"),
+    is_live=lambda row: (row["contract_status"] or "").lower() == "open",
+)
+
+FARM_POINTS_SQL = """
+    SELECT farm_id, user_id, location_latitude, location_longitude
+    FROM m_farm
+"""
+
+farms = GeoLayer(
+    "farms",
+    load_sql=FARM_POINTS_SQL + """
+        WHERE location_latitude IS NOT NULL
+          AND location_longitude IS NOT NULL
+    """,
+    changed_sql=FARM_POINTS_SQL + " WHERE updated_at >= %s",
+    key_field="farm_id",
+    props_fields=("user_id",),
+)
+
+
+def contracts_changed(cursor, contract_ids):
+    open_contracts.refresh_rows(
+        cursor,
+        CONTRACT_POINTS_SQL + " WHERE c.contract_id IN %s",
+        (tuple(contract_ids),)
+    )
+
+
+def farm_changed(cursor, farm_id):
+    farms.refresh_rows(cursor, FARM_POINTS_SQL + " WHERE farm_id = %s", (farm_id,))
+
+
+def farm_deleted(farm_id):
+    farms.remove(farm_id)
+
+    if open_contracts.index is None:
+        return
+    with open_contracts._lock:
+        stale = [
+            key for key, point in open_contracts.index.points.items()
+            if point[3].get("farm_id") == farm_id
+        ]
+        for key in stale:
+            open_contracts.remove(key)
@@ -0,0 +1,105 @@
+"""
+gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden from the environment.
+"""
+import os
+import sys
+import threading
+import subprocess
+import multiprocessing
+
+bind = os.environ.get("BIND", "0.0.0.0:5005")
+
+# Requests mostly wait on MySQL and disk, so a few processes with a thread
+# pool each; bcrypt and PIL release the GIL for the CPU-heavy parts.
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2, 8)))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+
+# Build the app (and warm its caches) once in the master; workers inherit it.
+preload_app = True
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+keepalive = 5
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = max_requests // 10
+
+# On SIGTERM a worker stops accepting and finishes what it has; give
+# multi-image uploads on slow links time to complete.
+UPLOAD_DRAIN_SECONDS = int(os.environ.get("UPLOAD_DRAIN_SECONDS", 60))
+graceful_timeout = UPLOAD_DRAIN_SECONDS + 5
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+
+
+# With SHARED_REFERENCE_DIR set, one publisher process keeps the shared
+# reference snapshot files current for every worker on this node.
+# The arbiter restarts it if it exits.
+SHARED_REFERENCE_DIR = os.environ.get("SHARED_REFERENCE_DIR", "")
+PUBLISHER_CHECK_SECONDS = 5
+_publisher = None
+_stopping = threading.Event()
+
+
+def _start_publisher(server):
+    global _publisher
+    _publisher = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(__file__), "shared_reference.py")],
+        cwd=os.path.dirname(__file__)
+    )
+    server.log.info("Started reference publisher (pid %s)", _publisher.pid)
+
+
+def _supervise_publisher(server):
+    # poll() also notices an exit the arbiter's own child reaping saw first
+    # (its exit code is lost then, so it is not logged).
+    while not _stopping.wait(PUBLISHER_CHECK_SECONDS):
+        if _publisher.poll() is not None:
+            server.log.error("Reference publisher (pid %s) exited; restarting", _publisher.pid)
+            _start_publisher(server)
+
+
+def when_ready(server):
+    if SHARED_REFERENCE_DIR:
+        _start_publisher(server)
+        threading.Thread(
+            target=_supervise_publisher, args=(server,), name="publisher-supervisor", daemon=True
+        ).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _publisher is not None:
+        _publisher.terminate()
+        _publisher.wait(timeout=10)
+
+
+def pre_fork(server, worker):
+    # Each live worker gets its own contract-id slot (ids.node_id_for);
+    # slots of exited workers are reused. Old workers still draining after
+    # a reload keep theirs, hence more slots than workers.
+    from ids import ID_SLOTS_PER_NODE
+    taken = {getattr(w, "id_slot", None) for w in server.WORKERS.values()}
+    worker.id_slot = next((s for s in range(ID_SLOTS_PER_NODE) if s not in taken), None)
+
+
+def post_fork(server, worker):
+    import ids
+    from lifecycle import after_fork
+
+    # Raising here fails the boot and stops the arbiter: better than
+    # two workers issuing the same ids.
+    if worker.id_slot is None:
+        raise RuntimeError(f"No free contract-id slot (ID_SLOTS_PER_NODE={ids.ID_SLOTS_PER_NODE})")
+    ids.set_node_id(ids.node_id_for(worker.id_slot))
+    after_fork()
+
+
+def worker_int(worker):
+    # SIGINT/SIGQUIT exits at once; still let running uploads finish.
+    from lifecycle import uploads
+    if uploads.inflight:
+        worker.log.info("Waiting for %d upload(s) to finish", uploads.inflight)
+        if not uploads.wait(UPLOAD_DRAIN_SECONDS):
+            worker.log.warning("%d upload(s) still running at exit", uploads.inflight)
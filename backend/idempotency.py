@@ -0,0 +1,218 @@
+import os
+import time
+import hashlib
+from functools import wraps
+from flask import request, jsonify, make_response, Response
+from cache import LRUCache
+from db import db_pool
+
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", 86400))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("IDEMPOTENCY_CACHE_SIZE", 4096))
+IDEMPOTENCY_PURGE_SECONDS = 600
+# An unfinished claim older than this belongs to a worker that died
+# mid-request (timeout kill, OOM, deploy); a retry may take it over.
+IDEMPOTENCY_CLAIM_LEASE = int(os.environ.get(
+    "IDEMPOTENCY_CLAIM_LEASE", 2 * int(os.environ.get("GUNICORN_TIMEOUT", 60))
+))
+MAX_KEY_LENGTH = 128
+
+# Completed responses only; in-flight claims live in the table so that
+# every worker sees them.
+completed = LRUCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL)
+_purged_at = 0
+
+
+def request_fingerprint():
+    digest = hashlib.sha1()
+
+    if request.mimetype == "multipart/form-data":
+        # A retried upload gets a fresh multipart boundary: hash the parts.
+        for name, value in sorted(request.form.items(multi=True)):
+            digest.update(f"{name}={value}\n".encode("utf-8"))
+        for name, file in sorted(request.files.items(multi=True), key=lambda i: i[0]):
+            digest.update(f"{name}:{file.filename}:".encode("utf-8"))
+            for chunk in iter(lambda: file.stream.read(65536), b""):
+                digest.update(chunk)
+            file.stream.seek(0)
+    else:
+        # Cached, so the view still sees the body.
+        digest.update(request.get_data(cache=True))
+
+    return digest.hexdigest()
+
+
+def replay(entry):
+    _, status, content_type, body = entry
+    response = Response(body, status=status, content_type=content_type)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def mismatch():
+    return jsonify({
+        "message": "Idempotency-Key was already used with a different request"
+    }), 422
+
+
+def in_progress():
+    response = jsonify({"message": "A request with this Idempotency-Key is in progress"})
+    response.status_code = 409
+    response.headers["Retry-After"] = "1"
+    return response
+
+
+def _purge_expired(cur):
+    global _purged_at
+    if time.monotonic() - _purged_at < IDEMPOTENCY_PURGE_SECONDS:
+        return
+    _purged_at = time.monotonic()
+    cur.execute(
+        """
+        DELETE FROM idempotency_keys
+        WHERE created_at < NOW() - INTERVAL %s SECOND
+        LIMIT 5000
+        """,
+        (IDEMPOTENCY_TTL,)
+    )
+
+
+def _claim(cur, scope, fingerprint):
+    """
+    True if this request now owns the key, else the existing row
+    (None if the key could not be settled; treat as in progress).
+    created_at is the claim time: rows are only ever inserted here.
+    """
+    user_id, endpoint, key = scope
+    stale = """
+        (created_at < NOW() - INTERVAL %s SECOND
+         OR (status_code IS NULL AND created_at < NOW() - INTERVAL %s SECOND))
+    """
+    for _ in range(2):
+        cur.execute(
+            """
+            INSERT IGNORE INTO idempotency_keys
+                (user_id, endpoint, idem_key, request_hash, created_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            """,
+            (user_id, endpoint, key, fingerprint)
+        )
+        if cur.rowcount:
+            return True
+
+        cur.execute(
+            """
+            SELECT request_hash, status_code, content_type, response_body,
+                   """ + stale + """ AS stale
+            FROM idempotency_keys
+            WHERE user_id=%s AND endpoint=%s AND idem_key=%s
+            """,
+            (IDEMPOTENCY_TTL, IDEMPOTENCY_CLAIM_LEASE, user_id, endpoint, key)
+        )
+        row = cur.fetchone()
+        if row and not row["stale"]:
+            return row
+
+        # Expired, abandoned (or purged in between): drop it and claim
+        # again. Re-checked in the DELETE so a concurrent retry's fresh
+        # claim is never removed.
+        cur.execute(
+            """
+            DELETE FROM idempotency_keys
+            WHERE user_id=%s AND endpoint=%s AND idem_key=%s AND """ + stale,
+            (user_id, endpoint, key, IDEMPOTENCY_TTL, IDEMPOTENCY_CLAIM_LEASE)
+        )
+    return None
+
+
+def _record(cur, scope, response):
+    user_id, endpoint, key = scope
+    cur.execute(
+        """
+        UPDATE idempotency_keys
+        SET status_code=%s, content_type=%s, response_body=%s
+        WHERE user_id=%s AND endpoint=%s AND idem_key=%s
+        """,
+        (response.status_code, response.content_type, response.get_data(),
+         user_id, endpoint, key)
+    )
+
+
+def _release(cur, scope):
+    cur.execute(
+        "DELETE FROM idempotency_keys WHERE user_id=%s AND endpoint=%s AND idem_key=%s",
+        scope
+    )
+
+
+def idempotent(endpoint, user_id_fn):
+    """
+    Honour an Idempotency-Key header on a POST view.
+
+    The first request with a key claims it (INSERT IGNORE) and its response
+    is recorded; retries within IDEMPOTENCY_TTL get that response replayed
+    instead of running the view again. Reusing a key for a different body
+    is a 422, a retry while the first is still running a 409. 5xx responses
+    and exceptions release the key so the client can try again; a claim
+    left unfinished for IDEMPOTENCY_CLAIM_LEASE seconds (its worker died)
+    is taken over by the next retry.
+    Requests without the header (or without a user) run unchanged.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            key = request.headers.get("Idempotency-Key")
+            if not key:
+                return f(*args, **kwargs)
+            if len(key) > MAX_KEY_LENGTH:
+                return jsonify({"message": "Idempotency-Key is too long"}), 400
+
+            user_id = user_id_fn()
+            if not user_id:
+                return f(*args, **kwargs)
+
+            scope = (user_id, endpoint, key)
+            fingerprint = request_fingerprint()
+
+            entry = completed.get(scope)
+            if entry is not None:
+                return replay(entry) if entry[0] == fingerprint else mismatch()
+
+            with db_pool.connection() as conn:
+                cur = conn.cursor()
+                _purge_expired(cur)
+                claim = _claim(cur, scope, fingerprint)
+
+            if claim is None:
+                return in_progress()
+            if claim is not True:
+                if claim["request_hash"] != fingerprint:
+                    return mismatch()
+                if claim["status_code"] is None:
+                    return in_progress()
+                entry = (fingerprint, claim["status_code"],
+                         claim["content_type"], claim["response_body"])
+                completed.set(scope, entry)
+                return replay(entry)
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                with db_pool.connection() as conn:
+                    _release(conn.cursor(), scope)
+                raise
+
+            with db_pool.connection() as conn:
+                cur = conn.cursor()
+                if response.status_code >= 500 or response.is_streamed:
+                    _release(cur, scope)
+                else:
+                    _record(cur, scope, response)
+                    completed.set(scope, (
+                        fingerprint, response.status_code,
+                        response.content_type, response.get_data()
+                    ))
+
+            return response
+
+        return decorated
+    return decorator
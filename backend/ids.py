@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+
+# Snowflake layout, 63 bits:
+#   41 bits  milliseconds since ID_EPOCH_MS  (~69 years)
+#   10 bits  node id                          (0..1023)
+#   12 bits  per-millisecond sequence         (4096 ids/ms/node)
+# Rendered as "C" + 20 zero-padded digits, so string order == time order.
+
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+NODE_BITS = 10
+SEQUENCE_BITS = 12
+MAX_NODE_ID = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+ID_DIGITS = 20
+
+
+# NODE_ID numbers this host (0, 1, 2, ...; unique per host). Each host owns
+# ID_SLOTS_PER_NODE consecutive node ids: a single process uses slot 0,
+# gunicorn hands every live worker its own slot (gunicorn.conf.py).
+ID_SLOTS_PER_NODE = int(os.environ.get("ID_SLOTS_PER_NODE", 32))
+
+
+def node_id_for(slot):
+    """
+    The node id of `slot` on this host. Raises ValueError when the slot or
+    the resulting id is out of range: never guess an id.
+    """
+    base = int(os.environ.get("NODE_ID", 0))
+    if not 0 <= slot < ID_SLOTS_PER_NODE:
+        raise ValueError(f"id slot {slot} out of range 0..{ID_SLOTS_PER_NODE - 1}")
+    node_id = base * ID_SLOTS_PER_NODE + slot
+    if not 0 <= node_id <= MAX_NODE_ID:
+        raise ValueError(
+            f"NODE_ID={base} with ID_SLOTS_PER_NODE={ID_SLOTS_PER_NODE} "
+            f"gives node id {node_id}, outside 0..{MAX_NODE_ID}"
+        )
+    return node_id
+
+
+class IdGenerator:
+    """
+    Thread-safe, coordination-free k-sortable id generator.
+
+    If the wall clock steps backwards the generator keeps issuing ids from
+    the last timestamp it used; when a millisecond's sequence runs out it
+    borrows the next millisecond instead of sleeping.
+    """
+
+    def __init__(self, node_id=None):
+        self._lock = threading.Lock()
+        self.set_node_id(node_id_for(0) if node_id is None else node_id)
+
+    def set_node_id(self, node_id):
+        if not 0 <= node_id <= MAX_NODE_ID:
+            raise ValueError(f"node id must be in 0..{MAX_NODE_ID}")
+        with self._lock:
+            self.node_id = node_id
+            self._last_ms = -1
+            self._sequence = 0
+
+    def clear_node_id(self):
+        with self._lock:
+            self.node_id = None
+
+    def _next_locked(self):
+        if self.node_id is None:
+            raise RuntimeError("No node id assigned to this process; call ids.set_node_id()")
+
+        now = int(time.time() * 1000) - ID_EPOCH_MS
+        if now > self._last_ms:
+            self._last_ms = now
+            self._sequence = 0
+        else:
+            self._sequence += 1
+            if self._sequence > MAX_SEQUENCE:
+                self._last_ms += 1
+                self._sequence = 0
+
+        return (
+            (self._last_ms << (NODE_BITS + SEQUENCE_BITS))
+            | (self.node_id << SEQUENCE_BITS)
+            | self._sequence
+        )
+
+    def next_int(self):
+        with self._lock:
+            return self._next_locked()
+
+    def next_ints(self, count):
+        with self._lock:
+            return [self._next_locked() for _ in range(count)]
+
+
+def format_contract_id(value):
+    return "C" + str(value).zfill(ID_DIGITS)
+
+
+def parse_contract_id(contract_id):
+    """
+    (timestamp_ms, node_id, sequence) of a generated id.
+    """
+    value = int(contract_id[1:])
+    return (
+        (value >> (NODE_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS,
+        (value >> SEQUENCE_BITS) & MAX_NODE_ID,
+        value & MAX_SEQUENCE,
+    )
+
+
+generator = IdGenerator()
+
+
+def set_node_id(node_id):
+    generator.set_node_id(node_id)
+
+
+def new_contract_id():
+    return format_contract_id(generator.next_int())
+
+
+def new_contract_ids(count):
+    return [format_contract_id(v) for v in generator.next_ints(count)]
+
+
+def _after_fork():
+    # A forked child must neither continue the parent's (node, sequence)
+    # stream nor share its node id with siblings, and nothing here can
+    # pick a unique one: refuse to issue ids until the pre-fork server
+    # assigns a slot (gunicorn.conf.py post_fork -> set_node_id).
+    generator._lock = threading.Lock()
+    generator.clear_node_id()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
@@ -1,5 +0,0 @@
-
-
-def init():
-    return
-    
\ No newline at end of file
@@ -0,0 +1,127 @@
+import gc
+import importlib
+import time
+import logging
+import threading
+from flask import request, g
+
+log = logging.getLogger(__name__)
+
+
+# Imported lazily by the routes that need them (see
+# scripts/import_report.py); a preloading master imports them up front so
+# forked workers share them instead of each paying on first use.
+LAZY_MODULES = ("PIL.Image", "bcrypt")
+
+
+def preload_modules():
+    for name in LAZY_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            log.warning("Could not preload %s", name)
+
+
+def warm_caches():
+    """
+    Load the in-memory reference data and indexes once, before the server
+    forks, so every worker starts with them shared copy-on-write instead of
+    each one querying MySQL on its first requests. Failures are logged and
+    left to the normal lazy load.
+    """
+    from reference_data import commodity_snapshot, location_snapshot
+    from autocomplete import get_index
+    from geo_index import open_contracts, farms
+    from map_clusters import layers
+    from shared_reference import SHARED_REFERENCE_DIR, publish_all
+
+    if SHARED_REFERENCE_DIR:
+        # Workers map these files instead of each loading the tables.
+        publish_all()
+
+    steps = [
+        ("commodities", commodity_snapshot.get),
+        ("locations", location_snapshot.get),
+        ("autocomplete", get_index),
+        ("geo open_contracts", open_contracts.get),
+        ("geo farms", farms.get),
+    ] + [(f"map {name}", layer.get) for name, layer in layers.items()]
+
+    for name, load in steps:
+        start = time.monotonic()
+        try:
+            load()
+        except Exception:
+            log.exception("Warming %s failed", name)
+            continue
+        log.info("Warmed %s in %.0f ms", name, (time.monotonic() - start) * 1000)
+
+    preload_modules()
+
+    # Keep the collector from touching (and so un-sharing) the pages that
+    # hold these objects in every worker.
+    gc.freeze()
+
+
+def after_fork():
+    """
+    Per-worker setup: fresh DB pools (never reuse the master's sockets)
+    and, with CACHE_URL set, the cache invalidation listener. The password
+    pool, id generator, revocation list and shared cache tier reset
+    themselves through os.register_at_fork.
+    """
+    from db import db_pool, multi_statement_pool
+    from cache import start_listener
+
+    start_listener()
+
+    db_pool.reset()
+    multi_statement_pool.reset()
+    try:
+        with db_pool.connection():
+            pass
+    except Exception:
+        log.exception("Could not open a DB connection in the new worker")
+
+
+class UploadTracker:
+    """
+    Counts multipart requests in progress so shutdown can wait for them.
+    """
+
+    def __init__(self):
+        self.inflight = 0
+        self._idle = threading.Condition()
+
+    def begin(self):
+        with self._idle:
+            self.inflight += 1
+
+    def end(self):
+        with self._idle:
+            self.inflight -= 1
+            if not self.inflight:
+                self._idle.notify_all()
+
+    def wait(self, timeout):
+        """
+        Block until no upload is running or timeout passes; True if drained.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.inflight, timeout)
+
+
+uploads = UploadTracker()
+
+
+def init_upload_tracking(app):
+    @app.before_request
+    def track_upload():
+        if request.mimetype == "multipart/form-data":
+            uploads.begin()
+            g.tracked_upload = True
+
+    @app.teardown_request
+    def untrack_upload(exc=None):
+        if g.pop("tracked_upload", False):
+            uploads.end()
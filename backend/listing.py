@@ -0,0 +1,101 @@
+import click
+from db import get_db
+
+# contract_listing is a flattened read model of contracts: one row per
+# contract holding every field format_available_contract needs, so the
+# trader marketplace reads a single table. Write paths refresh it inside
+# the same transaction as the change.
+
+LISTING_COLUMNS = """
+    id, contract_id, contract_status, created_at, updated_at,
+    user_id, farmer_name, trader_user_id,
+    commodity_id, commodity_name, variety_id, variety_name, commodity_quality,
+    crop_quantity_amount, crop_quantity_unit,
+    base_price, price_unit, harvesting_date,
+    farm_id, farm_name,
+    farm_division, division_name, farm_district, district_name,
+    farm_tehsil, tehsil_name, farm_block, block_name,
+    negotiations
+"""
+
+LISTING_SOURCE_SQL = """
+    SELECT
+        c.id, c.contract_id, c.contract_status, c.created_at, c.updated_at,
+        c.user_id, u.full_name, c.trader_user_id,
+        c.commodity_id, com.commodity_name, c.variety_id, v.variety_name, c.commodity_quality,
+        c.crop_quantity_amount, c.crop_quantity_unit,
+        c.base_price, c.price_unit, c.harvesting_date,
+        f.farm_id, f.farm_name,
+        f.farm_division, d.division_name, f.farm_district, dist.district_name,
+        f.farm_tehsil, t.tehsil_name, f.farm_block, b.block_name,
+        c.negotiations
+    FROM contracts c
+    JOIN m_farm f ON f.farm_id = c.farm_id
+    JOIN m_commodity com ON com.commodity_id = c.commodity_id
+    JOIN m_commodity_variety v ON v.variety_id = c.variety_id
+    JOIN m_user_login u ON u.user_id = c.user_id
+    LEFT JOIN m_division d ON d.division_id = f.farm_division
+    LEFT JOIN m_district dist ON dist.district_id = f.farm_district
+    LEFT JOIN m_tehsil t ON t.tehsil_id = f.farm_tehsil
+    LEFT JOIN m_block b ON b.block_id = f.farm_block
+"""
+
+REFRESH_SQL = (
+    "REPLACE INTO contract_listing (" + LISTING_COLUMNS + ") "
+    + LISTING_SOURCE_SQL
+)
+
+
+def refresh_listing(cursor, contract_ids):
+    """
+    Re-project the given contracts. Call inside the writing transaction.
+    """
+    if contract_ids:
+        cursor.execute(REFRESH_SQL + " WHERE c.contract_id IN %s", (tuple(contract_ids),))
+
+
+def refresh_farmer_name(cursor, user_id, full_name):
+    cursor.execute(
+        "UPDATE contract_listing SET farmer_name=%s WHERE user_id=%s",
+        (full_name, user_id)
+    )
+
+
+def remove_farm_listings(cursor, farm_id):
+    cursor.execute("DELETE FROM contract_listing WHERE farm_id=%s", (farm_id,))
+
+
+def rebuild_listing(cursor, batch_size=1000, echo=print):
+    """
+    Backfill the whole read model in id-range batches, then drop rows
+    whose contract no longer exists.
+    """
+    cursor.execute("SELECT MIN(id) AS lo, MAX(id) AS hi FROM contracts")
+    bounds = cursor.fetchone()
+
+    if bounds["lo"] is not None:
+        for start in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+            cursor.execute(
+                REFRESH_SQL + " WHERE c.id BETWEEN %s AND %s",
+                (start, start + batch_size - 1)
+            )
+            echo(f"contract_listing: ids {start}..{start + batch_size - 1}")
+
+    cursor.execute("""
+        DELETE l FROM contract_listing l
+        LEFT JOIN contracts c ON c.contract_id = l.contract_id
+        WHERE c.contract_id IS NULL
+    """)
+    echo(f"contract_listing: removed {cursor.rowcount} orphaned rows")
+
+
+def register_commands(app):
+    @app.cli.command("rebuild-listing")
+    @click.option("--batch-size", default=1000, show_default=True)
+    def rebuild_listing_command(batch_size):
+        """Backfill contract_listing from the normalized tables."""
+        db = get_db()
+        try:
+            rebuild_listing(db.cursor(), batch_size, click.echo)
+        finally:
+            db.close()
@@ -0,0 +1,320 @@
+import os
+import math
+import threading
+from collections import Counter
+import geo_index
+
+MAP_MIN_ZOOM = 0
+MAP_MAX_ZOOM = int(os.environ.get("MAP_MAX_ZOOM", 14))
+MAP_CLUSTER_RADIUS = int(os.environ.get("MAP_CLUSTER_RADIUS", 60))
+MAP_TILE_EXTENT = 512
+
+# Web-mercator latitude limit (the square's top and bottom edges).
+MAX_LAT = 85.05112878
+
+
+# Web-mercator unit square: x, y in [0, 1].
+def lon_x(lon):
+    return lon / 360 + 0.5
+
+
+def lat_y(lat):
+    # The projection diverges at the poles; clamp a whole-world bbox.
+    s = math.sin(math.radians(min(max(lat, -MAX_LAT), MAX_LAT)))
+    y = 0.5 - 0.25 * math.log((1 + s) / (1 - s)) / math.pi
+    return min(max(y, 0), 1)
+
+
+def x_lon(x):
+    return (x - 0.5) * 360
+
+
+def y_lat(y):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+
+
+class Node:
+    __slots__ = ("x", "y", "count", "commodities", "key", "is_cluster")
+
+    def __init__(self, x, y, count, commodities, key=None, is_cluster=False):
+        self.x = x
+        self.y = y
+        self.count = count
+        self.commodities = commodities
+        self.key = key
+        self.is_cluster = is_cluster
+
+
+def radius_at(zoom):
+    return MAP_CLUSTER_RADIUS / (MAP_TILE_EXTENT * 2 ** zoom)
+
+
+# Grid cells per unit at MAP_MAX_ZOOM. Each zoom out doubles the radius,
+# so a point's cell at any zoom is its finest cell shifted right by the
+# zoom difference, and the cells of one zoom nest exactly in the next.
+FINE_CELLS = 1 / radius_at(MAP_MAX_ZOOM)
+
+
+class Cell:
+    __slots__ = ("count", "x", "y", "slots", "commodities")
+
+    def __init__(self):
+        self.count = 0
+        self.x = 0.0
+        self.y = 0.0
+        self.slots = 0
+        self.commodities = Counter()
+
+
+class ClusterGrid:
+    """
+    Points bucketed at every zoom into cells the size of the clustering
+    radius. A cell keeps running sums (count, coordinates, commodity
+    counts), so inserting or removing a point touches one cell per zoom;
+    a cell's cluster is its centroid and totals.
+
+    Each point holds a small integer slot and a cell keeps the sum of its
+    points' slots, so a cell down to one point knows which one it is.
+    """
+
+    def __init__(self, points=()):
+        self.levels = [{} for _ in range(MAP_MAX_ZOOM + 1)]
+        self.points = {}
+        self.keys = {}
+        self._free = []
+        self._load(points)
+
+    def _load(self, points):
+        """
+        Bulk build from (key, lat, lon, commodities): fill the finest zoom,
+        then sum each zoom's cells into their parents.
+        """
+        finest = self.levels[MAP_MAX_ZOOM]
+        for key, lat, lon, commodities in points:
+            slot = len(self.points)
+            x, y = lon_x(lon), lat_y(lat)
+            self.points[key] = (x, y, Counter(commodities), slot)
+            self.keys[slot] = key
+            at = (int(x * FINE_CELLS), int(y * FINE_CELLS))
+            cell = finest.get(at)
+            if cell is None:
+                cell = finest[at] = Cell()
+            cell.count += 1
+            cell.x += x
+            cell.y += y
+            cell.slots += slot
+            cell.commodities.update(commodities)
+
+        for zoom in range(MAP_MAX_ZOOM - 1, MAP_MIN_ZOOM - 1, -1):
+            cells = self.levels[zoom]
+            for (gx, gy), child in self.levels[zoom + 1].items():
+                at = (gx >> 1, gy >> 1)
+                cell = cells.get(at)
+                if cell is None:
+                    cell = cells[at] = Cell()
+                cell.count += child.count
+                cell.x += child.x
+                cell.y += child.y
+                cell.slots += child.slots
+                cell.commodities.update(child.commodities)
+
+    def insert(self, key, lat, lon, commodities):
+        self.remove(key)
+        slot = self._free.pop() if self._free else len(self.points)
+        point = (lon_x(lon), lat_y(lat), Counter(commodities), slot)
+        self.points[key] = point
+        self.keys[slot] = key
+        self._add(point, 1)
+
+    def remove(self, key):
+        point = self.points.pop(key, None)
+        if point is not None:
+            del self.keys[point[3]]
+            self._free.append(point[3])
+            self._add(point, -1)
+
+    def _add(self, point, sign):
+        x, y, commodities, slot = point
+        fx, fy = int(x * FINE_CELLS), int(y * FINE_CELLS)
+        for zoom, cells in enumerate(self.levels):
+            shift = MAP_MAX_ZOOM - zoom
+            at = (fx >> shift, fy >> shift)
+            cell = cells.get(at)
+            if cell is None:
+                cell = cells[at] = Cell()
+            cell.count += sign
+            if not cell.count:
+                del cells[at]
+                continue
+            cell.x += sign * x
+            cell.y += sign * y
+            cell.slots += sign * slot
+            for cid, n in commodities.items():
+                left = cell.commodities[cid] + sign * n
+                if left:
+                    cell.commodities[cid] = left
+                else:
+                    del cell.commodities[cid]
+
+    def _node(self, cell):
+        if cell.count == 1:
+            key = self.keys[cell.slots]
+            x, y, commodities, _ = self.points[key]
+            return Node(x, y, 1, Counter(commodities), key=key)
+        return Node(cell.x / cell.count, cell.y / cell.count, cell.count,
+                    Counter(cell.commodities), is_cluster=True)
+
+    def in_box(self, zoom, x0, y0, x1, y1):
+        cells = self.levels[zoom]
+        shift = MAP_MAX_ZOOM - zoom
+        gx0, gx1 = int(x0 * FINE_CELLS) >> shift, int(x1 * FINE_CELLS) >> shift
+        gy0, gy1 = int(y0 * FINE_CELLS) >> shift, int(y1 * FINE_CELLS) >> shift
+
+        # A huge box at high zoom spans more cells than there are buckets.
+        if (gx1 - gx0 + 1) * (gy1 - gy0 + 1) > len(cells):
+            found = [c for at, c in cells.items() if gx0 <= at[0] <= gx1 and gy0 <= at[1] <= gy1]
+        else:
+            found = [cells[at] for at in
+                     ((gx, gy) for gx in range(gx0, gx1 + 1) for gy in range(gy0, gy1 + 1))
+                     if at in cells]
+
+        nodes = []
+        for cell in found:
+            n = self._node(cell)
+            if x0 <= n.x <= x1 and y0 <= n.y <= y1:
+                nodes.append(n)
+        return nodes
+
+
+class ClusterLayer:
+    """
+    A ClusterGrid following one or more geo layers.
+
+    The first get() builds the grid from the layers' points; snapshot()
+    reads them with each layer's version under that layer's lock. After that
+    each get() applies the layers' logged changes since the versions the
+    grid reflects; the grid is only rebuilt when those changes have left
+    a layer's change log.
+    """
+
+    sources = ()
+
+    def __init__(self, name):
+        self.name = name
+        self.grid = None
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        for source in self.sources:
+            source.get()
+
+        with self._lock:
+            if self.grid is not None and self._catch_up():
+                return self.grid
+            points, versions = self.snapshot()
+            self.grid, self._versions = ClusterGrid(points), versions
+            return self.grid
+
+    def _catch_up(self):
+        feeds = [source.changes_since(version)
+                 for source, version in zip(self.sources, self._versions)]
+        if any(changes is None for _, changes in feeds):
+            return False
+        self.apply(self.grid, [changes for _, changes in feeds])
+        self._versions = [version for version, _ in feeds]
+        return True
+
+    def query(self, bbox, zoom):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        zoom = max(MAP_MIN_ZOOM, min(int(zoom), MAP_MAX_ZOOM))
+        grid = self.get()
+
+        x0, x1 = lon_x(min_lon), lon_x(max_lon)
+        y0, y1 = lat_y(max_lat), lat_y(min_lat)
+        with self._lock:
+            return grid.in_box(zoom, x0, y0, x1, y1)
+
+
+class ContractClusters(ClusterLayer):
+    sources = (geo_index.open_contracts,)
+
+    def snapshot(self):
+        layer = geo_index.open_contracts
+        with layer._lock:
+            points = [
+                (key, lat, lon, {props["commodity_id"]: 1})
+                for key, (lat, lon, _, props) in layer.index.points.items()
+            ]
+            return points, [layer.version]
+
+    def apply(self, grid, feeds):
+        for key, _, new in feeds[0]:
+            if new is None:
+                grid.remove(key)
+            else:
+                lat, lon, _, props = new
+                grid.insert(key, lat, lon, {props["commodity_id"]: 1})
+
+
+class FarmClusters(ClusterLayer):
+    """
+    Farms with the commodity mix of their open contracts. The mix per
+    farm is kept up to date from the contract changes; a farm is
+    re-inserted when it or its mix changes.
+    """
+
+    sources = (geo_index.farms, geo_index.open_contracts)
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.mix = {}
+
+    def snapshot(self):
+        contracts = geo_index.open_contracts
+        mix = {}
+        with contracts._lock:
+            for _, _, _, props in contracts.index.points.values():
+                mix.setdefault(props["farm_id"], Counter())[props["commodity_id"]] += 1
+            contracts_version = contracts.version
+        self.mix = mix
+
+        layer = geo_index.farms
+        with layer._lock:
+            points = [
+                (key, lat, lon, mix.get(key, {}))
+                for key, (lat, lon, _, _) in layer.index.points.items()
+            ]
+            return points, [layer.version, contracts_version]
+
+    def apply(self, grid, feeds):
+        farm_changes, contract_changes = feeds
+        dirty = {key for key, _, _ in farm_changes}
+        for _, old, new in contract_changes:
+            if old is not None:
+                farm_id, cid = old[3]["farm_id"], old[3]["commodity_id"]
+                mix = self.mix.setdefault(farm_id, Counter())
+                mix[cid] -= 1
+                if mix[cid] <= 0:
+                    del mix[cid]
+                if not mix:
+                    del self.mix[farm_id]
+                dirty.add(farm_id)
+            if new is not None:
+                farm_id = new[3]["farm_id"]
+                self.mix.setdefault(farm_id, Counter())[new[3]["commodity_id"]] += 1
+                dirty.add(farm_id)
+
+        points = geo_index.farms.index.points
+        for key in dirty:
+            point = points.get(key)
+            if point is None:
+                grid.remove(key)
+            else:
+                grid.insert(key, point[0], point[1], self.mix.get(key, {}))
+
+
+layers = {
+    "contracts": ContractClusters("contracts"),
+    "farms": FarmClusters("farms"),
+}
@@ -0,0 +1,6 @@
+-- Marketplace filters and sorts read contract_listing and are indexed in
+-- 004_contract_listing.sql. The one status-filtered read left on contracts
+-- is the open-contract load in geo_index.py (WHERE contract_status = 'open').
+
+ALTER TABLE contracts
+    ADD INDEX idx_contracts_status_created (contract_status, created_at, id);
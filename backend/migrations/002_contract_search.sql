@@ -0,0 +1,31 @@
+-- Denormalized search documents for /trader/contracts/search.
+-- Maintained by contract_search.py from the contract write paths.
+
+CREATE TABLE IF NOT EXISTS contract_search (
+    contract_id     VARCHAR(64)  NOT NULL PRIMARY KEY,
+    user_id         INT          NOT NULL,
+    contract_status VARCHAR(32)  NOT NULL,
+    created_at      DATETIME     NOT NULL,
+    document        TEXT         NOT NULL,
+    INDEX idx_contract_search_status (contract_status, created_at),
+    FULLTEXT INDEX ft_contract_search_document (document)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Backfill existing contracts.
+REPLACE INTO contract_search
+    (contract_id, user_id, contract_status, created_at, document)
+SELECT
+    c.contract_id, c.user_id, c.contract_status, c.created_at,
+    CONCAT_WS(' ',
+        com.commodity_name, v.variety_name, f.farm_name,
+        d.division_name, dist.district_name, t.tehsil_name, b.block_name,
+        c.commodity_quality, c.farming_techniques
+    )
+FROM contracts c
+JOIN m_farm f ON f.farm_id = c.farm_id
+JOIN m_commodity com ON com.commodity_id = c.commodity_id
+JOIN m_commodity_variety v ON v.variety_id = c.variety_id
+LEFT JOIN m_division d ON d.division_id = f.farm_division
+LEFT JOIN m_district dist ON dist.district_id = f.farm_district
+LEFT JOIN m_tehsil t ON t.tehsil_id = f.farm_tehsil
+LEFT JOIN m_block b ON b.block_id = f.farm_block;
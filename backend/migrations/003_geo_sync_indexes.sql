@@ -0,0 +1,7 @@
+-- Let geo_index.py pull rows changed since its last sync without a scan.
+
+ALTER TABLE contracts
+    ADD INDEX idx_contracts_updated (updated_at);
+
+ALTER TABLE m_farm
+    ADD INDEX idx_farm_updated (updated_at);
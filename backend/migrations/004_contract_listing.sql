@@ -0,0 +1,39 @@
+-- Flattened read model for the trader marketplace (see listing.py).
+-- Column types are copied from the source tables, then keys are added.
+-- Backfill with:  flask --app app rebuild-listing
+
+CREATE TABLE IF NOT EXISTS contract_listing AS
+SELECT
+    c.id, c.contract_id, c.contract_status, c.created_at, c.updated_at,
+    c.user_id, u.full_name AS farmer_name, c.trader_user_id,
+    c.commodity_id, com.commodity_name, c.variety_id, v.variety_name, c.commodity_quality,
+    c.crop_quantity_amount, c.crop_quantity_unit,
+    c.base_price, c.price_unit, c.harvesting_date,
+    f.farm_id, f.farm_name,
+    f.farm_division, d.division_name, f.farm_district, dist.district_name,
+    f.farm_tehsil, t.tehsil_name, f.farm_block, b.block_name,
+    c.negotiations
+FROM contracts c
+JOIN m_farm f ON f.farm_id = c.farm_id
+JOIN m_commodity com ON com.commodity_id = c.commodity_id
+JOIN m_commodity_variety v ON v.variety_id = c.variety_id
+JOIN m_user_login u ON u.user_id = c.user_id
+LEFT JOIN m_division d ON d.division_id = f.farm_division
+LEFT JOIN m_district dist ON dist.district_id = f.farm_district
+LEFT JOIN m_tehsil t ON t.tehsil_id = f.farm_tehsil
+LEFT JOIN m_block b ON b.block_id = f.farm_block
+LIMIT 0;
+
+ALTER TABLE contract_listing
+    ADD PRIMARY KEY (contract_id),
+    ADD INDEX idx_listing_status_created (contract_status, created_at, id),
+    ADD INDEX idx_listing_status_commodity (contract_status, commodity_id, variety_id, created_at),
+    ADD INDEX idx_listing_status_quality (contract_status, commodity_quality, created_at),
+    ADD INDEX idx_listing_status_price (contract_status, base_price),
+    ADD INDEX idx_listing_status_quantity (contract_status, crop_quantity_amount),
+    ADD INDEX idx_listing_status_harvest (contract_status, harvesting_date),
+    ADD INDEX idx_listing_status_location (contract_status, farm_division, farm_district, farm_tehsil, farm_block),
+    ADD INDEX idx_listing_status_block (contract_status, farm_block),
+    ADD INDEX idx_listing_trader_status (trader_user_id, contract_status, created_at),
+    ADD INDEX idx_listing_user (user_id),
+    ADD INDEX idx_listing_farm (farm_id);
@@ -0,0 +1,15 @@
+-- Idempotency-Key claims and recorded first responses (see idempotency.py).
+-- status_code stays NULL while the first request is still running.
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id         INT           NOT NULL,
+    endpoint        VARCHAR(64)   NOT NULL,
+    idem_key        VARCHAR(128)  NOT NULL,
+    request_hash    CHAR(40)      NOT NULL,
+    status_code     SMALLINT      NULL,
+    content_type    VARCHAR(100)  NULL,
+    response_body   MEDIUMBLOB    NULL,
+    created_at      DATETIME      NOT NULL,
+    PRIMARY KEY (user_id, endpoint, idem_key),
+    KEY idx_idempotency_created (created_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,12 @@
+-- Revoked JWT ids (see revocation.py). Rows only matter until the token
+-- would have expired anyway; nodes pull new rows by id.
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    id          BIGINT       NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    jti         CHAR(32)     NOT NULL,
+    user_id     INT          NOT NULL,
+    expires_at  DATETIME     NOT NULL,
+    revoked_at  DATETIME     NOT NULL,
+    UNIQUE KEY uq_revoked_tokens_jti (jti),
+    KEY idx_revoked_tokens_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
@@ -0,0 +1,116 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+# bcrypt releases the GIL while hashing, so a thread pool spreads the work
+# over cores without blocking the request threads that aren't logging in.
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", os.cpu_count() or 2))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", PASSWORD_WORKERS * 4))
+PASSWORD_TIMEOUT = float(os.environ.get("PASSWORD_TIMEOUT", 10))
+PASSWORD_RETRY_AFTER = 2
+
+
+class PasswordPoolBusy(Exception):
+    """
+    Raised instead of queueing when PASSWORD_QUEUE_LIMIT hashes are
+    already running or waiting, or when a hash doesn't finish within
+    PASSWORD_TIMEOUT; callers answer 503 + Retry-After.
+    """
+
+
+class PasswordPool:
+    def __init__(self, workers, queue_limit):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.inflight = 0
+        self.shed = 0
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="bcrypt"
+                    )
+        return self._executor
+
+    def saturated(self):
+        return self.inflight >= self.queue_limit
+
+    def _done(self, _future=None):
+        with self._lock:
+            self.inflight -= 1
+
+    def run(self, fn, *args):
+        with self._lock:
+            if self.inflight >= self.queue_limit:
+                self.shed += 1
+                raise PasswordPoolBusy()
+            self.inflight += 1
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            self._done()
+            raise
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=PASSWORD_TIMEOUT)
+        except TimeoutError:
+            # The hash keeps its slot until it finishes, so later callers
+            # are shed by the queue limit rather than piling up.
+            future.cancel()
+            raise PasswordPoolBusy() from None
+
+    def reset(self):
+        """
+        Forget the executor (its threads do not survive a fork).
+        """
+        self._executor = None
+        self._lock = threading.Lock()
+        self.inflight = 0
+
+
+pool = PasswordPool(PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+
+# bcrypt is imported on first use; only login/signup/import hash.
+def hashpw(plain, rounds):
+    import bcrypt
+    return bcrypt.hashpw(plain.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+
+
+def checkpw(plain, hashed):
+    import bcrypt
+    return bcrypt.checkpw(plain.encode("utf-8"), hashed.encode("utf-8"))
+
+
+def saturated():
+    return pool.saturated()
+
+
+def hash_password(plain, rounds=None):
+    return pool.run(hashpw, plain, rounds or BCRYPT_ROUNDS)
+
+
+def check_password(plain, hashed):
+    return pool.run(checkpw, plain, hashed)
+
+
+def hash_rounds(hashed):
+    # "$2b$12$<salt+hash>"
+    try:
+        return int(hashed.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def needs_rehash(hashed):
+    return hash_rounds(hashed) != BCRYPT_ROUNDS
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=pool.reset)
@@ -0,0 +1,397 @@
+import os
+import time
+import logging
+import threading
+from db import get_db
+from compression import PrecompressedBody
+from shared_reference import (
+    SHARED_REFERENCE_DIR, SharedState, snapshot_path, write_snapshot_file
+)
+
+REFERENCE_CHECK_INTERVAL = int(os.environ.get("REFERENCE_CHECK_INTERVAL", 30))
+# The publisher touches each file every check; an older one means it has
+# died or lost the DB, and workers go back to checking MySQL themselves.
+SHARED_REFERENCE_MAX_AGE = int(os.environ.get(
+    "SHARED_REFERENCE_MAX_AGE", 4 * REFERENCE_CHECK_INTERVAL
+))
+
+log = logging.getLogger(__name__)
+
+
+class SnapshotState:
+    """
+    One immutable version of a snapshot: the loaded data plus its
+    precompressed JSON body. Derived bodies are memoised per version.
+    """
+
+    def __init__(self, data, payload):
+        self.data = data
+        self.body = PrecompressedBody.from_payload(payload)
+        self.version = self.body.etag
+        self._derived = {}
+        self._lock = threading.Lock()
+
+    def derived_body(self, key, builder):
+        body = self._derived.get(key)
+        if body is None:
+            body = PrecompressedBody.from_payload(builder(self.data))
+            with self._lock:
+                self._derived[key] = body
+        return body
+
+    def contains(self, name, key):
+        return key in self.data[name]
+
+    def lookup(self, name, key):
+        return self.data[name].get(key)
+
+
+class ReferenceSnapshot:
+    """
+    Versioned in-memory copy of a group of master tables.
+
+    CHECKSUM TABLE is polled at most every REFERENCE_CHECK_INTERVAL seconds;
+    the loader only reruns when a table actually changed.
+
+    With SHARED_REFERENCE_DIR set, the snapshot is instead read from the
+    file a publisher keeps there (see shared_reference.py): the check is an
+    os.stat, and a new file is mapped rather than loaded. While the file is
+    missing or older than SHARED_REFERENCE_MAX_AGE the snapshot checks
+    MySQL as usual (still serving the mapped file if MySQL fails too).
+
+    derived(data) yields every (key, payload) that routes may ask
+    derived_body() for, and indexes names the {id: value} data dicts that
+    contains() and lookup() answer for; both are only used when publishing,
+    where the indexes become lookup tables read in place by the workers.
+    """
+
+    def __init__(self, name, tables, loader, payload, derived=None, indexes=()):
+        self.name = name
+        self.tables = tables
+        self.loader = loader
+        self.payload = payload
+        self.derived = derived
+        self.indexes = indexes
+        self.state = None
+        self._checksum = None
+        self._checked_at = 0
+        self._file_id = None
+        self._published = None
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        return (
+            self.state is not None
+            and time.monotonic() - self._checked_at < REFERENCE_CHECK_INTERVAL
+        )
+
+    def current(self):
+        """
+        The loaded state if it needs no re-check, else None (call get()).
+        """
+        return self.state if self._fresh() else None
+
+    def get(self):
+        if self._fresh():
+            return self.state
+
+        with self._lock:
+            if self._fresh():
+                return self.state
+
+            if SHARED_REFERENCE_DIR and self._map_shared():
+                self._checked_at = time.monotonic()
+                return self.state
+
+            try:
+                self._load()
+            except Exception:
+                if not isinstance(self.state, SharedState):
+                    raise
+                log.exception("Reloading %s failed; serving the stale shared snapshot", self.name)
+
+            self._checked_at = time.monotonic()
+            return self.state
+
+    def _load(self):
+        db = get_db()
+        try:
+            cur = db.cursor()
+            cur.execute("CHECKSUM TABLE " + ", ".join(self.tables))
+            checksum = tuple(r["Checksum"] for r in cur.fetchall())
+
+            if self.state is None or isinstance(self.state, SharedState) or checksum != self._checksum:
+                data = self.loader(cur)
+                self.state = SnapshotState(data, self.payload(data))
+                self._checksum = checksum
+        finally:
+            db.close()
+
+    def invalidate(self):
+        self._checked_at = 0
+
+    def _map_shared(self):
+        path = snapshot_path(SHARED_REFERENCE_DIR, self.name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False
+
+        if time.time() - stat.st_mtime > SHARED_REFERENCE_MAX_AGE:
+            if self._file_id is not None:
+                log.warning(
+                    "Shared %s snapshot not refreshed for %.0f s; checking MySQL directly",
+                    self.name, time.time() - stat.st_mtime
+                )
+                self._file_id = None
+            return False
+
+        # Every publish is a new file (os.replace), so the inode identifies
+        # it; the publisher's heartbeat only moves the mtime.
+        file_id = (stat.st_dev, stat.st_ino)
+        if file_id != self._file_id:
+            try:
+                state = SharedState(path)
+            except ValueError:
+                # e.g. a file from an older publisher; use MySQL until
+                # the running publisher replaces it.
+                log.warning("Shared %s snapshot is unreadable; checking MySQL directly", self.name)
+                return False
+            self.state = state
+            self._file_id = file_id
+        return True
+
+    def publish(self, directory):
+        """
+        Write the shared file if the tables changed since the last publish
+        (or the file is missing), else touch it so workers can tell the
+        publisher is alive. Returns True when a new file was written.
+        """
+        path = snapshot_path(directory, self.name)
+        db = get_db()
+        try:
+            cur = db.cursor()
+            cur.execute("CHECKSUM TABLE " + ", ".join(self.tables))
+            checksum = tuple(r["Checksum"] for r in cur.fetchall())
+            if checksum == self._published and os.path.exists(path):
+                os.utime(path)
+                return False
+            data = self.loader(cur)
+        finally:
+            db.close()
+
+        bodies = {None: PrecompressedBody.from_payload(self.payload(data))}
+        for key, payload in (self.derived(data) if self.derived else ()):
+            bodies[key] = PrecompressedBody.from_payload(payload)
+        write_snapshot_file(path, bodies, data, self.indexes)
+        self._published = checksum
+        return True
+
+
+# -----------------------------------------------------------------
+# Commodities, varieties and produce units
+# -----------------------------------------------------------------
+def load_commodities(cur):
+    cur.execute(
+        "SELECT commodity_id, commodity_name FROM m_commodity ORDER BY commodity_name"
+    )
+    commodities = cur.fetchall()
+
+    cur.execute(
+        """
+        SELECT variety_id, commodity_id, variety_name
+        FROM m_commodity_variety
+        ORDER BY commodity_id, variety_name
+        """
+    )
+    varieties_by_commodity = {}
+    for v in cur.fetchall():
+        varieties_by_commodity.setdefault(v["commodity_id"], []).append({
+            "variety_id": v["variety_id"],
+            "variety_name": v["variety_name"]
+        })
+
+    cur.execute("SELECT unit_id, unit_name FROM m_produce_unit")
+    units = cur.fetchall()
+
+    return {
+        "commodities": commodities,
+        "commodity_names": {c["commodity_id"]: c["commodity_name"] for c in commodities},
+        "varieties_by_commodity": varieties_by_commodity,
+        "units": units,
+    }
+
+
+def commodities_payload(data):
+    return {
+        "commodities": [
+            {
+                **c,
+                "varieties": data["varieties_by_commodity"].get(c["commodity_id"], [])
+            }
+            for c in data["commodities"]
+        ],
+        "units": data["units"],
+    }
+
+
+def commodity_list_payload(data):
+    return {"commodities": data["commodities"]}
+
+
+def varieties_payload(data, commodity_id):
+    return {"varieties": data["varieties_by_commodity"][commodity_id]}
+
+
+def commodities_derived(data):
+    yield "commodities", commodity_list_payload(data)
+    for commodity_id in data["varieties_by_commodity"]:
+        yield f"varieties:{commodity_id}", varieties_payload(data, commodity_id)
+
+
+commodity_snapshot = ReferenceSnapshot(
+    "commodities",
+    ["m_commodity", "m_commodity_variety", "m_produce_unit"],
+    load_commodities,
+    commodities_payload,
+    derived=commodities_derived,
+    indexes=("varieties_by_commodity", "commodity_names"),
+)
+
+
+# -----------------------------------------------------------------
+# Location hierarchy: division -> district -> tehsil / block
+# -----------------------------------------------------------------
+def load_locations(cur):
+    cur.execute("SELECT division_id, division_name FROM m_division ORDER BY division_name")
+    divisions = cur.fetchall()
+
+    cur.execute("""
+        SELECT district_id, district_name, division_id
+        FROM m_district ORDER BY district_name
+    """)
+    districts = cur.fetchall()
+
+    cur.execute("""
+        SELECT tehsil_id, tehsil_name, district_id
+        FROM m_tehsil ORDER BY tehsil_name
+    """)
+    tehsils = cur.fetchall()
+
+    cur.execute("""
+        SELECT block_id, block_name, district_id
+        FROM m_block ORDER BY block_name
+    """)
+    blocks = cur.fetchall()
+
+    # Compact tree: leaves (tehsils, blocks) are [id, name] pairs.
+    division_nodes = {}
+    tree = []
+    for d in divisions:
+        node = {"id": d["division_id"], "name": d["division_name"], "districts": []}
+        division_nodes[d["division_id"]] = node
+        tree.append(node)
+
+    district_nodes = {}
+    for d in districts:
+        node = {"id": d["district_id"], "name": d["district_name"], "tehsils": [], "blocks": []}
+        district_nodes[d["district_id"]] = node
+        if d["division_id"] in division_nodes:
+            division_nodes[d["division_id"]]["districts"].append(node)
+
+    for t in tehsils:
+        if t["district_id"] in district_nodes:
+            district_nodes[t["district_id"]]["tehsils"].append([t["tehsil_id"], t["tehsil_name"]])
+
+    for b in blocks:
+        if b["district_id"] in district_nodes:
+            district_nodes[b["district_id"]]["blocks"].append([b["block_id"], b["block_name"]])
+
+    return {
+        "divisions": divisions,
+        "districts": districts,
+        "tehsils": tehsils,
+        "blocks": blocks,
+        "tree": tree,
+        "division_nodes": division_nodes,
+        "district_nodes": district_nodes,
+    }
+
+
+def locations_payload(data):
+    return {"divisions": data["tree"]}
+
+
+def children(rows, parent_key, parent_id, id_key, name_key):
+    return [
+        {id_key: r[id_key], name_key: r[name_key]}
+        for r in rows if r[parent_key] == parent_id
+    ]
+
+
+def group_children(rows, parent_key, id_key, name_key):
+    """
+    children() for every parent in one pass: {parent_id: [...]}.
+    """
+    groups = {}
+    for r in rows:
+        groups.setdefault(r[parent_key], []).append({id_key: r[id_key], name_key: r[name_key]})
+    return groups
+
+
+def division_list_payload(data):
+    return {"divisions": data["divisions"]}
+
+
+def division_tree_payload(data, division_id):
+    return {"division": data["division_nodes"][division_id]}
+
+
+def district_tree_payload(data, district_id):
+    return {"district": data["district_nodes"][district_id]}
+
+
+def districts_payload(data, division_id):
+    return {"districts": children(
+        data["districts"], "division_id", division_id, "district_id", "district_name"
+    )}
+
+
+def tehsils_payload(data, district_id):
+    return {"tehsils": children(
+        data["tehsils"], "district_id", district_id, "tehsil_id", "tehsil_name"
+    )}
+
+
+def blocks_payload(data, district_id):
+    return {"blocks": children(
+        data["blocks"], "district_id", district_id, "block_id", "block_name"
+    )}
+
+
+def locations_derived(data):
+    districts = group_children(data["districts"], "division_id", "district_id", "district_name")
+    tehsils = group_children(data["tehsils"], "district_id", "tehsil_id", "tehsil_name")
+    blocks = group_children(data["blocks"], "district_id", "block_id", "block_name")
+
+    yield "divisions", division_list_payload(data)
+    for division_id in data["division_nodes"]:
+        yield f"tree:division:{division_id}", division_tree_payload(data, division_id)
+        yield f"districts:{division_id}", {"districts": districts.get(division_id, [])}
+    for district_id in data["district_nodes"]:
+        yield f"tree:district:{district_id}", district_tree_payload(data, district_id)
+        yield f"tehsils:{district_id}", {"tehsils": tehsils.get(district_id, [])}
+        yield f"blocks:{district_id}", {"blocks": blocks.get(district_id, [])}
+
+
+location_snapshot = ReferenceSnapshot(
+    "locations",
+    ["m_division", "m_district", "m_tehsil", "m_block"],
+    load_locations,
+    locations_payload,
+    derived=locations_derived,
+    indexes=("division_nodes", "district_nodes"),
+)
+
+# Published by shared_reference.publish_all().
+SHARED_SNAPSHOTS = (commodity_snapshot, location_snapshot)
@@ -0,0 +1,147 @@
+import os
+import time
+import logging
+import threading
+from db import db_pool
+from cache import broadcast, on_broadcast
+
+REVOCATION_SYNC_SECONDS = int(os.environ.get("REVOCATION_SYNC_SECONDS", 5))
+REVOCATION_PRUNE_SECONDS = 3600
+# Auto-increment ids can commit out of order: each pull re-reads this many
+# ids below the watermark so a row that became visible late is not skipped.
+REVOCATION_ID_WINDOW = int(os.environ.get("REVOCATION_ID_WINDOW", 1000))
+
+log = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    In-memory set of revoked token ids (jti -> exp epoch seconds).
+
+    Lookups never touch the DB. At most every REVOCATION_SYNC_SECONDS one
+    request pulls rows added since the last seen id (revocations made on
+    other nodes), re-reading a trailing window for ids that commit out of
+    order; an hourly full reload covers anything later still. Entries are
+    dropped once their token would have expired anyway, so memory is
+    bounded by tokens revoked within their lifetime.
+    If the DB is unreachable the list keeps serving what it already has.
+    With CACHE_URL set a revocation also reaches the other workers at once
+    through the cache invalidation channel.
+    """
+
+    def __init__(self):
+        self.revoked = {}
+        self._last_id = None
+        self._synced_at = 0
+        self._pruned_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _load(self, cur):
+        cur.execute(
+            """
+            SELECT id, jti, UNIX_TIMESTAMP(expires_at) AS exp
+            FROM revoked_tokens
+            WHERE expires_at > NOW()
+            """
+        )
+        rows = cur.fetchall()
+        self.revoked = {r["jti"]: int(r["exp"]) for r in rows}
+        cur.execute("SELECT COALESCE(MAX(id), 0) AS last_id FROM revoked_tokens")
+        self._last_id = cur.fetchone()["last_id"]
+
+    def _pull(self, cur):
+        cur.execute(
+            """
+            SELECT id, jti, UNIX_TIMESTAMP(expires_at) AS exp
+            FROM revoked_tokens
+            WHERE id > %s AND expires_at > NOW()
+            ORDER BY id
+            """,
+            (max(self._last_id - REVOCATION_ID_WINDOW, 0),)
+        )
+        for r in cur.fetchall():
+            self.revoked[r["jti"]] = int(r["exp"])
+            self._last_id = max(self._last_id, r["id"])
+
+    def _prune(self, cur):
+        # A full reload drops expired entries and also picks up any row
+        # that committed later than the pull window allowed for.
+        self._load(cur)
+        cur.execute(
+            "DELETE FROM revoked_tokens WHERE expires_at < NOW() - INTERVAL 1 DAY LIMIT 5000"
+        )
+
+    def sync(self):
+        # Only one thread syncs; the others keep using the current set.
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            with db_pool.connection() as conn:
+                cur = conn.cursor()
+                if self._last_id is None:
+                    self._load(cur)
+                else:
+                    self._pull(cur)
+                if time.monotonic() - self._pruned_at >= REVOCATION_PRUNE_SECONDS:
+                    self._prune(cur)
+                    self._pruned_at = time.monotonic()
+        except Exception:
+            log.exception("Token revocation sync failed")
+        finally:
+            self._synced_at = time.monotonic()
+            self._lock.release()
+
+    def sync_due(self):
+        return time.monotonic() - self._synced_at >= REVOCATION_SYNC_SECONDS
+
+    def is_revoked(self, payload):
+        if self.sync_due():
+            self.sync()
+
+        # Tokens issued before jti existed cannot be revoked; they expire.
+        jti = payload.get("jti")
+        return jti is not None and jti in self.revoked
+
+    def revoke(self, payload, user_id):
+        jti = payload.get("jti")
+        if not jti:
+            return False
+
+        exp = int(payload.get("exp") or time.time())
+        with db_pool.connection() as conn:
+            conn.cursor().execute(
+                """
+                INSERT IGNORE INTO revoked_tokens (jti, user_id, expires_at, revoked_at)
+                VALUES (%s, %s, FROM_UNIXTIME(%s), NOW())
+                """,
+                (jti, user_id, exp)
+            )
+        self.revoked[jti] = exp
+        # Other workers would otherwise accept it until their next sync.
+        broadcast("revoked", "revoke", [jti, exp])
+        return True
+
+    def on_message(self, op, arg):
+        if op == "revoke":
+            jti, exp = arg
+            self.revoked[jti] = exp
+
+    def reset(self):
+        self._lock = threading.Lock()
+        self._synced_at = 0
+
+
+revocation_list = RevocationList()
+on_broadcast("revoked", revocation_list.on_message)
+
+
+def is_revoked(payload):
+    return revocation_list.is_revoked(payload)
+
+
+def revoke_token(payload, user_id):
+    return revocation_list.revoke(payload, user_id)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=revocation_list.reset)
@@ -0,0 +1,59 @@
+import io
+from flask import Blueprint, request, jsonify, current_app
+from routes.auth_routes import token_required, get_db_connection
+from user_import import import_users
+from cache import contract_cache
+
+admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
+
+
+@admin_bp.route('/users/import', methods=['POST'])
+@token_required
+def import_users_csv(current_user):
+    """
+    Bulk-register users from a CSV, sent as the multipart field "file" or
+    as a raw text/csv body. Columns: full_name, mobile_number, pass_key,
+    division, district, tehsil, block (names or ids) and optionally
+    user_type, age, gender, voter_id, email_id, address, education,
+    experience_years. Returns per-row errors; valid rows are created.
+    """
+    if current_user['user_type'] != 'A':
+        return jsonify({'message': 'Admin access required'}), 403
+
+    upload = request.files.get('file')
+    if upload:
+        raw = upload.stream
+    elif request.mimetype in ('text/csv', 'text/plain'):
+        raw = request.stream
+    else:
+        return jsonify({'message': 'Send a CSV as multipart field "file" or a text/csv body'}), 400
+
+    # Decode while reading: the file is never held in memory as one string.
+    text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+
+    try:
+        conn = get_db_connection()
+        try:
+            report = import_users(conn, text)
+        finally:
+            conn.close()
+
+        return jsonify(report.to_dict()), 200
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception("User import error")
+        return jsonify({'message': f'User import failed: {str(e)}'}), 500
+
+
+@admin_bp.route('/cache/stats', methods=['GET'])
+@token_required
+def get_cache_stats(current_user):
+    """
+    Contract detail cache size, TTL and hit ratio for this worker.
+    """
+    if current_user['user_type'] != 'A':
+        return jsonify({'message': 'Admin access required'}), 403
+
+    return jsonify({'contracts': contract_cache.stats()}), 200
@@ -1,23 +1,27 @@
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, g
 from functools import wraps
-import os
 import jwt
 import datetime
 import pymysql
-import bcrypt
+import uuid
+from listing import refresh_farmer_name
+from cache import invalidate_user
+from config import SECRET_KEY, DB_SETTINGS
+from revocation import is_revoked, revoke_token
+from schemas import SIGNUP_SCHEMA, PROFILE_SCHEMA, SchemaError, load_request
+from passwords import (
+    PasswordPoolBusy, PASSWORD_RETRY_AFTER,
+    hash_password, check_password, needs_rehash, saturated
+)
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
-SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 
 
 
 def get_db_connection():
     return pymysql.connect(
-        host=os.environ.get('DB_HOST', 'localhost'),
-        user=os.environ.get('DB_USER', 'root'),
-        password=os.environ.get('DB_PASSWORD', ''),
-        db=os.environ.get('DB_NAME', 'sisjk'),
+        **DB_SETTINGS,
         cursorclass=pymysql.cursors.DictCursor,
         autocommit=True,
         charset='utf8mb4'
@@ -25,6 +29,14 @@ def get_db_connection():
 
 
 
+def password_pool_busy():
+    response = jsonify({'message': 'Server busy, please retry shortly'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(PASSWORD_RETRY_AFTER)
+    return response
+
+
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -43,6 +55,9 @@ def token_required(f):
             if not mobile:
                 return jsonify({'message': 'Invalid token payload'}), 401
 
+            if is_revoked(payload):
+                return jsonify({'message': 'Token revoked'}), 401
+
             conn = get_db_connection()
             with conn.cursor() as cur:
                 cur.execute("""
@@ -55,6 +70,7 @@ def token_required(f):
             if not user:
                 return jsonify({'message': 'Invalid token user'}), 401
 
+            g.token_payload = payload
             return f(user, *args, **kwargs)
 
         except jwt.ExpiredSignatureError:
@@ -75,14 +91,20 @@ def login():
     if not mobile_number or not pass_key:
         return jsonify({'message': 'Mobile number and passkey required'}), 400
 
+    # Shed before touching the DB when the hashing queue is already full.
+    if saturated():
+        return password_pool_busy()
+
     try:
         conn = get_db_connection()
         with conn.cursor() as cur:
 
             cur.execute("""
-                SELECT user_id, mobile_number, pass_key, full_name, user_type
-                FROM m_user_login 
-                WHERE mobile_number=%s LIMIT 1
+                SELECT l.user_id, l.mobile_number, l.pass_key, l.full_name, l.user_type,
+                       u.email_id
+                FROM m_user_login l
+                LEFT JOIN m_user u ON u.user_id = l.user_id
+                WHERE l.mobile_number=%s LIMIT 1
             """, (mobile_number,))
             user = cur.fetchone()
 
@@ -90,23 +112,31 @@ def login():
                 conn.close()
                 return jsonify({'message': 'Invalid credentials'}), 401
 
-            stored_hash = user['pass_key'].encode('utf-8')
+            stored_hash = user['pass_key']
 
-            if not bcrypt.checkpw(pass_key.encode('utf-8'), stored_hash):
+            if not check_password(pass_key, stored_hash):
                 conn.close()
                 return jsonify({'message': 'Invalid credentials'}), 401
 
-            cur.execute("""
-                SELECT email_id FROM m_user WHERE user_id=%s LIMIT 1
-            """, (user["user_id"],))
-            extra = cur.fetchone()
-            email = extra["email_id"] if extra else None
+            # Move old hashes to the current BCRYPT_ROUNDS; best effort,
+            # never worth failing or shedding a successful login for.
+            if needs_rehash(stored_hash):
+                try:
+                    cur.execute(
+                        "UPDATE m_user_login SET pass_key=%s WHERE user_id=%s",
+                        (hash_password(pass_key), user["user_id"])
+                    )
+                except PasswordPoolBusy:
+                    pass
+
+            email = user["email_id"]
 
         conn.close()
 
         token = jwt.encode({
             'mobile_number': mobile_number,
             'user_type': user['user_type'],
+            'jti': uuid.uuid4().hex,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(days=7)
         }, SECRET_KEY, algorithm='HS256')
 
@@ -120,6 +150,9 @@ def login():
 
         return jsonify({'message': 'Login successful', 'token': token, 'user': user_data}), 200
 
+    except PasswordPoolBusy:
+        conn.close()
+        return password_pool_busy()
     except Exception as e:
         current_app.logger.exception("Login error")
         return jsonify({'message': f'Login failed: {str(e)}'}), 500
@@ -128,17 +161,18 @@ def login():
 
 @auth_bp.route('/signup', methods=['POST'])
 def signup_step1():
-    data = request.get_json() or {}
-
-    full_name = data.get('full_name')
-    mobile_number = data.get('mobile_number')
-    pass_key = data.get('pass_key')
-    user_type = data.get('user_type')
+    try:
+        data = load_request(SIGNUP_SCHEMA)
+    except SchemaError as e:
+        return e.response()
 
-    if not (full_name and mobile_number and pass_key and user_type):
-        return jsonify({'message': 'All fields are required'}), 400
+    full_name = data['full_name']
+    mobile_number = data['mobile_number']
+    pass_key = data['pass_key']
+    user_type = data['user_type']
 
-    hashed = bcrypt.hashpw(pass_key.encode('utf-8'), bcrypt.gensalt())
+    if saturated():
+        return password_pool_busy()
 
     try:
         conn = get_db_connection()
@@ -148,11 +182,13 @@ def signup_step1():
             if cur.fetchone():
                 return jsonify({'message': 'Mobile number already registered'}), 409
 
+            hashed = hash_password(pass_key)
+
             cur.execute("""
                 INSERT INTO m_user_login
                 (full_name, mobile_number, pass_key, user_type, last_login, updated_time)
                 VALUES (%s, %s, %s, %s, NULL, NOW())
-            """, (full_name, mobile_number, hashed.decode('utf-8'), user_type))
+            """, (full_name, mobile_number, hashed, user_type))
 
             user_id = cur.lastrowid
 
@@ -160,6 +196,9 @@ def signup_step1():
         conn.close()
         return jsonify({'message': 'Signup step1 created', 'user_id': user_id}), 201
 
+    except PasswordPoolBusy:
+        conn.close()
+        return password_pool_busy()
     except Exception as e:
         current_app.logger.exception("Signup step1 error")
         return jsonify({'message': f'Signup step1 failed: {str(e)}'}), 500
@@ -275,24 +314,28 @@ def update_profile(current_user):
     Allowed fields: full_name, email_id, address
     """
     try:
-        data = request.get_json() or {}
-        user_id = current_user["user_id"]
+        data = load_request(PROFILE_SCHEMA)
+    except SchemaError as e:
+        return e.response()
 
-        full_name = data.get("full_name")
-        email_id = data.get("email_id")
-        address = data.get("address")
+    try:
+        user_id = current_user["user_id"]
 
-        if not (full_name and email_id):
-            return jsonify({"message": "full_name and email_id are required"}), 400
+        full_name = data["full_name"]
+        email_id = data["email_id"]
+        address = data["address"]
 
         conn = get_db_connection()
         with conn.cursor() as cur:
 
+            conn.begin()
             cur.execute("""
                 UPDATE m_user_login SET full_name=%s, updated_time=NOW()
                 WHERE user_id=%s
             """, (full_name, user_id))
 
+            refresh_farmer_name(cur, user_id, full_name)
+
             cur.execute("""
                 UPDATE m_user 
                 SET email_id=%s, address=%s, updated_date=NOW()
@@ -301,6 +344,7 @@ def update_profile(current_user):
 
         conn.commit()
         conn.close()
+        invalidate_user(user_id)
 
         return jsonify({
             "message": "Profile updated successfully",
@@ -325,6 +369,13 @@ def update_profile(current_user):
 @token_required
 def logout(current_user):
     """
-    JWT logout is client-side, but we return 200 to avoid frontend errors.
+    Revoke the token's jti so it stops working on every node within
+    REVOCATION_SYNC_SECONDS. Tokens issued before jti existed can only
+    be dropped client-side; we still return 200 for them.
     """
+    try:
+        revoke_token(g.token_payload, current_user['user_id'])
+    except Exception as e:
+        return jsonify({"message": f"Logout failed: {str(e)}"}), 500
+
     return jsonify({"message": "Logged out successfully"}), 200
@@ -1,28 +1,23 @@
 from flask import Blueprint, jsonify
-from db import get_db
+from reference_data import commodity_snapshot, commodity_list_payload, varieties_payload
 
 commodities_bp = Blueprint("commodities", __name__)
 
 @commodities_bp.route("/commodities", methods=["GET"])
 def get_commodities():
-    db = get_db()
-    cur = db.cursor()
-    cur.execute("SELECT commodity_id, commodity_name FROM m_commodity")
-    rows = cur.fetchall()
-    return jsonify({"commodities": rows})
+    state = commodity_snapshot.get()
+    body = state.derived_body("commodities", commodity_list_payload)
+    return body.to_response()
 
 
 @commodities_bp.route("/commodities/<int:commodity_id>/varieties", methods=["GET"])
 def get_varieties(commodity_id):
-    db = get_db()
-    cur = db.cursor()
-    cur.execute(
-        """
-        SELECT variety_id, variety_name 
-        FROM m_commodity_variety 
-        WHERE commodity_id = %s
-        """,
-        (commodity_id,)
+    state = commodity_snapshot.get()
+    if not state.contains("varieties_by_commodity", commodity_id):
+        return jsonify({"varieties": []})
+
+    body = state.derived_body(
+        f"varieties:{commodity_id}",
+        lambda data: varieties_payload(data, commodity_id)
     )
-    rows = cur.fetchall()
-    return jsonify({"varieties": rows})
+    return body.to_response()
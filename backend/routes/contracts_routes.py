@@ -3,16 +3,27 @@ import json
 import jwt
 import datetime
 import hashlib
-from PIL import Image
 from io import BytesIO
 from flask import Blueprint, request, jsonify
-from db import get_db
+from db import get_db, multi_statement_pool
+from compression import json_list_response, dumps_compact
+from conditional import conditional, conditional_json, content_etag, make_etag
+from reference_data import commodity_snapshot
+from contract_search import index_contracts, set_search_status
+from geo_index import contracts_changed
+from listing import refresh_listing
+from cache import contract_cache, invalidate_contract
+from revocation import is_revoked
+from ids import new_contract_id, new_contract_ids
+from idempotency import idempotent
+from schemas import CONTRACT_SCHEMA, SchemaError, decode_json, load_request
+from config import SECRET_KEY
 from flask import send_from_directory
 from werkzeug.utils import secure_filename
 import uuid
 
 contracts_bp = Blueprint("contracts", __name__)
-SECRET_KEY = os.environ.get('SECRET_KEY')
+MAX_MULTI_GET = 100
 
 
 def get_current_user_id():
@@ -37,6 +48,10 @@ def get_current_user_id():
             print("AUTH: No mobile_number in token payload")
             return None
 
+        if is_revoked(payload):
+            print("AUTH: Token revoked")
+            return None
+
         db = get_db()
         cursor = db.cursor()
         cursor.execute(
@@ -149,123 +164,176 @@ def format_contract(row):
     }
 
 
+def contract_images_validators(contract_id):
+    cursor = get_db().cursor()
+    cursor.execute(
+        """
+        SELECT COUNT(*) AS image_count,
+               MAX(image_id) AS last_image_id,
+               MAX(created_at) AS last_created_at
+        FROM contract_images
+        WHERE contract_id = %s
+        """,
+        (contract_id,)
+    )
+    row = cursor.fetchone()
+
+    etag = make_etag(
+        contract_id, row["image_count"], row["last_image_id"],
+        os.getenv("BASE_URL", "http://localhost:5005")
+    )
+    return etag, row["last_created_at"]
+
+
+INSERT_CONTRACT_SQL = """
+    INSERT INTO contracts (
+        contract_id, user_id, farm_id,
+        commodity_id, variety_id, commodity_quality,
+        crop_quantity_amount, crop_quantity_unit,
+        expected_yield, quality_parameters,
+        planting_date, harvesting_date, season,
+        farming_techniques, fertilizers_used, pesticides_used, irrigation_schedule,
+        base_price, price_unit, total_estimated_value,
+        advance_payment_amount, advance_payment_percentage, advance_payment_due_date,
+        logistics_responsibility, pickup_location, delivery_location,
+        transportation_cost, packaging_requirements, delivery_schedule,
+        labor_responsibility, technical_support, expert_visits,
+        farm_images, farm_videos, documents,
+        contract_status, created_at, updated_at
+    )
+    VALUES (
+        %(contract_id)s, %(user_id)s, %(farm_id)s,
+        %(commodity_id)s, %(variety_id)s, %(commodity_quality)s,
+        %(crop_quantity_amount)s, %(crop_quantity_unit)s,
+        %(expected_yield)s, %(quality_parameters)s,
+        %(planting_date)s, %(harvesting_date)s, %(season)s,
+        %(farming_techniques)s, %(fertilizers_used)s, %(pesticides_used)s, %(irrigation_schedule)s,
+        %(base_price)s, %(price_unit)s, %(total_estimated_value)s,
+        %(advance_payment_amount)s, %(advance_payment_percentage)s, %(advance_payment_due_date)s,
+        %(logistics_responsibility)s, %(pickup_location)s, %(delivery_location)s,
+        %(transportation_cost)s, %(packaging_requirements)s, %(delivery_schedule)s,
+        %(labor_responsibility)s, %(technical_support)s, %(expert_visits)s,
+        %(farm_images)s, %(farm_videos)s, %(documents)s,
+        %(contract_status)s, %(created_at)s, %(updated_at)s
+    )
+"""
+# Every value is a placeholder so executemany() can fold a batch into a
+# single multi-row INSERT.
+
+MAX_BATCH_CONTRACTS = 1000
+
+
+def contract_params(data, user_id, contract_uid, now):
+    """
+    INSERT_CONTRACT_SQL parameters for one CONTRACT_SCHEMA-validated payload.
+    """
+    quality = data["cropDetails"].get("quality") or "standard"
+
+    return {
+        "contract_id": contract_uid,
+        "user_id": user_id,
+        "farm_id": data["farm"],
+        "commodity_id": data["cropDetails"]["commodityId"],
+        "variety_id": data["cropDetails"]["varietyId"],
+        "commodity_quality": quality,
+        "crop_quantity_amount": data["cropDetails"]["quantity"]["amount"],
+        "crop_quantity_unit": data["cropDetails"]["quantity"]["unit"],
+        "expected_yield": data["cropDetails"]["expectedYield"],
+        "quality_parameters": json.dumps(
+            data["cropDetails"].get("qualityParameters", {})
+        ),
+        "planting_date": data["farmingDetails"]["plantingDate"],
+        "harvesting_date": data["farmingDetails"]["harvestingDate"],
+        "season": data["farmingDetails"]["season"],
+        "farming_techniques": json.dumps(
+            data["farmingDetails"]["farmingTechniques"]
+        ),
+        "fertilizers_used": json.dumps(
+            data["farmingDetails"]["fertilizersUsed"]
+        ),
+        "pesticides_used": json.dumps(
+            data["farmingDetails"]["pesticidesUsed"]
+        ),
+        "irrigation_schedule": data["farmingDetails"]["irrigationSchedule"],
+        "base_price": data["pricing"]["basePrice"],
+        "price_unit": data["pricing"]["priceUnit"],
+        "total_estimated_value": None,
+        "advance_payment_amount": data["pricing"]["advancePayment"].get(
+            "amount"
+        ),
+        "advance_payment_percentage": data["pricing"]["advancePayment"].get(
+            "percentage"
+        ),
+        "advance_payment_due_date": data["pricing"]["advancePayment"].get(
+            "dueDate"
+        ),
+        "logistics_responsibility": data["logistics"]["responsibility"],
+        "pickup_location": data["logistics"]["pickupLocation"],
+        "delivery_location": data["logistics"]["deliveryLocation"],
+        "transportation_cost": data["logistics"].get("transportationCost"),
+        "packaging_requirements": data["logistics"][
+            "packagingRequirements"
+        ],
+        "delivery_schedule": data["logistics"].get("deliverySchedule"),
+        "labor_responsibility": data["laborAndSupport"][
+            "laborResponsibility"
+        ],
+        "technical_support": json.dumps(
+            data["laborAndSupport"].get("technicalSupport", {})
+        ),
+        "expert_visits": json.dumps(
+            data["laborAndSupport"].get("expertVisits", {})
+        ),
+        "farm_images": json.dumps(
+            data["mediaFiles"].get("farmImages", [])
+        ),
+        "farm_videos": json.dumps(
+            data["mediaFiles"].get("farmVideos", [])
+        ),
+        "documents": json.dumps(
+            data["mediaFiles"].get("documents", [])
+        ),
+        "contract_status": "open",
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+def db_now(cursor):
+    cursor.execute("SELECT NOW() AS now")
+    return cursor.fetchone()["now"]
+
+
 @contracts_bp.route("/contracts", methods=["POST"])
+@idempotent("contracts.create", get_current_user_id)
 def create_contract():
     user_id = get_current_user_id()
     if not user_id:
         return jsonify({"message": "Unauthorized"}), 401
 
+    try:
+        data = load_request(CONTRACT_SCHEMA)
+    except SchemaError as e:
+        return e.response()
+
     db = get_db()
-    data = request.json
 
     try:
         cursor = db.cursor()
 
-        quality = data["cropDetails"].get("quality") or "standard"
-
-        contract_uid = f"C{int(datetime.datetime.now().timestamp())}{user_id}"
+        contract_uid = new_contract_id()
 
+        db.begin()
         cursor.execute(
-            """
-            INSERT INTO contracts (
-                contract_id, user_id, farm_id,
-                commodity_id, variety_id, commodity_quality,
-                crop_quantity_amount, crop_quantity_unit,
-                expected_yield, quality_parameters,
-                planting_date, harvesting_date, season,
-                farming_techniques, fertilizers_used, pesticides_used, irrigation_schedule,
-                base_price, price_unit, total_estimated_value,
-                advance_payment_amount, advance_payment_percentage, advance_payment_due_date,
-                logistics_responsibility, pickup_location, delivery_location,
-                transportation_cost, packaging_requirements, delivery_schedule,
-                labor_responsibility, technical_support, expert_visits,
-                farm_images, farm_videos, documents,
-                contract_status, created_at, updated_at
-            )
-            VALUES (
-                %(contract_id)s, %(user_id)s, %(farm_id)s,
-                %(commodity_id)s, %(variety_id)s, %(commodity_quality)s,
-                %(crop_quantity_amount)s, %(crop_quantity_unit)s,
-                %(expected_yield)s, %(quality_parameters)s,
-                %(planting_date)s, %(harvesting_date)s, %(season)s,
-                %(farming_techniques)s, %(fertilizers_used)s, %(pesticides_used)s, %(irrigation_schedule)s,
-                %(base_price)s, %(price_unit)s, %(total_estimated_value)s,
-                %(advance_payment_amount)s, %(advance_payment_percentage)s, %(advance_payment_due_date)s,
-                %(logistics_responsibility)s, %(pickup_location)s, %(delivery_location)s,
-                %(transportation_cost)s, %(packaging_requirements)s, %(delivery_schedule)s,
-                %(labor_responsibility)s, %(technical_support)s, %(expert_visits)s,
-                %(farm_images)s, %(farm_videos)s, %(documents)s,
-                'open', NOW(), NOW()
-            )
-        """,
-            {
-                "contract_id": contract_uid,
-                "user_id": user_id,
-                "farm_id": data["farm"],
-                "commodity_id": data["cropDetails"]["commodityId"],
-                "variety_id": data["cropDetails"]["varietyId"],
-                "commodity_quality": quality,
-                "crop_quantity_amount": data["cropDetails"]["quantity"]["amount"],
-                "crop_quantity_unit": data["cropDetails"]["quantity"]["unit"],
-                "expected_yield": data["cropDetails"]["expectedYield"],
-                "quality_parameters": json.dumps(
-                    data["cropDetails"].get("qualityParameters", {})
-                ),
-                "planting_date": data["farmingDetails"]["plantingDate"],
-                "harvesting_date": data["farmingDetails"]["harvestingDate"],
-                "season": data["farmingDetails"]["season"],
-                "farming_techniques": json.dumps(
-                    data["farmingDetails"]["farmingTechniques"]
-                ),
-                "fertilizers_used": json.dumps(
-                    data["farmingDetails"]["fertilizersUsed"]
-                ),
-                "pesticides_used": json.dumps(
-                    data["farmingDetails"]["pesticidesUsed"]
-                ),
-                "irrigation_schedule": data["farmingDetails"]["irrigationSchedule"],
-                "base_price": data["pricing"]["basePrice"],
-                "price_unit": data["pricing"]["priceUnit"],
-                "total_estimated_value": None,
-                "advance_payment_amount": data["pricing"]["advancePayment"].get(
-                    "amount"
-                ),
-                "advance_payment_percentage": data["pricing"]["advancePayment"].get(
-                    "percentage"
-                ),
-                "advance_payment_due_date": data["pricing"]["advancePayment"].get(
-                    "dueDate"
-                ),
-                "logistics_responsibility": data["logistics"]["responsibility"],
-                "pickup_location": data["logistics"]["pickupLocation"],
-                "delivery_location": data["logistics"]["deliveryLocation"],
-                "transportation_cost": data["logistics"].get("transportationCost"),
-                "packaging_requirements": data["logistics"][
-                    "packagingRequirements"
-                ],
-                "delivery_schedule": data["logistics"].get("deliverySchedule"),
-                "labor_responsibility": data["laborAndSupport"][
-                    "laborResponsibility"
-                ],
-                "technical_support": json.dumps(
-                    data["laborAndSupport"].get("technicalSupport", {})
-                ),
-                "expert_visits": json.dumps(
-                    data["laborAndSupport"].get("expertVisits", {})
-                ),
-                "farm_images": json.dumps(
-                    data["mediaFiles"].get("farmImages", [])
-                ),
-                "farm_videos": json.dumps(
-                    data["mediaFiles"].get("farmVideos", [])
-                ),
-                "documents": json.dumps(
-                    data["mediaFiles"].get("documents", [])
-                ),
-            },
+            INSERT_CONTRACT_SQL,
+            contract_params(data, user_id, contract_uid, db_now(cursor))
         )
 
+        index_contracts(cursor, [contract_uid])
+        refresh_listing(cursor, [contract_uid])
+
         db.commit()
+        contracts_changed(cursor, [contract_uid])
         return jsonify({
     "message": "Contract created successfully!",
     "contract_id": contract_uid
@@ -273,10 +341,105 @@ def create_contract():
 
 
     except Exception as e:
+        db.rollback()
         print("CREATE CONTRACT ERROR:", e)
         return jsonify({"message": "Failed to create contract"}), 500
 
 
+def validate_batch_item(item, farm_ids, reference):
+    """
+    (data, errors) for one batch item: schema errors, plus the references
+    that would otherwise fail the INSERT (and roll back the whole batch).
+    """
+    try:
+        data = CONTRACT_SCHEMA.validate(item)
+    except SchemaError as e:
+        return None, [f"{field}: {error}" if field else error for field, error in e.errors]
+
+    errors = []
+    if data["farm"] not in farm_ids:
+        errors.append("farm: unknown farm or not yours")
+
+    crop = data["cropDetails"]
+    varieties = reference.lookup("varieties_by_commodity", crop["commodityId"])
+    if varieties is None:
+        errors.append("cropDetails.commodityId: unknown commodity")
+    elif crop["varietyId"] not in {v["variety_id"] for v in varieties}:
+        errors.append("cropDetails.varietyId: not a variety of this commodity")
+
+    return data, errors
+
+
+@contracts_bp.route("/contracts/batch", methods=["POST"])
+@idempotent("contracts.batch", get_current_user_id)
+def create_contracts_batch():
+    """
+    Create many contracts from an array of create payloads. Items are
+    validated independently; the valid ones are inserted in one
+    transaction and each item gets its own result.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({"message": "Unauthorized"}), 401
+
+    try:
+        items = decode_json(request.get_data(cache=True))
+    except SchemaError as e:
+        return e.response()
+    if isinstance(items, dict):
+        items = items.get("contracts")
+    if not isinstance(items, list) or not items:
+        return jsonify({"message": "Expected a non-empty array of contracts"}), 400
+    if len(items) > MAX_BATCH_CONTRACTS:
+        return jsonify({"message": f"At most {MAX_BATCH_CONTRACTS} contracts per batch"}), 400
+
+    db = get_db()
+
+    try:
+        cursor = db.cursor()
+        reference = commodity_snapshot.get()
+
+        cursor.execute("SELECT farm_id FROM m_farm WHERE user_id = %s", (user_id,))
+        farm_ids = {r["farm_id"] for r in cursor.fetchall()}
+
+        now = db_now(cursor)
+        fresh_ids = iter(new_contract_ids(len(items)))
+
+        results = []
+        rows = []
+        for index, item in enumerate(items):
+            data, errors = validate_batch_item(item, farm_ids, reference)
+            if not errors:
+                contract_uid = next(fresh_ids)
+                rows.append(contract_params(data, user_id, contract_uid, now))
+
+            if errors:
+                results.append({"index": index, "status": "error", "errors": errors})
+            else:
+                results.append({"index": index, "status": "created", "contract_id": contract_uid})
+
+        contract_uids = [r["contract_id"] for r in rows]
+
+        if rows:
+            db.begin()
+            cursor.executemany(INSERT_CONTRACT_SQL, rows)
+            index_contracts(cursor, contract_uids)
+            refresh_listing(cursor, contract_uids)
+            db.commit()
+            contracts_changed(cursor, contract_uids)
+
+        return jsonify({
+            "created": len(rows),
+            "failed": len(items) - len(rows),
+            "results": results
+        }), 201 if rows else 400
+
+    except Exception as e:
+        db.rollback()
+        print("BATCH CREATE CONTRACT ERROR:", e)
+        return jsonify({"message": "Failed to create contracts"}), 500
+
+
 
 @contracts_bp.route("/contracts", methods=["GET"])
 def get_contracts():
@@ -284,6 +447,9 @@ def get_contracts():
     if not user_id:
         return jsonify({"message": "Unauthorized"}), 401
 
+    if "ids" in request.args:
+        return get_contracts_by_ids(user_id, request.args["ids"])
+
     status_filter = request.args.get("status")
 
     db = get_db()
@@ -310,7 +476,7 @@ def get_contracts():
     cursor.execute(query, params)
     rows = cursor.fetchall()
 
-    return jsonify({"contracts": [format_contract(r) for r in rows]})
+    return json_list_response("contracts", rows, format_contract)
 
 
 
@@ -340,72 +506,190 @@ def get_contracts():
 #         return jsonify({"message": "Contract not found"}), 404
 
 #     return jsonify({"contract": format_contract(row)})
-@contracts_bp.route("/contracts/<string:contract_id>", methods=["GET"])
-def get_contract(contract_id):
-    db = get_db()
-    cursor = db.cursor()
+CONTRACT_DETAILS_SQL = """
+    SELECT c.*, 
+           f.farm_name, f.farm_size_area, f.farm_size_unit,
+           com.commodity_name,
+           v.variety_name
+    FROM contracts c
+    JOIN m_farm f ON f.farm_id = c.farm_id
+    JOIN m_commodity com ON com.commodity_id = c.commodity_id
+    JOIN m_commodity_variety v ON v.variety_id = c.variety_id
+    WHERE c.contract_id IN %s
+"""
+
+TRADERS_SQL = """
+    SELECT user_id, full_name, mobile_number
+    FROM m_user_login
+    WHERE user_id IN %s
+"""
+
+
+def load_contract_details(cursor, contract_ids):
+    """
+    Contract rows + negotiations enriched with trader name/phone, using one
+    joined query and one trader query for the whole batch.
+    Returns {contract_id: (contract_data, trader_ids, row)}.
+    """
+    # 1. Fetch contracts
+    cursor.execute(CONTRACT_DETAILS_SQL, (tuple(contract_ids),))
 
-    # 1. Fetch contract
-    cursor.execute(
-        """
-        SELECT c.*, 
-               f.farm_name, f.farm_size_area, f.farm_size_unit,
-               com.commodity_name,
-               v.variety_name
-        FROM contracts c
-        JOIN m_farm f ON f.farm_id = c.farm_id
-        JOIN m_commodity com ON com.commodity_id = c.commodity_id
-        JOIN m_commodity_variety v ON v.variety_id = c.variety_id
-        WHERE c.contract_id = %s
-        """,
-        (contract_id,)
-    )
+    parsed, all_trader_ids = parse_negotiations(cursor.fetchall())
 
-    row = cursor.fetchone()
+    # 4. Fetch trader name & phone
+    trader_rows = []
+    if all_trader_ids:
+        cursor.execute(TRADERS_SQL, (tuple(all_trader_ids),))
+        trader_rows = cursor.fetchall()
 
-    if not row:
-        return jsonify({"message": "Contract not found"}), 404
+    return assemble_contract_details(parsed, trader_rows)
 
-    # 2. Parse negotiations
-    negotiations = json.loads(row["negotiations"] or "[]")
 
-    # 3. Collect trader IDs who showed interest
-    trader_ids = [
-        n["trader_id"]
-        for n in negotiations
-        if n.get("type") == "interest"
-    ]
 
+def parse_negotiations(rows):
+    """
+    (row, negotiations, interested trader ids) per contract row, plus the
+    union of trader ids to look up.
+    """
+    # 2. Parse negotiations
+    # 3. Collect trader IDs who showed interest
+    parsed = []
+    all_trader_ids = set()
+    for row in rows:
+        negotiations = json.loads(row["negotiations"] or "[]")
+        trader_ids = [
+            n["trader_id"]
+            for n in negotiations
+            if n.get("type") == "interest"
+        ]
+        all_trader_ids.update(trader_ids)
+        parsed.append((row, negotiations, trader_ids))
+
+    return parsed, all_trader_ids
+
+
+def assemble_contract_details(parsed, trader_rows):
     trader_map = {}
+    for t in trader_rows:
+        trader_map[t["user_id"]] = {
+            "trader_name": t["full_name"],
+            "trader_mobile": t["mobile_number"]
+        }
 
-    # 4. Fetch trader name & phone
-    if trader_ids:
-        cursor.execute(
-            """
-            SELECT user_id, full_name, mobile_number
-            FROM m_user_login
-            WHERE user_id IN %s
-            """,
-            (tuple(trader_ids),)
+    # 5. Enrich negotiations with trader info
+    details = {}
+    for row, negotiations, trader_ids in parsed:
+        for n in negotiations:
+            tid = n.get("trader_id")
+            if tid in trader_map:
+                n.update(trader_map[tid])
+
+        contract_data = format_contract(row)
+        contract_data["negotiations"] = negotiations
+        details[row["contract_id"]] = (contract_data, trader_ids, row)
+
+    return details
+
+
+def cache_contract_details(details):
+    """
+    Serialize loaded details into cache entries (see get_contract_entries).
+    """
+    entries = {}
+    for contract_id, (contract_data, trader_ids, row) in details.items():
+        entry = (
+            dumps_compact(contract_data),
+            row["updated_at"],
+            (row["user_id"], row["contract_status"], row["trader_user_id"], tuple(trader_ids)),
         )
 
-        for t in cursor.fetchall():
-            trader_map[t["user_id"]] = {
-                "trader_name": t["full_name"],
-                "trader_mobile": t["mobile_number"]
-            }
+        # Tagged by farm and trader so a farm delete or profile rename drops it.
+        tags = [f"farm:{row['farm_id']}"] + [f"user:{t}" for t in trader_ids]
+        contract_cache.set(contract_id, entry, tags=tags)
+        entries[contract_id] = entry
 
-    # 5. Enrich negotiations with trader info
-    for n in negotiations:
-        tid = n.get("trader_id")
-        if tid in trader_map:
-            n.update(trader_map[tid])
+    return entries
 
-    # 6. Send enriched contract
-    contract_data = format_contract(row)
-    contract_data["negotiations"] = negotiations
 
-    return jsonify({"contract": contract_data})
+def get_contract_entries(contract_ids, cursor=None):
+    """
+    Cached detail entries for contract_ids; misses are loaded in one batch
+    (on `cursor` when given, else on a fresh connection).
+    An entry is (serialized contract, updated_at, access) where access is
+    (owner_id, status, trader_user_id, interested trader ids).
+    """
+    entries = {}
+    misses = []
+    for contract_id in contract_ids:
+        entry = contract_cache.get(contract_id)
+        if entry is None:
+            misses.append(contract_id)
+        else:
+            entries[contract_id] = entry
+
+    if misses:
+        details = load_contract_details(cursor or get_db().cursor(), misses)
+        entries.update(cache_contract_details(details))
+
+    return entries
+
+
+def can_view_contract(access, user_id):
+    """
+    Owner, any trader while the contract is open, and traders that are
+    (or were) negotiating on it.
+    """
+    owner_id, status, trader_user_id, interested = access
+    return (
+        owner_id == user_id
+        or (status or "").lower() == "open"
+        or trader_user_id == user_id
+        or user_id in interested
+    )
+
+
+@contracts_bp.route("/contracts/<string:contract_id>", methods=["GET"])
+def get_contract(contract_id):
+    entry = get_contract_entries([contract_id]).get(contract_id)
+
+    if entry is None:
+        return jsonify({"message": "Contract not found"}), 404
+
+    contract, updated_at, _ = entry
+    body = b'{"contract":' + contract + b'}'
+    return conditional_json(body, private=True, last_modified=updated_at)
+
+
+def get_contracts_by_ids(user_id, raw_ids):
+    """
+    GET /contracts?ids=a,b,c -- results in request order; ids that do not
+    exist or are not visible to the caller are listed under "missing".
+    """
+    contract_ids = list(dict.fromkeys(i.strip() for i in raw_ids.split(",") if i.strip()))
+
+    if not contract_ids:
+        return jsonify({"message": "ids is required"}), 400
+    if len(contract_ids) > MAX_MULTI_GET:
+        return jsonify({"message": f"At most {MAX_MULTI_GET} ids per request"}), 400
+
+    entries = get_contract_entries(contract_ids)
+
+    found = []
+    missing = []
+    for contract_id in contract_ids:
+        entry = entries.get(contract_id)
+        if entry is not None and can_view_contract(entry[2], user_id):
+            found.append(entry[0])
+        else:
+            missing.append(contract_id)
+
+    # Splice cached per-contract bodies instead of re-serializing them.
+    body = (
+        b'{"contracts":[' + b",".join(found)
+        + b'],"missing":' + dumps_compact(missing) + b'}'
+    )
+    return conditional_json(body, private=True)
+
 
 
 
@@ -418,16 +702,23 @@ def cancel_contract(contract_id):
     db = get_db()
     cursor = db.cursor()
 
+    db.begin()
     cursor.execute(
         """
         UPDATE contracts 
-        SET contract_status='cancelled'
+        SET contract_status='cancelled', updated_at=NOW()
         WHERE contract_id=%s AND user_id=%s
     """,
         (contract_id, user_id),
     )
 
+    if cursor.rowcount:
+        set_search_status(cursor, contract_id, "cancelled")
+        refresh_listing(cursor, [contract_id])
+
     db.commit()
+    invalidate_contract(contract_id)
+    contracts_changed(cursor, [contract_id])
     return jsonify({"message": "Contract cancelled"})
 
 
@@ -460,16 +751,19 @@ def show_interest(contract_id):
         }
     )
 
+    db.begin()
     cursor.execute(
         """
         UPDATE contracts
-        SET negotiations=%s
+        SET negotiations=%s, updated_at=NOW()
         WHERE contract_id=%s
     """,
         (json.dumps(negotiations), contract_id),
     )
+    refresh_listing(cursor, [contract_id])
 
     db.commit()
+    invalidate_contract(contract_id)
     return jsonify({"message": "Interest recorded"})
 
 
@@ -507,31 +801,31 @@ def accept_trader(contract_id, trader_id):
         if n.get("trader_id") == trader_id:
             n["status"] = "accepted"
 
+    db.begin()
     cursor.execute(
         """
         UPDATE contracts
         SET contract_status='negotiating',
             negotiations=%s,
-            trader_user_id=%s
+            trader_user_id=%s,
+            updated_at=NOW()
         WHERE contract_id=%s
     """,
         (json.dumps(negotiations), trader_id, contract_id),
     )
 
+    set_search_status(cursor, contract_id, "negotiating")
+    refresh_listing(cursor, [contract_id])
+
     db.commit()
+    invalidate_contract(contract_id)
+    contracts_changed(cursor, [contract_id])
     return jsonify({"message": "Trader accepted"})
 
 
 
-@contracts_bp.route("/contracts/form-data", methods=["GET"])
-def get_form_data():
-    user_id = get_current_user_id()
-    if not user_id:
-        return jsonify({"message": "Unauthorized"}), 401
-
-    db = get_db()
-    cursor = db.cursor()
-
+def fetch_user_farms(user_id):
+    cursor = get_db().cursor()
     cursor.execute(
         """
         SELECT farm_id, farm_name 
@@ -540,39 +834,54 @@ def get_form_data():
     """,
         (user_id,),
     )
-    farms = cursor.fetchall()
+    return cursor.fetchall()
 
-    cursor.execute("SELECT commodity_id, commodity_name FROM m_commodity")
-    commodities = cursor.fetchall()
 
-    cursor.execute(
-        """
-        SELECT variety_id, commodity_id, variety_name 
-        FROM m_commodity_variety
+@contracts_bp.route("/contracts/form-data/reference", methods=["GET"])
+def get_form_reference_data():
     """
-    )
-    varieties = cursor.fetchall()
+    Global part of the form data (commodities with their varieties, units).
+    Public and cacheable; ETag is the snapshot version.
+    """
+    return commodity_snapshot.get().body.to_response()
 
-    cursor.execute(
-        """
-        SELECT unit_id, unit_name 
-        FROM m_produce_unit
+
+@contracts_bp.route("/contracts/form-data/farms", methods=["GET"])
+def get_form_farms():
     """
-    )
-    units = cursor.fetchall()
+    Per-user part of the form data. The only piece that touches the DB.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({"message": "Unauthorized"}), 401
 
-    return jsonify(
-        {
-            "farms": farms,
-            "commodities": commodities,
-            "varieties": varieties,
-            "units": units,
-        }
+    body = dumps_compact({"farms": fetch_user_farms(user_id)})
+    return conditional_json(body, private=True)
+
+
+@contracts_bp.route("/contracts/form-data", methods=["GET"])
+def get_form_data():
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({"message": "Unauthorized"}), 401
+
+    reference = commodity_snapshot.get()
+    farms = dumps_compact(fetch_user_farms(user_id))
+
+    # Splice the per-user farms into the precomputed reference body
+    # instead of re-serializing every commodity and variety.
+    body = (
+        b'{"farms":' + farms
+        + b',"referenceVersion":"' + reference.version.encode("ascii") + b'",'
+        + reference.body.raw[1:]
     )
+    etag = make_etag(reference.version, content_etag(farms))
+    return conditional_json(body, etag, private=True)
 
 
 
 @contracts_bp.route("/contracts/<string:contract_id>/images", methods=["POST"])
+@idempotent("contracts.images", get_current_user_id)
 def upload_contract_images(contract_id):
     user_id = get_current_user_id()
     if not user_id:
@@ -604,6 +913,9 @@ def upload_contract_images(contract_id):
     UPLOAD_DIR = os.getenv("CONTRACT_IMAGE_PATH", "uploads/contracts")
     os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+    # Only uploads need PIL; keep it out of worker startup.
+    from PIL import Image
+
     inserted = 0
 
     for file in files:
@@ -664,6 +976,7 @@ def upload_contract_images(contract_id):
         inserted += 1
 
     db.commit()
+    invalidate_contract(contract_id)
 
     return jsonify({
         "message": "Images uploaded successfully",
@@ -679,31 +992,57 @@ def serve_contract_image(filename):
 
 
 
-@contracts_bp.route("/contracts/<string:contract_id>/images", methods=["GET"])
-def get_contract_images(contract_id):
-    db = get_db()
-    cursor = db.cursor()
+IMAGES_SQL = """
+    SELECT image_id,
+           original_filename,
+           uploader_role,
+           upload_stage,
+           created_at
+    FROM contract_images
+    WHERE contract_id=%s
+    ORDER BY created_at DESC
+"""
+
+LATEST_IMAGE_REQUEST_SQL = """
+    SELECT request_id, message, status, created_at
+    FROM contract_image_requests
+    WHERE contract_id=%s
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
 
-    cursor.execute(
-        """
-        SELECT image_id,
-               original_filename,
-               uploader_role,
-               upload_stage,
-               created_at
-        FROM contract_images
-        WHERE contract_id=%s
-        ORDER BY created_at DESC
-        """,
-        (contract_id,)
-    )
 
-    images = cursor.fetchall()
+def format_images(images):
     base_url = os.getenv("BASE_URL", "http://localhost:5005")
 
     for img in images:
         img["image_url"] = f"{base_url}/contracts/images/{img['original_filename']}"
 
+    return images
+
+
+def format_image_request(req):
+    if not req:
+        return None
+
+    return {
+        "request_id": req["request_id"],
+        "message": req["message"],
+        "status": req["status"],
+        "created_at": req["created_at"]
+    }
+
+
+@contracts_bp.route("/contracts/<string:contract_id>/images", methods=["GET"])
+@conditional(contract_images_validators, private=True)
+def get_contract_images(contract_id):
+    db = get_db()
+    cursor = db.cursor()
+
+    cursor.execute(IMAGES_SQL, (contract_id,))
+
+    images = format_images(cursor.fetchall())
+
     return jsonify({"images": images})
 
 
@@ -752,6 +1091,7 @@ def create_image_request(contract_id):
     )
 
     db.commit()
+    invalidate_contract(contract_id)
     return jsonify({"message": "Image request sent"}), 201
 
 
@@ -765,30 +1105,9 @@ def get_image_request(contract_id):
     db = get_db()
     cursor = db.cursor()
 
-    cursor.execute(
-        """
-        SELECT request_id, message, status, created_at
-        FROM contract_image_requests
-        WHERE contract_id=%s
-        ORDER BY created_at DESC
-        LIMIT 1
-        """,
-        (contract_id,)
-    )
-
-    req = cursor.fetchone()
-
-    if not req:
-        return jsonify({"request": None})
+    cursor.execute(LATEST_IMAGE_REQUEST_SQL, (contract_id,))
 
-    return jsonify({
-        "request": {
-            "request_id": req["request_id"],
-            "message": req["message"],
-            "status": req["status"],
-            "created_at": req["created_at"]
-        }
-    })
+    return jsonify({"request": format_image_request(cursor.fetchone())})
 
 
 
@@ -823,4 +1142,105 @@ def fulfill_image_request(contract_id):
     )
 
     db.commit()
+    invalidate_contract(contract_id)
     return jsonify({"message": "Image request fulfilled"})
+
+
+
+# -----------------------------------------------------------------
+# Detail-page bundle
+# -----------------------------------------------------------------
+FARM_SUMMARY_SQL = """
+    SELECT f.farm_id, f.farm_name, f.farm_size_area, f.farm_size_unit, f.soil_type,
+           f.location_latitude, f.location_longitude,
+           d.district_id, d.district_name,
+           v.division_id, v.division_name
+    FROM m_farm f
+    LEFT JOIN m_district d ON d.district_id = f.farm_district
+    LEFT JOIN m_division v ON v.division_id = f.farm_division
+    WHERE f.farm_id = (SELECT farm_id FROM contracts WHERE contract_id=%s)
+"""
+
+
+def format_farm_summary(row):
+    if not row:
+        return None
+
+    return {
+        "farm_id": row["farm_id"],
+        "farm_name": row["farm_name"],
+        "farm_size_area": row["farm_size_area"],
+        "farm_size_unit": row["farm_size_unit"],
+        "soil_type": row["soil_type"],
+        "location_latitude": row["location_latitude"],
+        "location_longitude": row["location_longitude"],
+
+        "district": {
+            "district_id": row["district_id"],
+            "district_name": row["district_name"]
+        } if row["district_id"] else None,
+
+        "division": {
+            "division_id": row["division_id"],
+            "division_name": row["division_name"]
+        } if row["division_id"] else None
+    }
+
+
+# section -> (sql, formatter(rows))
+BUNDLE_SECTIONS = {
+    "images": (IMAGES_SQL, format_images),
+    "image_request": (LATEST_IMAGE_REQUEST_SQL, lambda rows: format_image_request(rows[0] if rows else None)),
+    "farm": (FARM_SUMMARY_SQL, lambda rows: format_farm_summary(rows[0] if rows else None)),
+}
+
+
+@contracts_bp.route("/contracts/<string:contract_id>/bundle", methods=["GET"])
+def get_contract_bundle(contract_id):
+    """
+    Contract detail plus ?include=images,image_request,farm (default: all)
+    in one response. Everything runs on one connection from the
+    multi-statement pool; the selected sections go to MySQL as a single
+    multi-statement query.
+    """
+    user_id = get_current_user_id()
+    if not user_id:
+        return jsonify({"message": "Unauthorized"}), 401
+
+    include = request.args.get("include")
+    if include is None:
+        sections = list(BUNDLE_SECTIONS)
+    else:
+        sections = list(dict.fromkeys(p.strip() for p in include.split(",") if p.strip()))
+        unknown = [p for p in sections if p not in BUNDLE_SECTIONS]
+        if unknown:
+            return jsonify({
+                "message": f"Unknown include: {', '.join(unknown)}",
+                "allowed": list(BUNDLE_SECTIONS)
+            }), 400
+
+    with multi_statement_pool.connection() as conn:
+        cursor = conn.cursor()
+
+        entry = get_contract_entries([contract_id], cursor).get(contract_id)
+        if entry is None or not can_view_contract(entry[2], user_id):
+            return jsonify({"message": "Contract not found"}), 404
+
+        result = {}
+        if sections:
+            cursor.execute(
+                ";".join(BUNDLE_SECTIONS[name][0] for name in sections),
+                tuple(contract_id for _ in sections)
+            )
+            for i, name in enumerate(sections):
+                if i:
+                    cursor.nextset()
+                result[name] = BUNDLE_SECTIONS[name][1](list(cursor.fetchall()))
+
+    contract, updated_at, _ = entry
+    body = b'{"contract":' + contract
+    if result:
+        body += b"," + dumps_compact(result)[1:]
+    else:
+        body += b"}"
+    return conditional_json(body, private=True)
@@ -1,21 +1,24 @@
 from flask import Blueprint, request, jsonify
 import pymysql
-import os
 import json
 import jwt
 from datetime import datetime
+from conditional import conditional, make_etag
+from geo_index import farm_changed, farm_deleted
+from listing import remove_farm_listings
+from cache import invalidate_farm
+from config import SECRET_KEY, DB_SETTINGS
+from revocation import is_revoked
+from idempotency import idempotent
+from schemas import FARM_SCHEMA, SchemaError, load_request
 
 farms_bp = Blueprint("farms", __name__, url_prefix="/farms")
 
-SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key-change-this')
 
 
 def get_db():
     return pymysql.connect(
-        host=os.environ.get("DB_HOST", "localhost"),
-        user=os.environ.get("DB_USER", "root"),
-        password=os.environ.get("DB_PASSWORD", ""),
-        db=os.environ.get("DB_NAME", "sisjk"),
+        **DB_SETTINGS,
         cursorclass=pymysql.cursors.DictCursor,
         autocommit=True
     )
@@ -41,6 +44,9 @@ def get_current_user_id():
         if not mobile:
             return None
 
+        if is_revoked(payload):
+            return None
+
         conn = get_db()
         with conn.cursor() as cur:
             cur.execute("""
@@ -62,15 +68,6 @@ def get_current_user_id():
 
 
 
-def to_float(value):
-    if value in ("", None):
-        return None
-    try:
-        return float(value)
-    except:
-        return None
-
-
 def safe_json(value):
     """Convert DB JSON string → python list"""
     try:
@@ -142,7 +139,27 @@ def list_farms():
 
 
 
+def farm_validators(farm_id):
+    conn = get_db()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT updated_at FROM m_farm WHERE farm_id = %s",
+                (farm_id,)
+            )
+            row = cur.fetchone()
+    finally:
+        conn.close()
+
+    if not row:
+        return None
+
+    return make_etag(farm_id, row["updated_at"]), row["updated_at"]
+
+
+
 @farms_bp.route("/<int:farm_id>", methods=["GET"])
+@conditional(farm_validators, private=True)
 def get_farm(farm_id):
     try:
         conn = get_db()
@@ -219,8 +236,12 @@ def get_farm(farm_id):
 
 
 @farms_bp.route("", methods=["POST"])
+@idempotent("farms.create", get_current_user_id)
 def create_farm():
-    data = request.get_json()
+    try:
+        data = load_request(FARM_SCHEMA)
+    except SchemaError as e:
+        return e.response()
 
     try:
         user_id = get_current_user_id()
@@ -229,37 +250,38 @@ def create_farm():
 
         now = datetime.now()
 
-        soil = data.get("soilInformation", {})
-        farm_size = data.get("farmSize", {})
-        coords = (data.get("location") or {}).get("coordinates") or {}
-        facilities = data.get("facilities") or {}
-
-        lat = to_float(coords.get("latitude"))
-        lon = to_float(coords.get("longitude"))
-        soil_ph = to_float(soil.get("phLevel"))
-        soil_om = to_float(soil.get("organicMatter"))
-        soil_n = to_float(soil.get("nitrogen"))
-        soil_p = to_float(soil.get("phosphorus"))
-        soil_k = to_float(soil.get("potassium"))
-        size_area = to_float(farm_size.get("area"))
-
-        size_unit = farm_size.get("unit") or None
-        facilities_capacity = to_float(facilities.get("storageCapacity"))
-        facilities_type = facilities.get("storageType") or None
-
-        proc_fac = 1 if facilities.get("processingFacility") else 0
-        cold_store = 1 if facilities.get("coldStorage") else 0
-        pack_fac = 1 if facilities.get("packingFacility") else 0
-        quality_lab = 1 if facilities.get("qualityTestingLab") else 0
-
-        soil_test_date = soil.get("soilTestDate") or None
-
-        farming_techniques = json.dumps(data.get("farmingTechniques") or [])
-        certifications = json.dumps(data.get("certifications") or [])
-        current_crops = json.dumps(data.get("currentCrops") or [])
-        farm_history = json.dumps(data.get("farmHistory") or [])
-        media_images = json.dumps(data.get("farmImages") or [])
-        media_videos = json.dumps(data.get("farmVideos") or [])
+        # FARM_SCHEMA already coerced numbers and filled blanks with None.
+        soil = data["soilInformation"]
+        farm_size = data["farmSize"]
+        coords = data["location"]["coordinates"]
+        facilities = data["facilities"]
+
+        lat = coords["latitude"]
+        lon = coords["longitude"]
+        soil_ph = soil["phLevel"]
+        soil_om = soil["organicMatter"]
+        soil_n = soil["nitrogen"]
+        soil_p = soil["phosphorus"]
+        soil_k = soil["potassium"]
+        size_area = farm_size["area"]
+
+        size_unit = farm_size["unit"]
+        facilities_capacity = facilities["storageCapacity"]
+        facilities_type = facilities["storageType"]
+
+        proc_fac = 1 if facilities["processingFacility"] else 0
+        cold_store = 1 if facilities["coldStorage"] else 0
+        pack_fac = 1 if facilities["packingFacility"] else 0
+        quality_lab = 1 if facilities["qualityTestingLab"] else 0
+
+        soil_test_date = soil["soilTestDate"]
+
+        farming_techniques = json.dumps(data["farmingTechniques"])
+        certifications = json.dumps(data["certifications"])
+        current_crops = json.dumps(data["currentCrops"])
+        farm_history = json.dumps(data["farmHistory"])
+        media_images = json.dumps(data["farmImages"])
+        media_videos = json.dumps(data["farmVideos"])
 
         sql = """
             INSERT INTO m_farm (
@@ -295,20 +317,20 @@ def create_farm():
         with conn.cursor() as cur:
             cur.execute(sql, (
                 user_id,
-                data.get("farmName"),
-                data.get("farmDivision"),
-                data.get("farmDistrict"),
-                data.get("farmTehsil"),
-                data.get("farmBlock"),
+                data["farmName"],
+                data["farmDivision"],
+                data["farmDistrict"],
+                data["farmTehsil"],
+                data["farmBlock"],
 
                 lat, lon,
                 size_area, size_unit,
 
-                soil.get("soilType"), soil_ph, soil_om, soil_n,
-                soil_p, soil_k, soil_test_date, soil.get("soilTestReport"),
+                soil["soilType"], soil_ph, soil_om, soil_n,
+                soil_p, soil_k, soil_test_date, soil["soilTestReport"],
 
-                data.get("irrigationSystem"),
-                data.get("waterSource"),
+                data["irrigationSystem"],
+                data["waterSource"],
 
                 farming_techniques,
                 certifications,
@@ -329,6 +351,7 @@ def create_farm():
             ))
 
             farm_id = cur.lastrowid
+            farm_changed(cur, farm_id)
 
         conn.close()
         return jsonify({"farmId": farm_id, "message": "Farm created successfully"}), 201
@@ -347,11 +370,20 @@ def delete_farm(farm_id):
 
         conn = get_db()
         with conn.cursor() as cur:
+            conn.begin()
             cur.execute(
                 "DELETE FROM m_farm WHERE farm_id = %s AND user_id = %s",
                 (farm_id, user_id)
             )
+            deleted = cur.rowcount
+            if deleted:
+                remove_farm_listings(cur, farm_id)
+            conn.commit()
         conn.close()
+
+        if deleted:
+            farm_deleted(farm_id)
+            invalidate_farm(farm_id)
         return jsonify({"message": "Farm deleted successfully"}), 200
 
     except Exception as e:
@@ -1,29 +1,52 @@
-from flask import Blueprint, jsonify, current_app
-import os
-import pymysql
+from flask import Blueprint, jsonify, request, current_app
+from reference_data import (
+    location_snapshot, division_list_payload, division_tree_payload,
+    district_tree_payload, districts_payload, tehsils_payload, blocks_payload
+)
 
 locations_bp = Blueprint('locations', __name__, url_prefix='/locations')
 
-def get_db_connection():
-    return pymysql.connect(
-        host=os.environ.get('DB_HOST', 'localhost'),
-        user=os.environ.get('DB_USER', 'root'),
-        password=os.environ.get('DB_PASSWORD', ''),
-        db=os.environ.get('DB_NAME', 'sisjk'),
-        cursorclass=pymysql.cursors.DictCursor,
-        autocommit=True,
-        charset='utf8mb4'
-    )
+
+@locations_bp.route('/tree', methods=['GET'])
+def get_tree():
+    """
+    Whole location hierarchy in one precomputed document, or the subtree of
+    ?division_id= / ?district_id=. ETag changes only when the tables do.
+    """
+    try:
+        state = location_snapshot.get()
+
+        division_id = request.args.get('division_id', type=int)
+        district_id = request.args.get('district_id', type=int)
+
+        if district_id is not None:
+            if not state.contains('district_nodes', district_id):
+                return jsonify({'message': 'District not found'}), 404
+            body = state.derived_body(
+                f'tree:district:{district_id}',
+                lambda data: district_tree_payload(data, district_id)
+            )
+        elif division_id is not None:
+            if not state.contains('division_nodes', division_id):
+                return jsonify({'message': 'Division not found'}), 404
+            body = state.derived_body(
+                f'tree:division:{division_id}',
+                lambda data: division_tree_payload(data, division_id)
+            )
+        else:
+            body = state.body
+
+        return body.to_response()
+    except Exception as e:
+        current_app.logger.exception("Failed to fetch location tree")
+        return jsonify({'message': str(e)}), 500
 
 @locations_bp.route('/divisions', methods=['GET'])
 def get_divisions():
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("SELECT division_id, division_name FROM m_division ORDER BY division_name")
-            rows = cur.fetchall()
-        conn.close()
-        return jsonify({'divisions': rows}), 200
+        state = location_snapshot.get()
+        body = state.derived_body('divisions', division_list_payload)
+        return body.to_response()
     except Exception as e:
         current_app.logger.exception("Failed to fetch divisions")
         return jsonify({'message': str(e)}), 500
@@ -31,17 +54,15 @@ def get_divisions():
 @locations_bp.route('/divisions/<int:division_id>/districts', methods=['GET'])
 def get_districts(division_id):
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT district_id, district_name 
-                FROM m_district 
-                WHERE division_id=%s
-                ORDER BY district_name
-            """, (division_id,))
-            rows = cur.fetchall()
-        conn.close()
-        return jsonify({'districts': rows}), 200
+        state = location_snapshot.get()
+        if not state.contains('division_nodes', division_id):
+            return jsonify({'districts': []}), 200
+
+        body = state.derived_body(
+            f'districts:{division_id}',
+            lambda data: districts_payload(data, division_id)
+        )
+        return body.to_response()
     except Exception as e:
         current_app.logger.exception("Failed to fetch districts")
         return jsonify({'message': str(e)}), 500
@@ -49,17 +70,15 @@ def get_districts(division_id):
 @locations_bp.route('/districts/<int:district_id>/tehsils', methods=['GET'])
 def get_tehsils(district_id):
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT tehsil_id, tehsil_name 
-                FROM m_tehsil 
-                WHERE district_id=%s
-                ORDER BY tehsil_name
-            """, (district_id,))
-            rows = cur.fetchall()
-        conn.close()
-        return jsonify({'tehsils': rows}), 200
+        state = location_snapshot.get()
+        if not state.contains('district_nodes', district_id):
+            return jsonify({'tehsils': []}), 200
+
+        body = state.derived_body(
+            f'tehsils:{district_id}',
+            lambda data: tehsils_payload(data, district_id)
+        )
+        return body.to_response()
     except Exception as e:
         current_app.logger.exception("Failed to fetch tehsils")
         return jsonify({'message': str(e)}), 500
@@ -67,17 +86,15 @@ def get_tehsils(district_id):
 @locations_bp.route('/districts/<int:district_id>/blocks', methods=['GET'])
 def get_blocks(district_id):
     try:
-        conn = get_db_connection()
-        with conn.cursor() as cur:
-            cur.execute("""
-                SELECT block_id, block_name 
-                FROM m_block 
-                WHERE district_id=%s
-                ORDER BY block_name
-            """, (district_id,))
-            rows = cur.fetchall()
-        conn.close()
-        return jsonify({'blocks': rows}), 200
+        state = location_snapshot.get()
+        if not state.contains('district_nodes', district_id):
+            return jsonify({'blocks': []}), 200
+
+        body = state.derived_body(
+            f'blocks:{district_id}',
+            lambda data: blocks_payload(data, district_id)
+        )
+        return body.to_response()
     except Exception as e:
         current_app.logger.exception("Failed to fetch blocks")
         return jsonify({'message': str(e)}), 500
@@ -0,0 +1,68 @@
+from flask import Blueprint, request, jsonify, current_app
+from map_clusters import layers, x_lon, y_lat, MAP_MAX_ZOOM
+from reference_data import commodity_snapshot
+from routes.trader_routes import get_current_user_id
+
+map_bp = Blueprint('map', __name__, url_prefix='/map')
+
+
+def parse_bbox(raw):
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in raw.split(','))
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError
+    return min_lon, min_lat, max_lon, max_lat
+
+
+@map_bp.route('/clusters', methods=['GET'])
+def get_clusters():
+    """
+    ?layer=contracts|farms&zoom=6&bbox=minLon,minLat,maxLon,maxLat
+    Clusters (centroid, count, commodity breakdown) at low zoom,
+    individual points once they no longer overlap.
+    """
+    if not get_current_user_id():
+        return jsonify({'message': 'Unauthorized'}), 401
+
+    layer = layers.get(request.args.get('layer', 'contracts'))
+    if not layer:
+        return jsonify({'message': 'layer must be contracts or farms'}), 400
+
+    try:
+        zoom = int(request.args.get('zoom', 0))
+        bbox = parse_bbox(request.args.get('bbox', '-180,-85,180,85'))
+    except ValueError:
+        return jsonify({'message': 'zoom must be an integer and bbox minLon,minLat,maxLon,maxLat'}), 400
+
+    try:
+        reference = commodity_snapshot.get()
+        names = {}
+
+        def commodity_name(cid):
+            if cid not in names:
+                names[cid] = reference.lookup('commodity_names', cid)
+            return names[cid]
+
+        features = []
+        for node in layer.query(bbox, zoom):
+            feature = {
+                'type': 'cluster' if node.is_cluster else 'point',
+                'lat': round(y_lat(node.y), 6),
+                'lon': round(x_lon(node.x), 6),
+                'count': node.count,
+                'commodities': [
+                    {'commodity_id': cid, 'commodity_name': commodity_name(cid), 'count': n}
+                    for cid, n in node.commodities.most_common()
+                ],
+            }
+            if not node.is_cluster:
+                feature['id'] = node.key
+            features.append(feature)
+
+        return jsonify({
+            'layer': layer.name,
+            'zoom': min(max(zoom, 0), MAP_MAX_ZOOM),
+            'features': features
+        }), 200
+    except Exception as e:
+        current_app.logger.exception("Map clustering failed")
+        return jsonify({'message': str(e)}), 500
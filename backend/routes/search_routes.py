@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify, current_app
+from autocomplete import get_index, KINDS
+
+search_bp = Blueprint('search', __name__, url_prefix='/search')
+
+MAX_LIMIT = 50
+
+
+@search_bp.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    """
+    ?q=<prefix>&type=block,district&limit=10
+    Matches location and commodity names, with parent breadcrumbs.
+    """
+    q = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    if limit < 1:
+        return jsonify({'message': 'limit must be at least 1'}), 400
+    limit = min(limit, MAX_LIMIT)
+
+    kinds = None
+    if request.args.get('type'):
+        kinds = {k.strip() for k in request.args['type'].split(',') if k.strip() in KINDS}
+        if not kinds:
+            return jsonify({'message': f"type must be one of {', '.join(KINDS)}"}), 400
+
+    try:
+        results = get_index().search(q, kinds, limit)
+        return jsonify({'query': q, 'results': results}), 200
+    except Exception as e:
+        current_app.logger.exception("Autocomplete failed")
+        return jsonify({'message': str(e)}), 500
@@ -1,13 +1,19 @@
 import json
+import math
 import datetime
 import jwt
 from flask import Blueprint, request, jsonify
 from db import get_db
-import os
+from compression import json_list_response
+from contract_search import search_contracts, set_search_status
+from geo_index import open_contracts, contracts_changed
+from listing import refresh_listing
+from cache import invalidate_contract
+from config import SECRET_KEY
+from revocation import is_revoked
 
 trader_bp = Blueprint("trader", __name__, url_prefix="/trader")
 
-SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key-change-this")
 
 
 
@@ -27,6 +33,9 @@ def get_current_user_id():
         if not mobile:
             return None
 
+        if is_revoked(payload):
+            return None
+
         db = get_db()
         with db.cursor() as cur:
             cur.execute("""
@@ -46,6 +55,11 @@ def get_current_user_id():
 
 
 
+# Marketplace reads hit the flattened read model only (see listing.py);
+# it carries every field format_available_contract needs.
+MARKET_SELECT = "SELECT c.* FROM contract_listing c"
+
+
 def format_available_contract(row):
     def to_iso(dt):
         if not dt:
@@ -124,6 +138,96 @@ def format_available_contract(row):
 
 
 
+def parse_date(value):
+    return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def parse_finite(value):
+    # float() accepts "nan" and "inf", which MySQL cannot bind.
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(value)
+    return number
+
+
+# Whitelisted marketplace filters: query param -> (SQL condition, parser).
+# Only these fragments ever reach the query; values are always bound.
+MARKET_FILTERS = {
+    "commodity_id": ("c.commodity_id = %s", int),
+    "variety_id": ("c.variety_id = %s", int),
+    "division_id": ("c.farm_division = %s", int),
+    "district_id": ("c.farm_district = %s", int),
+    "tehsil_id": ("c.farm_tehsil = %s", int),
+    "block_id": ("c.farm_block = %s", int),
+    "quality": ("c.commodity_quality = %s", str),
+    "min_price": ("c.base_price >= %s", parse_finite),
+    "max_price": ("c.base_price <= %s", parse_finite),
+    "min_quantity": ("c.crop_quantity_amount >= %s", parse_finite),
+    "max_quantity": ("c.crop_quantity_amount <= %s", parse_finite),
+    "harvest_from": ("c.harvesting_date >= %s", parse_date),
+    "harvest_to": ("c.harvesting_date <= %s", parse_date),
+}
+
+MARKET_SORTS = {
+    "newest": "c.created_at DESC, c.id DESC",
+    "price_asc": "c.base_price ASC, c.id ASC",
+    "price_desc": "c.base_price DESC, c.id DESC",
+    "quantity_asc": "c.crop_quantity_amount ASC, c.id ASC",
+    "quantity_desc": "c.crop_quantity_amount DESC, c.id DESC",
+    "harvest_asc": "c.harvesting_date ASC, c.id ASC",
+    "harvest_desc": "c.harvesting_date DESC, c.id DESC",
+}
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+MAX_RADIUS_KM = 500
+NEARBY_BATCH = 500
+
+
+def build_market_filters(args):
+    """
+    Returns (conditions, params) for the whitelisted filters present in args.
+    Raises ValueError with a client-facing message on bad input.
+    """
+    conditions = []
+    params = []
+
+    for name, (condition, parse) in MARKET_FILTERS.items():
+        raw = args.get(name)
+        if raw in (None, ""):
+            continue
+        try:
+            params.append(parse(raw))
+        except ValueError:
+            raise ValueError(f"Invalid value for {name}: {raw}")
+        conditions.append(condition)
+
+    return conditions, params
+
+
+def parse_paging(args, paged_by_default=True):
+    """
+    Returns (sort, page, page_size). With paged_by_default=False and
+    neither page nor page_size given, page_size is None (unpaged).
+    """
+    sort = args.get("sort", "newest")
+    if sort not in MARKET_SORTS:
+        raise ValueError(f"sort must be one of {', '.join(MARKET_SORTS)}")
+
+    if not paged_by_default and "page" not in args and "page_size" not in args:
+        return sort, 1, None
+
+    try:
+        page = max(int(args.get("page", 1)), 1)
+        page_size = min(max(int(args.get("page_size", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        raise ValueError("page and page_size must be integers")
+
+    return sort, page, page_size
+
+
+
 @trader_bp.route("/contracts/available", methods=["GET"])
 def get_available_contracts():
     trader_id = get_current_user_id()
@@ -135,40 +239,21 @@ def get_available_contracts():
     db = get_db()
     cur = db.cursor()
 
-    base_query = """
-        SELECT 
-            c.*,
-            f.farm_name, f.farm_id,
-            f.farm_division, f.farm_district, f.farm_tehsil, f.farm_block,
-            d.division_name,
-            dist.district_name,
-            t.tehsil_name,
-            b.block_name,
-            com.commodity_name,
-            v.variety_name,
-            u.full_name AS farmer_name
-        FROM contracts c
-        JOIN m_farm f ON f.farm_id = c.farm_id
-        JOIN m_commodity com ON com.commodity_id = c.commodity_id
-        JOIN m_commodity_variety v ON v.variety_id = c.variety_id
-        JOIN m_user_login u ON u.user_id = c.user_id
-        LEFT JOIN m_division d ON d.division_id = f.farm_division
-        LEFT JOIN m_district dist ON dist.district_id = f.farm_district
-        LEFT JOIN m_tehsil t ON t.tehsil_id = f.farm_tehsil
-        LEFT JOIN m_block b ON b.block_id = f.farm_block
-        WHERE c.user_id != %s
-    """
+    base_query = MARKET_SELECT + " WHERE c.user_id != %s"
 
     params = [trader_id]
 
+    # contract_status uses a case-insensitive collation, so plain equality
+    # matches 'open'/'Open' and can use the (contract_status, ...) indexes.
+
     # ✅ OPEN TAB → ONLY OPEN CONTRACTS
     if status == "open":
-        base_query += " AND LOWER(c.contract_status) = 'open'"
+        base_query += " AND c.contract_status = 'open'"
 
     # ✅ NEGOTIATING TAB → ONLY SELECTED TRADER
     elif status == "negotiating":
         base_query += """
-            AND LOWER(c.contract_status) = 'negotiating'
+            AND c.contract_status = 'negotiating'
             AND c.trader_user_id = %s
         """
         params.append(trader_id)
@@ -177,14 +262,158 @@ def get_available_contracts():
     else:
         return jsonify({"contracts": []}), 200
 
-    base_query += " ORDER BY c.created_at DESC"
+    try:
+        conditions, filter_params = build_market_filters(request.args)
+        # Unpaged unless the client asks: the dashboard counts the full list.
+        sort, page, page_size = parse_paging(request.args, paged_by_default=False)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    for condition in conditions:
+        base_query += " AND " + condition
+    params.extend(filter_params)
+
+    base_query += " ORDER BY " + MARKET_SORTS[sort]
+    if page_size is None:
+        cur.execute(base_query, params)
+        return json_list_response("contracts", cur.fetchall(), format_available_contract), 200
+
+    # Fetch one extra row to know whether another page exists.
+    base_query += " LIMIT %s OFFSET %s"
+    params.extend([page_size + 1, (page - 1) * page_size])
 
     cur.execute(base_query, params)
     rows = cur.fetchall()
 
-    return jsonify({
-        "contracts": [format_available_contract(r) for r in rows]
-    }), 200
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    return json_list_response(
+        "contracts", rows, format_available_contract,
+        extra={"page": page, "pageSize": page_size, "sort": sort, "hasMore": has_more}
+    ), 200
+
+
+
+@trader_bp.route("/contracts/search", methods=["GET"])
+def search_available_contracts():
+    """
+    ?q=basmati karnal organic&page=1&page_size=20
+    Open contracts ranked by full-text relevance, decayed by age.
+    """
+    trader_id = get_current_user_id()
+    if not trader_id:
+        return jsonify({"message": "Unauthorized"}), 401
+
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"message": "q is required"}), 400
+
+    try:
+        _, page, page_size = parse_paging(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    db = get_db()
+    cur = db.cursor()
+
+    hits = search_contracts(cur, q, trader_id, page_size + 1, (page - 1) * page_size)
+    has_more = len(hits) > page_size
+    hits = hits[:page_size]
+
+    rows = []
+    if hits:
+        cur.execute(
+            MARKET_SELECT + " WHERE c.contract_id IN %s",
+            (tuple(cid for cid, _ in hits),)
+        )
+        by_id = {r["contract_id"]: r for r in cur.fetchall()}
+
+        # Keep the ranking order of the search hits.
+        for contract_id, relevance in hits:
+            if contract_id in by_id:
+                row = by_id[contract_id]
+                row["relevance"] = relevance
+                rows.append(row)
+
+    def format_hit(row):
+        contract = format_available_contract(row)
+        contract["relevance"] = row["relevance"]
+        return contract
+
+    return json_list_response(
+        "contracts", rows, format_hit,
+        extra={"query": q, "page": page, "pageSize": page_size, "hasMore": has_more}
+    ), 200
+
+
+
+@trader_bp.route("/contracts/nearby", methods=["GET"])
+def get_nearby_contracts():
+    """
+    ?lat=&lon=&radius_km=50&limit=50 plus any marketplace filter.
+    Open contracts whose farm lies within radius_km, nearest first.
+    """
+    trader_id = get_current_user_id()
+    if not trader_id:
+        return jsonify({"message": "Unauthorized"}), 401
+
+    try:
+        lat = float(request.args["lat"])
+        lon = float(request.args["lon"])
+        radius_km = float(request.args.get("radius_km", 50))
+        limit = min(max(int(request.args.get("limit", 50)), 1), MAX_PAGE_SIZE)
+    except (KeyError, ValueError):
+        return jsonify({"message": "lat and lon are required numbers"}), 400
+
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return jsonify({"message": "lat/lon out of range"}), 400
+    if not (0 < radius_km <= MAX_RADIUS_KM):
+        return jsonify({"message": f"radius_km must be between 0 and {MAX_RADIUS_KM}"}), 400
+
+    try:
+        conditions, filter_params = build_market_filters(request.args)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    # Candidates come from the in-memory grid, already sorted by distance;
+    # MySQL only sees id batches for the whitelisted filters.
+    hits = [
+        (distance, contract_id)
+        for distance, contract_id, props in open_contracts.within(lat, lon, radius_km)
+        if props["user_id"] != trader_id
+    ]
+
+    query = MARKET_SELECT + " WHERE c.contract_id IN %s AND c.contract_status = 'open'"
+    for condition in conditions:
+        query += " AND " + condition
+
+    db = get_db()
+    cur = db.cursor()
+
+    rows = []
+    for start in range(0, len(hits), NEARBY_BATCH):
+        distances = {cid: d for d, cid in hits[start:start + NEARBY_BATCH]}
+        cur.execute(query, [tuple(distances)] + filter_params)
+
+        found = cur.fetchall()
+        for row in found:
+            row["distance_km"] = distances[row["contract_id"]]
+        found.sort(key=lambda r: r["distance_km"])
+
+        rows.extend(found)
+        if len(rows) >= limit:
+            break
+
+    def format_nearby(row):
+        contract = format_available_contract(row)
+        contract["distanceKm"] = round(row["distance_km"], 2)
+        return contract
+
+    return json_list_response(
+        "contracts", rows[:limit], format_nearby,
+        extra={"center": {"lat": lat, "lon": lon}, "radiusKm": radius_km}
+    ), 200
 
 
 
@@ -213,13 +442,16 @@ def show_interest(contract_id):
         "timestamp": datetime.datetime.now().isoformat()
     })
 
+    db.begin()
     cur.execute("""
         UPDATE contracts 
-        SET negotiations=%s
+        SET negotiations=%s, updated_at=NOW()
         WHERE contract_id=%s
     """, (json.dumps(negotiations), contract_id))
+    refresh_listing(cur, [contract_id])
 
     db.commit()
+    invalidate_contract(contract_id)
 
     return jsonify({"message": "Interest added successfully"}), 200
 
@@ -242,15 +474,22 @@ def accept_trader(contract_id, trader_id):
         if n.get("trader_id") == trader_id:
             n["status"] = "accepted"
 
+    db.begin()
     cur.execute("""
         UPDATE contracts
         SET contract_status='Negotiating',
             negotiations=%s,
-            trader_user_id=%s
+            trader_user_id=%s,
+            updated_at=NOW()
         WHERE contract_id=%s
     """, (json.dumps(negotiations), trader_id, contract_id))
 
+    set_search_status(cur, contract_id, "Negotiating")
+    refresh_listing(cur, [contract_id])
+
     db.commit()
+    invalidate_contract(contract_id)
+    contracts_changed(cur, [contract_id])
 
     return jsonify({"message": "Trader accepted"}), 200
 
@@ -265,30 +504,7 @@ def get_single_contract(contract_id):
     db = get_db()
     cur = db.cursor()
 
-    cur.execute("""
-        SELECT 
-            c.*,
-            f.farm_name, f.farm_id,
-            f.farm_division, f.farm_district, f.farm_tehsil, f.farm_block,
-            d.division_name,
-            dist.district_name,
-            t.tehsil_name,
-            b.block_name,
-            com.commodity_name,
-            v.variety_name,
-            u.full_name AS farmer_name
-        FROM contracts c
-        JOIN m_farm f ON f.farm_id = c.farm_id
-        JOIN m_commodity com ON com.commodity_id = c.commodity_id
-        JOIN m_commodity_variety v ON v.variety_id = c.variety_id
-        JOIN m_user_login u ON u.user_id = c.user_id
-        LEFT JOIN m_division d ON d.division_id = f.farm_division
-        LEFT JOIN m_district dist ON dist.district_id = f.farm_district
-        LEFT JOIN m_tehsil t ON t.tehsil_id = f.farm_tehsil
-        LEFT JOIN m_block b ON b.block_id = f.farm_block
-        WHERE c.contract_id = %s
-        LIMIT 1
-    """, (contract_id,))
+    cur.execute(MARKET_SELECT + " WHERE c.contract_id = %s LIMIT 1", (contract_id,))
 
     row = cur.fetchone()
     if not row:
@@ -0,0 +1,361 @@
+import re
+import json
+import datetime
+from flask import request, jsonify
+
+# msgspec decodes JSON straight from bytes noticeably faster than the
+# stdlib; it is optional and only used for the parse step.
+try:
+    import msgspec
+    _decode_json = msgspec.json.decode
+    _DecodeError = msgspec.DecodeError
+except ImportError:
+    msgspec = None
+    _decode_json = json.loads
+    _DecodeError = ValueError
+
+
+class SchemaError(Exception):
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+    def response(self):
+        return jsonify({
+            "message": "Invalid request body",
+            "errors": [{"field": f, "error": e} for f, e in self.errors]
+        }), 400
+
+
+# -----------------------------------------------------------------
+# Field types
+#
+# Each field converts one JSON value or raises ValueError with a short
+# reason. Empty values ("", null, missing) never reach convert(): they are
+# "is required" for required fields and the default otherwise, which is
+# what the form-driven frontend sends for untouched inputs.
+# -----------------------------------------------------------------
+class Field:
+    def __init__(self, required=True, default=None):
+        self.required = required
+        self.default = default
+
+    def missing(self, path, errors):
+        # Fresh containers per call, never a shared mutable default.
+        return self.default() if callable(self.default) else self.default
+
+    def convert(self, value, path, errors):
+        return value
+
+
+class Str(Field):
+    """
+    strip=False keeps surrounding whitespace (passwords: login compares
+    the raw value).
+    """
+
+    def __init__(self, required=True, default=None, max_length=255, choices=None, pattern=None,
+                 strip=True):
+        super().__init__(required, default)
+        self.strip = strip
+        self.max_length = max_length
+        self.choices = frozenset(choices) if choices else None
+        self.pattern = re.compile(pattern) if pattern else None
+
+    def convert(self, value, path, errors):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        if not isinstance(value, str):
+            raise ValueError("must be a string")
+        if self.strip:
+            value = value.strip()
+        if not value:
+            if self.required:
+                raise ValueError("is required")
+            return self.missing(path, errors)
+        if self.max_length and len(value) > self.max_length:
+            raise ValueError(f"must be at most {self.max_length} characters")
+        if self.choices and value not in self.choices:
+            raise ValueError(f"must be one of {', '.join(sorted(self.choices))}")
+        if self.pattern and not self.pattern.fullmatch(value):
+            raise ValueError("has an invalid format")
+        return value
+
+
+class Int(Field):
+    def __init__(self, required=True, default=None, min_value=None):
+        super().__init__(required, default)
+        self.min_value = min_value
+
+    def convert(self, value, path, errors):
+        if isinstance(value, bool):
+            raise ValueError("must be an integer")
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        elif isinstance(value, str):
+            try:
+                value = int(value.strip())
+            except ValueError:
+                raise ValueError("must be an integer")
+        if not isinstance(value, int):
+            raise ValueError("must be an integer")
+        if self.min_value is not None and value < self.min_value:
+            raise ValueError(f"must be >= {self.min_value}")
+        return value
+
+
+class Number(Field):
+    def __init__(self, required=True, default=None, min_value=None, max_value=None):
+        super().__init__(required, default)
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def convert(self, value, path, errors):
+        if isinstance(value, bool):
+            raise ValueError("must be a number")
+        if isinstance(value, str):
+            try:
+                value = float(value.strip())
+            except ValueError:
+                raise ValueError("must be a number")
+        if not isinstance(value, (int, float)) or value != value:
+            raise ValueError("must be a number")
+        if self.min_value is not None and value < self.min_value:
+            raise ValueError(f"must be >= {self.min_value}")
+        if self.max_value is not None and value > self.max_value:
+            raise ValueError(f"must be <= {self.max_value}")
+        return value
+
+
+class Bool(Field):
+    def __init__(self, required=False, default=False):
+        super().__init__(required, default)
+
+    def convert(self, value, path, errors):
+        if isinstance(value, bool):
+            return value
+        if value in (0, 1):
+            return bool(value)
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            return value.lower() == "true"
+        raise ValueError("must be a boolean")
+
+
+class Date(Field):
+    def convert(self, value, path, errors):
+        if not isinstance(value, str):
+            raise ValueError("must be a date (YYYY-MM-DD)")
+        try:
+            # Accept full ISO timestamps from date pickers; keep the date.
+            return datetime.date.fromisoformat(value.strip()[:10]).isoformat()
+        except ValueError:
+            raise ValueError("must be a date (YYYY-MM-DD)")
+
+
+class List(Field):
+    def __init__(self, required=False, default=list, max_items=200):
+        super().__init__(required, default)
+        self.max_items = max_items
+
+    def convert(self, value, path, errors):
+        if not isinstance(value, list):
+            raise ValueError("must be an array")
+        if len(value) > self.max_items:
+            raise ValueError(f"must have at most {self.max_items} items")
+        return value
+
+
+class Dict(Field):
+    """
+    Free-form JSON object, stored as-is.
+    """
+
+    def __init__(self, required=False, default=dict):
+        super().__init__(required, default)
+
+    def convert(self, value, path, errors):
+        if not isinstance(value, dict):
+            raise ValueError("must be an object")
+        return value
+
+
+class Obj(Field):
+    """
+    Nested object with its own fields. The field table is flattened into a
+    tuple once, at schema definition time.
+    """
+
+    def __init__(self, fields, required=True):
+        super().__init__(required, None)
+        self.fields = tuple(fields.items())
+
+    def missing(self, path, errors):
+        # An absent optional object still yields its fields' defaults.
+        return self.convert({}, path, errors)
+
+    def convert(self, value, path, errors):
+        if not isinstance(value, dict):
+            raise ValueError("must be an object")
+
+        out = {}
+        prefix = path + "." if path else ""
+        for key, field in self.fields:
+            item = value.get(key)
+            if item is None or item == "":
+                if field.required:
+                    errors.append((prefix + key, "is required"))
+                else:
+                    out[key] = field.missing(prefix + key, errors)
+                continue
+            try:
+                out[key] = field.convert(item, prefix + key, errors)
+            except ValueError as e:
+                errors.append((prefix + key, str(e)))
+        return out
+
+
+class Schema(Obj):
+    def validate(self, data):
+        """
+        Validated copy of data, or SchemaError listing every bad field.
+        """
+        errors = []
+        try:
+            value = self.convert(data, "", errors)
+        except ValueError as e:
+            errors.append(("", str(e)))
+        if errors:
+            raise SchemaError(errors)
+        return value
+
+    def decode(self, raw):
+        return self.validate(decode_json(raw))
+
+
+def decode_json(raw):
+    try:
+        return _decode_json(raw) if raw else None
+    except (_DecodeError, ValueError, UnicodeDecodeError):
+        raise SchemaError([("", "is not valid JSON")])
+
+
+def load_request(schema):
+    """
+    Decode and validate the current request body against schema.
+    """
+    return schema.decode(request.get_data(cache=True))
+
+
+# -----------------------------------------------------------------
+# Payloads
+# -----------------------------------------------------------------
+CONTRACT_SCHEMA = Schema({
+    "farm": Int(min_value=1),
+    "cropDetails": Obj({
+        "commodityId": Int(min_value=1),
+        "varietyId": Int(min_value=1),
+        "quality": Str(required=False, default="standard", max_length=50),
+        "quantity": Obj({
+            "amount": Number(min_value=0),
+            "unit": Str(max_length=50),
+        }),
+        "expectedYield": Number(required=False, min_value=0),
+        "qualityParameters": Dict(),
+    }),
+    "farmingDetails": Obj({
+        "plantingDate": Date(),
+        "harvestingDate": Date(),
+        "season": Str(max_length=50),
+        "farmingTechniques": List(),
+        "fertilizersUsed": List(),
+        "pesticidesUsed": List(),
+        "irrigationSchedule": Str(required=False, max_length=2000),
+    }),
+    "pricing": Obj({
+        "basePrice": Number(min_value=0),
+        "priceUnit": Str(max_length=50),
+        "advancePayment": Obj({
+            "amount": Number(required=False, min_value=0),
+            "percentage": Number(required=False, min_value=0, max_value=100),
+            "dueDate": Date(required=False),
+        }, required=False),
+    }),
+    "logistics": Obj({
+        "responsibility": Str(max_length=50),
+        "pickupLocation": Str(required=False),
+        "deliveryLocation": Str(required=False),
+        "transportationCost": Number(required=False, min_value=0),
+        "packagingRequirements": Str(required=False, max_length=2000),
+        "deliverySchedule": Str(required=False, max_length=2000),
+    }),
+    "laborAndSupport": Obj({
+        "laborResponsibility": Str(max_length=50),
+        "technicalSupport": Dict(),
+        "expertVisits": Dict(),
+    }),
+    "mediaFiles": Obj({
+        "farmImages": List(),
+        "farmVideos": List(),
+        "documents": List(),
+    }, required=False),
+})
+
+FARM_SCHEMA = Schema({
+    "farmName": Str(max_length=150),
+    "farmDivision": Int(required=False),
+    "farmDistrict": Int(required=False),
+    "farmTehsil": Int(required=False),
+    "farmBlock": Int(required=False),
+    "location": Obj({
+        "coordinates": Obj({
+            "latitude": Number(required=False, min_value=-90, max_value=90),
+            "longitude": Number(required=False, min_value=-180, max_value=180),
+        }, required=False),
+    }, required=False),
+    "farmSize": Obj({
+        "area": Number(required=False, min_value=0),
+        "unit": Str(required=False, max_length=50),
+    }, required=False),
+    "soilInformation": Obj({
+        "soilType": Str(required=False, max_length=100),
+        "phLevel": Number(required=False, min_value=0, max_value=14),
+        "organicMatter": Number(required=False, min_value=0),
+        "nitrogen": Number(required=False, min_value=0),
+        "phosphorus": Number(required=False, min_value=0),
+        "potassium": Number(required=False, min_value=0),
+        "soilTestDate": Date(required=False),
+        "soilTestReport": Str(required=False),
+    }, required=False),
+    "irrigationSystem": Str(required=False, max_length=100),
+    "waterSource": Str(required=False, max_length=100),
+    "farmingTechniques": List(),
+    "certifications": List(),
+    "currentCrops": List(),
+    "farmHistory": List(),
+    "facilities": Obj({
+        "storageCapacity": Number(required=False, min_value=0),
+        "storageType": Str(required=False, max_length=100),
+        "processingFacility": Bool(),
+        "coldStorage": Bool(),
+        "packingFacility": Bool(),
+        "qualityTestingLab": Bool(),
+    }, required=False),
+    "farmImages": List(),
+    "farmVideos": List(),
+})
+
+MOBILE_PATTERN = r"[6-9]\d{9}"
+EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+
+SIGNUP_SCHEMA = Schema({
+    "full_name": Str(max_length=100),
+    "mobile_number": Str(pattern=MOBILE_PATTERN),
+    "pass_key": Str(max_length=64, strip=False),
+    "user_type": Str(choices=("F", "T", "FT")),
+})
+
+PROFILE_SCHEMA = Schema({
+    "full_name": Str(max_length=100),
+    "email_id": Str(max_length=150, pattern=EMAIL_PATTERN),
+    "address": Str(required=False, default="", max_length=500),
+})
@@ -0,0 +1,132 @@
+"""
+Throughput and latency of the hot read routes, sync WSGI vs ASGI mode,
+at increasing numbers of concurrent keep-alive clients:
+
+    gunicorn -w 2 --threads 8 -b :5005 app:app
+    uvicorn asgi_app:app --workers 2 --port 5006
+
+    python scripts/bench_asgi.py --token <jwt> --contract <contract_id> \\
+        http://127.0.0.1:5005 http://127.0.0.1:5006 [--concurrency 8,64,256] [--seconds 10]
+
+Paths: /auth/me, /contracts/form-data, /contracts/<id>. Stdlib only, so
+the client itself is not the bottleneck being measured.
+"""
+import sys
+import time
+import asyncio
+import argparse
+from urllib.parse import urlsplit
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+
+    return status
+
+
+async def client(host, port, request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            if status >= 400:
+                errors.append(status)
+            else:
+                latencies.append(time.perf_counter() - start)
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        errors.append(type(e).__name__)
+    finally:
+        writer.close()
+
+
+async def run(base, path, token, concurrency, seconds):
+    url = urlsplit(base)
+    host, port = url.hostname, url.port or 80
+    request = (
+        f"GET {path} HTTP/1.1\r\n"
+        f"Host: {url.netloc}\r\n"
+        f"Authorization: Bearer {token}\r\n"
+        "Accept-Encoding: gzip\r\n"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode("ascii")
+
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*[
+        client(host, port, request, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ])
+    return latencies, errors
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("targets", nargs="+", help="base URLs, e.g. http://127.0.0.1:5005")
+    parser.add_argument("--token", required=True)
+    parser.add_argument("--contract", required=True)
+    parser.add_argument("--concurrency", default="8,64,256")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    paths = ["/auth/me", "/contracts/form-data", f"/contracts/{args.contract}"]
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    print(f"{'target':<24} {'path':<28} {'conc':>5} {'req/s':>9} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for base in args.targets:
+        for path in paths:
+            for concurrency in levels:
+                latencies, errors = asyncio.run(
+                    run(base, path, args.token, concurrency, args.seconds)
+                )
+                print(
+                    f"{base:<24} {path[:28]:<28} {concurrency:>5} "
+                    f"{len(latencies) / args.seconds:>9.0f} "
+                    f"{percentile(latencies, 50) * 1000:>8.1f} "
+                    f"{percentile(latencies, 95) * 1000:>8.1f} "
+                    f"{percentile(latencies, 99) * 1000:>8.1f} "
+                    f"{len(errors):>7}"
+                )
+                if errors and len(set(map(str, errors))) == 1 and not latencies:
+                    print(f"  all requests failed: {errors[0]}", file=sys.stderr)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Decode throughput for the create-contract payload:
+
+  baseline  json.loads + contract_params indexing straight into the dict
+            (the previous request.json path; no validation)
+  schema    CONTRACT_SCHEMA.decode (msgspec JSON decode when installed)
+            + contract_params on the validated dict
+
+    python scripts/bench_decode.py [--seconds 2]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import schemas  # noqa: E402
+from routes.contracts_routes import contract_params  # noqa: E402
+
+PAYLOAD = {
+    "farm": "12",
+    "cropDetails": {
+        "commodityId": "3", "varietyId": "17", "quality": "premium",
+        "quantity": {"amount": "120.5", "unit": "quintal"},
+        "expectedYield": "130", "qualityParameters": {"moisture": "12%"},
+    },
+    "farmingDetails": {
+        "plantingDate": "2026-06-15", "harvestingDate": "2026-10-30", "season": "kharif",
+        "farmingTechniques": ["organic", "drip"], "fertilizersUsed": ["compost"],
+        "pesticidesUsed": [], "irrigationSchedule": "weekly",
+    },
+    "pricing": {
+        "basePrice": "2300", "priceUnit": "per-quintal",
+        "advancePayment": {"amount": "5000", "percentage": "10", "dueDate": "2026-07-01"},
+    },
+    "logistics": {
+        "responsibility": "buyer", "pickupLocation": "Farm gate", "deliveryLocation": "Mandi",
+        "transportationCost": "1500", "packagingRequirements": "50kg jute bags",
+        "deliverySchedule": "Within a week of harvest",
+    },
+    "laborAndSupport": {"laborResponsibility": "farmer", "technicalSupport": {}, "expertVisits": {}},
+    "mediaFiles": {"farmImages": [], "farmVideos": [], "documents": []},
+}
+
+NOW = datetime.datetime(2026, 1, 1)
+
+
+def baseline(raw):
+    return contract_params(json.loads(raw), 1, "C1", NOW)
+
+
+def schema(raw):
+    return contract_params(schemas.CONTRACT_SCHEMA.decode(raw), 1, "C1", NOW)
+
+
+def measure(fn, raw, seconds):
+    n = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for _ in range(200):
+            fn(raw)
+        n += 200
+    return n / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=2.0)
+    args = parser.parse_args()
+
+    raw = json.dumps(PAYLOAD).encode("utf-8")
+    print(f"payload: {len(raw)} bytes; JSON decoder: "
+          f"{'msgspec' if schemas.msgspec else 'stdlib json'}")
+
+    results = {}
+    for name, fn in (("baseline", baseline), ("schema", schema)):
+        results[name] = measure(fn, raw, args.seconds)
+        print(f"{name:9s} {results[name]:>10,.0f} payloads/s  "
+              f"{1e6 / results[name]:6.1f} us/payload")
+
+    print(f"schema / baseline: {results['schema'] / results['baseline']:.2f}x "
+          f"(schema also validates and coerces every field)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Per-worker memory for the reference snapshots, private vs shared mode.
+
+Forks --workers processes per mode. Each one serves every location and
+commodity body once and looks up every id in every lookup table (the
+steady state of a long-running worker), then reports its USS (private
+memory) and PSS from /proc/self/smaps_rollup:
+
+  private  each worker loads the tables itself (fake cursor, synthetic
+           rows) and builds its own bodies, as without SHARED_REFERENCE_DIR
+  shared   the parent publishes the snapshot files once; workers map them
+
+    python scripts/bench_shared_reference.py [--workers 4] [--tehsils 6000]
+
+Linux only (smaps_rollup).
+"""
+import os
+import sys
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask  # noqa: E402
+import reference_data  # noqa: E402
+import shared_reference  # noqa: E402
+
+
+def synthetic_tables(args):
+    rand = random.Random(1)
+    return {
+        "m_division": [
+            {"division_id": i, "division_name": f"Division {i}"}
+            for i in range(1, args.divisions + 1)
+        ],
+        "m_district": [
+            {"district_id": i, "district_name": f"District {i}",
+             "division_id": rand.randint(1, args.divisions)}
+            for i in range(1, args.districts + 1)
+        ],
+        "m_tehsil": [
+            {"tehsil_id": i, "tehsil_name": f"Tehsil {i}",
+             "district_id": rand.randint(1, args.districts)}
+            for i in range(1, args.tehsils + 1)
+        ],
+        "m_block": [
+            {"block_id": i, "block_name": f"Block {i}",
+             "district_id": rand.randint(1, args.districts)}
+            for i in range(1, args.blocks + 1)
+        ],
+        "m_commodity_variety": [
+            {"variety_id": i, "commodity_id": 1 + i % args.commodities, "variety_name": f"Variety {i}"}
+            for i in range(args.varieties)
+        ],
+        "m_commodity": [
+            {"commodity_id": i, "commodity_name": f"Commodity {i}"}
+            for i in range(1, args.commodities + 1)
+        ],
+        "m_produce_unit": [{"unit_id": 1, "unit_name": "quintal"}],
+    }
+
+
+class FakeCursor:
+    def __init__(self, tables):
+        self.tables = tables
+        self.sql = None
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+
+    def fetchall(self):
+        if self.sql.startswith("CHECKSUM"):
+            return [{"Checksum": 1}]
+        # Longest name first: m_commodity_variety before m_commodity.
+        for name in sorted(self.tables, key=len, reverse=True):
+            if f"FROM {name}" in self.sql:
+                return [dict(r) for r in self.tables[name]]
+        raise ValueError(self.sql)
+
+
+class FakeDB:
+    def __init__(self, tables):
+        self.tables = tables
+
+    def cursor(self):
+        return FakeCursor(self.tables)
+
+    def close(self):
+        pass
+
+
+def memory_kb():
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Private_Clean"] + fields["Private_Dirty"], fields["Pss"]
+
+
+def serve_everything(shared):
+    for snapshot in reference_data.SHARED_SNAPSHOTS:
+        state = snapshot.get()
+        state.body.to_response()
+        if shared:
+            # Every key is in the file; the builder is never called.
+            for key in KEYS[snapshot.name]:
+                state.derived_body(key, None).to_response()
+        else:
+            for key, payload in snapshot.derived(state.data):
+                state.derived_body(key, lambda data, p=payload: p).to_response()
+        for name, ids in LOOKUP_IDS[snapshot.name].items():
+            for key in ids:
+                state.contains(name, key)
+                state.lookup(name, key)
+
+
+def worker(write_fd, shared):
+    with Flask(__name__).test_request_context():
+        serve_everything(shared)
+    uss, pss = memory_kb()
+    os.write(write_fd, f"{uss} {pss}\n".encode())
+    os._exit(0)
+
+
+def run_mode(workers, shared):
+    results = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            worker(write_fd, shared)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as f:
+            results.append(tuple(map(int, f.read().split())))
+        os.waitpid(pid, 0)
+    return results
+
+
+TABLES = None
+KEYS = {}
+LOOKUP_IDS = {}
+
+
+def main():
+    global TABLES
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--divisions", type=int, default=30)
+    parser.add_argument("--districts", type=int, default=700)
+    parser.add_argument("--tehsils", type=int, default=6000)
+    parser.add_argument("--blocks", type=int, default=7000)
+    parser.add_argument("--commodities", type=int, default=300)
+    parser.add_argument("--varieties", type=int, default=3000)
+    args = parser.parse_args()
+
+    TABLES = synthetic_tables(args)
+    reference_data.get_db = lambda: FakeDB(TABLES)
+
+    for snapshot in reference_data.SHARED_SNAPSHOTS:
+        data = snapshot.loader(FakeCursor(TABLES))
+        KEYS[snapshot.name] = [key for key, _ in snapshot.derived(data)]
+        LOOKUP_IDS[snapshot.name] = {name: list(data[name]) for name in snapshot.indexes}
+
+    report = {}
+    report["private"] = run_mode(args.workers, shared=False)
+
+    directory = tempfile.mkdtemp(prefix="shared-reference-")
+    with Flask(__name__).app_context():
+        shared_reference.publish_all(directory)
+    reference_data.SHARED_REFERENCE_DIR = directory
+    reference_data.get_db = None  # shared workers must not touch the DB
+    report["shared"] = run_mode(args.workers, shared=True)
+
+    sizes = {f: os.path.getsize(os.path.join(directory, f)) // 1024 for f in os.listdir(directory)}
+    print(f"snapshot files (kB): {sizes}")
+    print(f"{'mode':<8} {'workers':>7} {'USS kB/worker':>14} {'PSS kB/worker':>14}")
+    for mode, results in report.items():
+        uss = sum(r[0] for r in results) / len(results)
+        pss = sum(r[1] for r in results) / len(results)
+        print(f"{mode:<8} {len(results):>7} {uss:>14.0f} {pss:>14.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
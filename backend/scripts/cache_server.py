@@ -0,0 +1,266 @@
+"""
+Stand-in for Redis to try the shared cache tier locally: the commands
+cache.py uses (strings, sets, TTLs, pub/sub) kept in memory, over RESP2.
+
+    python scripts/cache_server.py [--port 6379]
+    CACHE_URL=redis://127.0.0.1:6379/0 gunicorn -c gunicorn.conf.py wsgi:app
+
+Not for production: one database, no persistence, no auth.
+"""
+import sys
+import time
+import asyncio
+import argparse
+
+SWEEP_SECONDS = 10
+NO_REPLY = object()
+
+
+class CommandError(Exception):
+    pass
+
+
+class Store:
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.channels = {}
+
+    def _live(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    def _typed(self, key, kind):
+        value = self._live(key)
+        if value is not None and not isinstance(value, kind):
+            raise CommandError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def sweep(self):
+        now = time.monotonic()
+        for key in [k for k, deadline in self.expires.items() if deadline <= now]:
+            self.data.pop(key, None)
+            del self.expires[key]
+
+    def get(self, key):
+        return self._typed(key, bytes)
+
+    def set(self, key, value, ttl=None, nx=False, xx=False):
+        exists = self._live(key) is not None
+        if (nx and exists) or (xx and not exists):
+            return False
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if ttl is not None:
+            self.expires[key] = time.monotonic() + ttl
+        return True
+
+    def delete(self, keys):
+        removed = 0
+        for key in keys:
+            if self._live(key) is not None:
+                removed += 1
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return removed
+
+    def sadd(self, key, members):
+        members_set = self._typed(key, set)
+        if members_set is None:
+            members_set = self.data[key] = set()
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+
+    def smembers(self, key):
+        return sorted(self._typed(key, set) or ())
+
+    def expire(self, key, seconds):
+        if self._live(key) is None:
+            return 0
+        self.expires[key] = time.monotonic() + seconds
+        return 1
+
+    def publish(self, channel, message):
+        subscribers = self.channels.get(channel, ())
+        for session in list(subscribers):
+            session.send([b"message", channel, message])
+        return len(subscribers)
+
+
+def encode(value):
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, str):
+        return b"+" + value.encode() + b"\r\n"
+    if isinstance(value, CommandError):
+        return b"-" + str(value).encode() + b"\r\n"
+    return b"*%d\r\n" % len(value) + b"".join(encode(v) for v in value)
+
+
+async def read_command(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command (telnet, nc).
+        return line.split()
+
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        if not header.startswith(b"$"):
+            raise CommandError("ERR Protocol error: expected '$'")
+        length = int(header[1:])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+class Session:
+    def __init__(self, store, writer):
+        self.store = store
+        self.writer = writer
+        self.subscribed = set()
+
+    def send(self, value):
+        self.writer.write(encode(value))
+
+    def close(self):
+        for channel in self.subscribed:
+            self.store.channels.get(channel, set()).discard(self)
+
+    def subscribe(self, channels):
+        for channel in channels:
+            self.subscribed.add(channel)
+            self.store.channels.setdefault(channel, set()).add(self)
+            self.send([b"subscribe", channel, len(self.subscribed)])
+
+    def unsubscribe(self, channels):
+        if not channels:
+            if not self.subscribed:
+                self.send([b"unsubscribe", None, 0])
+            channels = list(self.subscribed)
+        for channel in channels:
+            self.subscribed.discard(channel)
+            self.store.channels.get(channel, set()).discard(self)
+            self.send([b"unsubscribe", channel, len(self.subscribed)])
+
+    def execute(self, args):
+        if not args:
+            return NO_REPLY
+        name, args = args[0].upper().decode(), args[1:]
+        store = self.store
+
+        if name in ("SUBSCRIBE", "UNSUBSCRIBE"):
+            # These write one reply per channel themselves.
+            (self.subscribe if name == "SUBSCRIBE" else self.unsubscribe)(args)
+            return NO_REPLY
+        if self.subscribed and name not in ("PING", "QUIT"):
+            raise CommandError(f"ERR Can't execute '{name.lower()}' in subscribed mode")
+
+        if name == "PING":
+            if self.subscribed:
+                return [b"pong", args[0] if args else b""]
+            return args[0] if args else "PONG"
+        if name == "ECHO":
+            return args[0]
+        if name in ("SELECT", "CLIENT", "QUIT"):
+            return "OK"
+        if name == "GET":
+            return store.get(args[0])
+        if name == "SET":
+            ttl, nx, xx = None, False, False
+            options = [a.upper() for a in args[2:]]
+            for i, option in enumerate(options):
+                if option == b"EX":
+                    ttl = int(options[i + 1])
+                elif option == b"PX":
+                    ttl = int(options[i + 1]) / 1000
+                elif option == b"NX":
+                    nx = True
+                elif option == b"XX":
+                    xx = True
+            return "OK" if store.set(args[0], args[1], ttl, nx, xx) else None
+        if name in ("DEL", "UNLINK"):
+            return store.delete(args)
+        if name == "EXISTS":
+            return sum(store._live(k) is not None for k in args)
+        if name == "SADD":
+            return store.sadd(args[0], args[1:])
+        if name == "SMEMBERS":
+            return store.smembers(args[0])
+        if name == "EXPIRE":
+            return store.expire(args[0], int(args[1]))
+        if name in ("FLUSHDB", "FLUSHALL"):
+            store.data.clear()
+            store.expires.clear()
+            return "OK"
+        if name == "DBSIZE":
+            store.sweep()
+            return len(store.data)
+        if name == "PUBLISH":
+            return store.publish(args[0], args[1])
+        raise CommandError(f"ERR unknown command '{name.lower()}'")
+
+
+async def serve(host, port):
+    store = Store()
+
+    async def handle(reader, writer):
+        session = Session(store, writer)
+        try:
+            while True:
+                args = None
+                try:
+                    args = await read_command(reader)
+                    if args is None:
+                        break
+                    reply = session.execute(args)
+                    if reply is not NO_REPLY:
+                        session.send(reply)
+                except (CommandError, IndexError, ValueError) as e:
+                    if not isinstance(e, CommandError):
+                        e = CommandError("ERR wrong number or type of arguments")
+                    session.send(e)
+                await writer.drain()
+                if args and args[0].upper() == b"QUIT":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            session.close()
+            writer.close()
+
+    async def sweep():
+        while True:
+            await asyncio.sleep(SWEEP_SECONDS)
+            store.sweep()
+
+    server = await asyncio.start_server(handle, host, port)
+    print(f"cache server listening on {host}:{port}", flush=True)
+    async with server:
+        asyncio.ensure_future(sweep())
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+Two forked "workers" sharing a cache server (scripts/cache_server.py on a
+free port, or --url for a real one): entries written by one are served
+by the other, and delete / tag / revocation invalidations from one reach
+the other's in-process tier. Prints the broadcast latency.
+
+    python scripts/check_cache_coherence.py [--url redis://127.0.0.1:6379/0]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import multiprocessing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_until(predicate, timeout=2.0):
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if predicate():
+            return time.monotonic() - start
+        time.sleep(0.001)
+    return None
+
+
+def worker(conn):
+    """
+    Runs commands from the parent: ("call", expr) evaluates expr with the
+    cache and revocation modules in scope.
+    """
+    import datetime
+    import cache
+    import revocation
+
+    cache.start_listener()
+    scope = {"cache": cache, "revocation": revocation, "wait_until": wait_until, "datetime": datetime}
+    while True:
+        command = conn.recv()
+        if command is None:
+            return
+        try:
+            conn.send(("ok", eval(command, scope)))
+        except Exception as e:
+            conn.send(("error", repr(e)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(HERE, "cache_server.py"), "--port", str(port)],
+            stdout=subprocess.DEVNULL
+        )
+        url = f"redis://127.0.0.1:{port}/0"
+        time.sleep(0.3)
+
+    os.environ["CACHE_URL"] = url
+    os.environ["CACHE_CHANNEL"] = f"cf:check:{os.getpid()}"
+    ctx = multiprocessing.get_context("fork")
+    workers = []
+    for _ in range(2):
+        parent, child = ctx.Pipe()
+        process = ctx.Process(target=worker, args=(child,), daemon=True)
+        process.start()
+        workers.append((process, parent))
+
+    def run(index, expr):
+        conn = workers[index][1]
+        conn.send(expr)
+        status, value = conn.recv()
+        if status != "ok":
+            raise RuntimeError(value)
+        return value
+
+    failures = 0
+
+    def check(name, ok, detail=""):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {name} {detail}")
+
+    # Let both listeners subscribe (their first "clear" runs then).
+    time.sleep(0.3)
+
+    entry = "(b'{\"id\": 1}', datetime.datetime(2026, 1, 2, 3, 4, 5), (1, 'Open', None, (3,)))"
+    run(0, f"cache.contract_cache.set('C1', {entry}, tags=['farm:7', 'user:3'])")
+    check("shared hit in the other worker",
+          run(1, "cache.contract_cache.get('C1')") == run(0, entry))
+    check("counted as a shared hit",
+          run(1, "cache.contract_cache.stats()['shared_hits']") == 1)
+
+    run(0, "cache.invalidate_contract('C1')")
+    took = run(1, "wait_until(lambda: cache.contract_cache.local.get('C1') is None)")
+    check("delete reaches the other worker", took is not None, f"({took * 1000:.1f} ms)" if took else "")
+    check("delete removes the shared copy", run(1, "cache.contract_cache.get('C1')") is None)
+
+    run(1, f"cache.contract_cache.set('C2', {entry}, tags=['farm:7'])")
+    run(0, "cache.contract_cache.get('C2')")
+    run(1, "cache.invalidate_farm(7)")
+    took = run(0, "wait_until(lambda: cache.contract_cache.local.get('C2') is None)")
+    check("tag invalidation reaches the other worker", took is not None, f"({took * 1000:.1f} ms)" if took else "")
+    check("tag invalidation removes the shared copy", run(0, "cache.contract_cache.get('C2')") is None)
+
+    run(0, "cache.broadcast('revoked', 'revoke', ['abc', 2**31])")
+    took = run(1, "wait_until(lambda: 'abc' in revocation.revocation_list.revoked)")
+    check("revocation reaches the other worker", took is not None, f"({took * 1000:.1f} ms)" if took else "")
+
+    for process, conn in workers:
+        conn.send(None)
+        process.join(timeout=2)
+    if server is not None:
+        server.terminate()
+        server.wait()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Startup import report and budget check for a fresh worker process.
+
+Runs `python -X importtime -c "import <module>"` in a clean interpreter
+(best of --runs), prints the slowest imports by cumulative time, and fails
+when the total exceeds the budget or when a module that should load lazily
+(lifecycle.LAZY_MODULES) was imported at startup:
+
+    python scripts/import_report.py [--module app] [--budget-ms 300] [--top 25]
+
+Exit status is non-zero on failure, so CI can run it next to the build.
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, BACKEND)
+
+STARTUP_BUDGET_MS = float(os.environ.get("STARTUP_BUDGET_MS", 300))
+
+
+def import_times(module):
+    """
+    [(name, self_us, cumulative_us, depth)] in import order.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"import {module} failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time:  <self> | <cumulative> | <indent><name>"
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    from lifecycle import LAZY_MODULES
+
+    best = None
+    for _ in range(args.runs):
+        rows = import_times(args.module)
+        total = next(c for name, _, c, _ in rows if name == args.module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    total, rows = best
+
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for name, self_us, cumulative, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative / 1000:>14.1f} {self_us / 1000:>8.1f}  {'  ' * depth}{name}")
+
+    failures = []
+    imported = {name for name, _, _, _ in rows}
+    eager = [m for m in LAZY_MODULES if m in imported]
+    if eager:
+        failures.append(f"imported at startup but meant to be lazy: {', '.join(eager)}")
+    if total / 1000 > args.budget_ms:
+        failures.append(f"import {args.module} took {total / 1000:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    print(f"\nimport {args.module}: {total / 1000:.0f} ms (budget {args.budget_ms:.0f} ms), "
+          f"{len(rows)} modules")
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
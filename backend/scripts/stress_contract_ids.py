@@ -0,0 +1,126 @@
+"""
+Stress check for ids.py: generate millions of contract ids across threads
+and forked processes and verify there are no duplicates and that each
+thread's ids are strictly increasing.
+
+    python scripts/stress_contract_ids.py --processes 4 --threads 4 --per-thread 250000
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+import multiprocessing
+from array import array
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ids  # noqa: E402
+
+
+def run_threads(threads, per_thread, batch):
+    """
+    Ids from `threads` threads of this process, as one array of ints.
+    Raises if a thread ever sees its ids go backwards.
+    """
+    results = [None] * threads
+
+    def work(slot):
+        out = array("Q")
+        last = -1
+        remaining = per_thread
+        while remaining:
+            n = min(batch, remaining)
+            values = ids.generator.next_ints(n) if n > 1 else [ids.generator.next_int()]
+            for v in values:
+                if v <= last:
+                    raise AssertionError(f"non-monotonic id in thread {slot}: {v} <= {last}")
+                last = v
+            out.extend(values)
+            remaining -= n
+        results[slot] = out
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+
+    merged = array("Q")
+    for r in results:
+        merged.extend(r)
+    return merged
+
+
+def process_main(conn, slot, threads, per_thread, batch):
+    # A forked child has no node id until one is assigned, as under gunicorn.
+    try:
+        ids.new_contract_id()
+        raise AssertionError("forked child issued an id before set_node_id()")
+    except RuntimeError:
+        pass
+    ids.set_node_id(ids.node_id_for(slot))
+
+    values = run_threads(threads, per_thread, batch)
+    conn.send((ids.generator.node_id, values.tobytes()))
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--per-thread", type=int, default=250000)
+    parser.add_argument("--batch", type=int, default=1,
+                        help="ids per generator call (1 = new_contract_id path)")
+    args = parser.parse_args()
+
+    total = args.processes * args.threads * args.per_thread
+    print(f"generating {total:,} ids: {args.processes} processes x "
+          f"{args.threads} threads x {args.per_thread:,}")
+
+    started = time.perf_counter()
+    # One forked child per id slot, each assigned after the fork.
+    ctx = multiprocessing.get_context("fork")
+    children = []
+    for slot in range(args.processes):
+        parent_conn, child_conn = ctx.Pipe(duplex=False)
+        proc = ctx.Process(
+            target=process_main,
+            args=(child_conn, slot, args.threads, args.per_thread, args.batch)
+        )
+        proc.start()
+        children.append((proc, parent_conn))
+
+    parts = []
+    for proc, conn in children:
+        parts.append(conn.recv())
+        proc.join()
+    elapsed = time.perf_counter() - started
+
+    node_ids = [node for node, _ in parts]
+    values = array("Q")
+    for _, raw in parts:
+        values.frombytes(raw)
+
+    unique = len(set(values))
+    duplicates = len(values) - unique
+    print(f"node ids: {sorted(node_ids)}")
+    print(f"elapsed: {elapsed:.2f}s ({len(values) / elapsed:,.0f} ids/s)")
+    print(f"unique: {unique:,}  duplicates: {duplicates:,}")
+
+    sample = ids.format_contract_id(max(values))
+    print(f"sample: {sample} -> {ids.parse_contract_id(sample)}")
+
+    if len(set(node_ids)) != len(node_ids):
+        print("FAIL: processes shared a node id")
+        return 1
+    if duplicates:
+        print("FAIL: duplicate ids")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Reference snapshots published as memory-mapped files, shared by every
+worker on a node (SHARED_REFERENCE_DIR).
+
+One publisher process loads the master tables from MySQL and writes each
+snapshot (every JSON body it can serve, pre-compressed, its id-keyed
+lookup tables and the rest of the loaded data) to <dir>/<name>.snap via an
+atomic os.replace. Workers map the file read-only, serve bodies and answer
+lookups straight from the mapping, and never query MySQL for it. Nothing
+in the file is pickled: a worker only ever decodes JSON it asked for.
+
+    python shared_reference.py [--once]
+"""
+import os
+import sys
+import json
+import mmap
+import time
+import array
+import bisect
+import struct
+import itertools
+import logging
+import argparse
+import threading
+import config  # noqa: F401  (loads .env before the settings below)
+from compression import PrecompressedBody
+
+SHARED_REFERENCE_DIR = os.environ.get("SHARED_REFERENCE_DIR", "")
+
+# File layout: MAGIC | u64 index length | JSON index | blobs, each blob
+# 8-byte aligned. The index lists the bodies (key None = the main body)
+# with their blob spans, the span of the remaining data (JSON) and, per
+# lookup table, three spans: its ids sorted (int64), the offsets of their
+# values (int64, one more than there are ids) and the values, JSON-encoded
+# back to back. The int64 arrays are in native byte order; the file never
+# leaves the node that wrote it.
+MAGIC = b"CFREF002"
+HEADER = struct.Struct("<8sQ")
+
+log = logging.getLogger(__name__)
+
+
+def snapshot_path(directory, name):
+    return os.path.join(directory, f"{name}.snap")
+
+
+def dumps_value(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def write_snapshot_file(path, bodies, data, tables):
+    """
+    bodies: {key: PrecompressedBody}; data: the loader's result; tables:
+    the names of its {int id: value} dicts, written as lookup tables for
+    SharedState.contains() and lookup().
+    """
+    blobs = bytearray()
+
+    def put(chunk):
+        blobs.extend(bytes(-len(blobs) % 8))
+        start = len(blobs)
+        blobs.extend(chunk)
+        return start, len(chunk)
+
+    index = {"bodies": [], "tables": {}}
+    for key, body in bodies.items():
+        variants = {enc: put(v) for enc, v in body.variants.items()}
+        index["bodies"].append([key, put(body.raw), variants, body.etag])
+
+    for name in tables:
+        ids = sorted(data[name])
+        values = [dumps_value(data[name][i]) for i in ids]
+        offsets = itertools.accumulate(map(len, values), initial=0)
+        index["tables"][name] = [
+            put(array.array("q", ids).tobytes()),
+            put(array.array("q", offsets).tobytes()),
+            put(b"".join(values)),
+        ]
+    index["data"] = put(dumps_value({k: v for k, v in data.items() if k not in tables}))
+
+    header = dumps_value(index)
+    # Pad with JSON whitespace so the blobs start 8-byte aligned.
+    header += b" " * (-(HEADER.size + len(header)) % 8)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(blobs)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # Readers holding the old file keep their mapping of the old inode.
+    os.replace(tmp, path)
+
+
+class SharedState:
+    """
+    Read-only view of one published snapshot, interchangeable with
+    reference_data.SnapshotState.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, index_len = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a reference snapshot file")
+
+        self._view = memoryview(self._map)
+        self._base = HEADER.size + index_len
+        index = json.loads(bytes(self._view[HEADER.size:self._base]))
+
+        self._spans = {key: (raw, variants, etag) for key, raw, variants, etag in index["bodies"]}
+        self._data_span = index["data"]
+        self._tables = {
+            name: (self._part(ids).cast("q"), self._part(offsets).cast("q"), self._part(values))
+            for name, (ids, offsets, values) in index["tables"].items()
+        }
+        self._derived = {}
+        self._lock = threading.Lock()
+
+        self.body = self._body(None)
+        self.version = self.body.etag
+
+    def _part(self, span):
+        start, length = span
+        return self._view[self._base + start:self._base + start + length]
+
+    def _body(self, key):
+        raw, variants, etag = self._spans[key]
+        return PrecompressedBody.from_parts(
+            self._part(raw), etag, {enc: self._part(s) for enc, s in variants.items()}
+        )
+
+    @property
+    def data(self):
+        """
+        The loader's result, decoded from the mapping on every access and
+        not kept. Only for callers that need whole tables (building the
+        autocomplete index, user imports); requests use contains() and
+        lookup(), which read the mapping in place.
+        """
+        data = json.loads(bytes(self._part(self._data_span)))
+        for name, (ids, offsets, values) in self._tables.items():
+            data[name] = {
+                key: json.loads(bytes(values[offsets[i]:offsets[i + 1]]))
+                for i, key in enumerate(ids)
+            }
+        return data
+
+    def _find(self, name, key):
+        ids = self._tables[name][0]
+        if not isinstance(key, int):
+            return None
+        i = bisect.bisect_left(ids, key)
+        return i if i < len(ids) and ids[i] == key else None
+
+    def contains(self, name, key):
+        return self._find(name, key) is not None
+
+    def lookup(self, name, key):
+        i = self._find(name, key)
+        if i is None:
+            return None
+        _, offsets, values = self._tables[name]
+        return json.loads(bytes(values[offsets[i]:offsets[i + 1]]))
+
+    def derived_body(self, key, builder):
+        body = self._derived.get(key)
+        if body is None:
+            if key in self._spans:
+                body = self._body(key)
+            else:
+                body = PrecompressedBody.from_payload(builder(self.data))
+            with self._lock:
+                self._derived[key] = body
+        return body
+
+
+def publish_all(directory=None):
+    """
+    Publish every shared snapshot whose tables changed (or whose file is
+    missing). Needs an app context for the JSON encoder.
+    """
+    from reference_data import SHARED_SNAPSHOTS
+
+    directory = directory or SHARED_REFERENCE_DIR
+    os.makedirs(directory, exist_ok=True)
+    for snapshot in SHARED_SNAPSHOTS:
+        try:
+            if snapshot.publish(directory):
+                log.info("Published %s snapshot", snapshot.name)
+        except Exception:
+            log.exception("Publishing %s snapshot failed", snapshot.name)
+
+
+def main():
+    from flask import Flask
+    from reference_data import REFERENCE_CHECK_INTERVAL
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=SHARED_REFERENCE_DIR)
+    parser.add_argument("--interval", type=float, default=REFERENCE_CHECK_INTERVAL)
+    parser.add_argument("--once", action="store_true")
+    args = parser.parse_args()
+
+    if not args.dir:
+        print("SHARED_REFERENCE_DIR (or --dir) is required", file=sys.stderr)
+        return 2
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    # Same default JSON provider as the app, so bodies match byte for byte.
+    with Flask(__name__).app_context():
+        while True:
+            publish_all(args.dir)
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+import os
+import csv
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from autocomplete import fold
+from reference_data import location_snapshot
+from schemas import Schema, Str, Int, SchemaError, MOBILE_PATTERN, EMAIL_PATTERN
+from passwords import BCRYPT_ROUNDS, hashpw
+
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 500))
+IMPORT_HASH_WORKERS = int(os.environ.get("IMPORT_HASH_WORKERS", os.cpu_count() or 2))
+MAX_IMPORT_ROWS = int(os.environ.get("MAX_IMPORT_ROWS", 20000))
+
+# One CSV row. Location and education columns take a name or an id;
+# the other optional columns get the same defaults as /auth/signup/details.
+IMPORT_ROW_SCHEMA = Schema({
+    "full_name": Str(max_length=100),
+    "mobile_number": Str(pattern=MOBILE_PATTERN),
+    "pass_key": Str(max_length=64, strip=False),
+    "user_type": Str(required=False, default="F", choices=("F", "T", "FT")),
+    "age": Int(required=False, default=0, min_value=0),
+    "gender": Str(required=False, default="M", choices=("M", "F", "O")),
+    "voter_id": Str(required=False, default="", max_length=50),
+    "email_id": Str(required=False, max_length=150, pattern=EMAIL_PATTERN),
+    "address": Str(required=False, default="", max_length=500),
+    "division": Str(max_length=100),
+    "district": Str(max_length=100),
+    "tehsil": Str(max_length=100),
+    "block": Str(max_length=100),
+    "education": Str(required=False, max_length=100),
+    "experience_years": Int(required=False, default=0, min_value=0),
+})
+
+INSERT_LOGIN_SQL = """
+    INSERT INTO m_user_login
+    (full_name, mobile_number, pass_key, user_type, last_login, updated_time)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+INSERT_PROFILE_SQL = """
+    INSERT INTO m_user (
+        user_id, user_type, reg_id, age, full_name, gender, voter_id,
+        mobile_number, email_id, address, division_id, district_id,
+        tehsil_id, block_id, education_level_id, experience_years,
+        image_path, voter_path, source, status, updated_date, sequence
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+# All placeholders (no NOW()/NULL literals) so executemany() folds each
+# batch into multi-row INSERTs.
+
+# bcrypt releases the GIL, so threads hash in parallel without forking
+# a process pool from a multi-threaded worker. Kept apart from the
+# passwords pool so an import never sheds logins.
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def hash_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=IMPORT_HASH_WORKERS, thread_name_prefix="import-bcrypt"
+                )
+    return _executor
+
+
+def _reset_executor():
+    # Its threads do not survive a fork.
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+class Lookups:
+    """
+    Name/id -> id maps for one import, built from the location snapshot
+    and the education table. Child names are scoped by their parent, since
+    the same tehsil or block name occurs in several districts.
+    """
+
+    def __init__(self, locations, education_levels):
+        self.divisions = {}
+        for d in locations["divisions"]:
+            self._add(self.divisions, None, d["division_id"], d["division_name"])
+
+        self.districts = {}
+        for d in locations["districts"]:
+            self._add(self.districts, d["division_id"], d["district_id"], d["district_name"])
+
+        self.tehsils = {}
+        for t in locations["tehsils"]:
+            self._add(self.tehsils, t["district_id"], t["tehsil_id"], t["tehsil_name"])
+
+        self.blocks = {}
+        for b in locations["blocks"]:
+            self._add(self.blocks, b["district_id"], b["block_id"], b["block_name"])
+
+        self.education = {}
+        for e in education_levels:
+            self._add(self.education, None, e["education_level_id"], e["education_level"])
+
+    @staticmethod
+    def _add(table, parent, item_id, name):
+        table[(parent, fold(name))] = item_id
+        table[(parent, str(item_id))] = item_id
+
+    @staticmethod
+    def _find(table, parent, value):
+        return table.get((parent, fold(value)))
+
+    def resolve(self, row):
+        """
+        (ids, errors) for the row's location and education columns.
+        """
+        errors = []
+        ids = {}
+
+        ids["division_id"] = self._find(self.divisions, None, row["division"])
+        if ids["division_id"] is None:
+            errors.append(f"division: unknown '{row['division']}'")
+            return ids, errors
+
+        ids["district_id"] = self._find(self.districts, ids["division_id"], row["district"])
+        if ids["district_id"] is None:
+            errors.append(f"district: unknown '{row['district']}' in this division")
+            return ids, errors
+
+        ids["tehsil_id"] = self._find(self.tehsils, ids["district_id"], row["tehsil"])
+        if ids["tehsil_id"] is None:
+            errors.append(f"tehsil: unknown '{row['tehsil']}' in this district")
+
+        ids["block_id"] = self._find(self.blocks, ids["district_id"], row["block"])
+        if ids["block_id"] is None:
+            errors.append(f"block: unknown '{row['block']}' in this district")
+
+        if row["education"]:
+            ids["education_level_id"] = self._find(self.education, None, row["education"])
+            if ids["education_level_id"] is None:
+                errors.append(f"education: unknown '{row['education']}'")
+        else:
+            ids["education_level_id"] = 1
+
+        return ids, errors
+
+
+def load_lookups(cur):
+    cur.execute("SELECT education_level_id, education_level FROM m_education_level")
+    return Lookups(location_snapshot.get().data, cur.fetchall())
+
+
+class ImportReport:
+    def __init__(self):
+        self.total = 0
+        self.truncated = False
+        self.created = []
+        self.errors = []
+
+    def fail(self, line, mobile, errors):
+        self.errors.append({"line": line, "mobile_number": mobile, "errors": errors})
+
+    def to_dict(self):
+        return {
+            "total": self.total,
+            "created": len(self.created),
+            "failed": len(self.errors),
+            "truncated": self.truncated,
+            "users": self.created,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+        }
+
+
+def _prepare(cur, lookups, chunk, seen, report):
+    """
+    Validate and resolve one chunk of (line, raw_row); returns the rows
+    that can be inserted.
+    """
+    ready = []
+    for line, raw in chunk:
+        mobile = (raw.get("mobile_number") or "").strip()
+        try:
+            row = IMPORT_ROW_SCHEMA.validate(raw)
+        except SchemaError as e:
+            report.fail(line, mobile, [f"{f}: {err}" if f else err for f, err in e.errors])
+            continue
+
+        ids, errors = lookups.resolve(row)
+        if row["mobile_number"] in seen:
+            errors.append(f"mobile_number: duplicate of line {seen[row['mobile_number']]}")
+        if errors:
+            report.fail(line, mobile, errors)
+            continue
+
+        seen[row["mobile_number"]] = line
+        row.update(ids)
+        ready.append((line, row))
+
+    if ready:
+        cur.execute(
+            "SELECT mobile_number FROM m_user_login WHERE mobile_number IN %s",
+            (tuple(row["mobile_number"] for _, row in ready),)
+        )
+        taken = {r["mobile_number"] for r in cur.fetchall()}
+        if taken:
+            for line, row in ready:
+                if row["mobile_number"] in taken:
+                    report.fail(line, row["mobile_number"], ["mobile_number: already registered"])
+            ready = [(line, row) for line, row in ready if row["mobile_number"] not in taken]
+
+    return ready
+
+
+def _insert(conn, cur, ready, hashes, report):
+    """
+    Insert one prepared chunk (login + profile rows) in one transaction.
+    """
+    cur.execute("SELECT NOW() AS now")
+    now = cur.fetchone()["now"]
+
+    try:
+        # A passkey that failed to hash fails its chunk like any insert error.
+        hashes = list(hashes)
+        conn.begin()
+        cur.executemany(INSERT_LOGIN_SQL, [
+            (row["full_name"], row["mobile_number"], pass_hash, row["user_type"], None, now)
+            for (_, row), pass_hash in zip(ready, hashes)
+        ])
+
+        # executemany only reports the first id; read them all back by mobile.
+        cur.execute(
+            "SELECT user_id, mobile_number FROM m_user_login WHERE mobile_number IN %s",
+            (tuple(row["mobile_number"] for _, row in ready),)
+        )
+        user_ids = {r["mobile_number"]: r["user_id"] for r in cur.fetchall()}
+
+        cur.executemany(INSERT_PROFILE_SQL, [
+            (
+                user_ids[row["mobile_number"]], row["user_type"],
+                f"{row['user_type']}{user_ids[row['mobile_number']]:05d}",
+                row["age"], row["full_name"], row["gender"], row["voter_id"],
+                row["mobile_number"], row["email_id"], row["address"],
+                row["division_id"], row["district_id"], row["tehsil_id"], row["block_id"],
+                row["education_level_id"], row["experience_years"],
+                None, None, "Import", "Pending", now, 1
+            )
+            for _, row in ready
+        ])
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        for line, row in ready:
+            report.fail(line, row["mobile_number"], [f"batch failed: {e}"])
+        return
+
+    for line, row in ready:
+        report.created.append({"line": line, "user_id": user_ids[row["mobile_number"]]})
+
+
+def import_users(conn, text_stream):
+    """
+    Stream a CSV of users into m_user_login + m_user.
+
+    Rows are processed IMPORT_BATCH_SIZE at a time; while one batch is
+    being inserted, the next batch's passkeys are already hashing on the
+    thread pool. Rows past MAX_IMPORT_ROWS are not read (truncated=True).
+    """
+    report = ImportReport()
+    cur = conn.cursor()
+    lookups = load_lookups(cur)
+    reader = csv.DictReader(text_stream)
+
+    missing = {"full_name", "mobile_number", "pass_key", "division", "district",
+               "tehsil", "block"} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+
+    # line 1 is the header
+    rows = ((reader.line_num, raw) for raw in reader)
+    seen = {}
+    pending = None
+
+    while True:
+        limit = min(IMPORT_BATCH_SIZE, MAX_IMPORT_ROWS - report.total)
+        chunk = list(itertools.islice(rows, limit))
+        report.total += len(chunk)
+        if not chunk and next(rows, None) is not None:
+            report.truncated = True
+
+        job = None
+        if chunk:
+            ready = _prepare(cur, lookups, chunk, seen, report)
+            if ready:
+                hashes = hash_executor().map(
+                    hashpw,
+                    [row["pass_key"] for _, row in ready],
+                    itertools.repeat(BCRYPT_ROUNDS),
+                )
+                job = (ready, hashes)
+
+        if pending:
+            _insert(conn, cur, *pending, report)
+        pending = job
+
+        if not chunk:
+            break
+
+    return report